@@ -1,8 +1,163 @@
-def run_ai_fills(harvest: dict, workbook_path: str, phase: str = 'all'):
+# JCRUNCH module
+import json
+import os
+
+from ai.endpoints import resolve_endpoint
+from ai.engine import fill_jobs
+
+PROMPTS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'config', 'ai_prompts.json'
+)
+
+# Rows 1-3 are title, headers, source labels — data starts at row 4
+HEADER_ROW = 2
+SOURCE_ROW = 3
+FIRST_DATA_ROW = 4
+
+
+def run_ai_fills(harvest: dict, workbook_path: str, phase: str = 'all',
+                 endpoint=None, endpoint_url: str = None,
+                 cache_dir: str = None):
     """
-    Reads harvest dict, calls Anthropic API for AI-labeled columns,
-    writes results directly into workbook_path via openpyxl.
-    No database. In-memory only.
-    Logic to be fully implemented in a later step.
+    Fills the AI BOT columns of each phase sheet in workbook_path.
+
+    Rows are read back from the sheets themselves, so this works after
+    a normal run or on its own with --ai-only. harvest is accepted for
+    symmetry with the other pipeline steps and is not required.
+
+    AI columns are the ones whose row-3 source label contains
+    'AI BOT' (or a phase's explicit "columns" map in ai_prompts.json).
+    Every other labelled column is sent to the model as row context.
+
+    endpoint — optional async callable endpoint(system, prompt) -> str;
+               defaults to endpoint_url / JCRUNCH_AI_ENDPOINT / Anthropic.
+    cache_dir — answer cache; defaults to .jcrunch_ai_cache next to the
+                workbook. Unchanged rows are never sent twice.
     """
-    pass
+    from export.workbook_writer import PHASE_SHEETS, open_workbook, sheet_parts
+
+    settings = load_prompts()
+    phases   = settings.get('phases', {})
+
+    if cache_dir is None:
+        cache_dir = os.path.join(
+            os.path.dirname(os.path.abspath(workbook_path)),
+            '.jcrunch_ai_cache'
+        )
+
+    print(f"   [>>] Loading workbook: {workbook_path}")
+    wb = open_workbook(workbook_path)
+
+    jobs    = []
+    targets = {}   # job_id → (worksheet, {field: column index})
+    for num, base_name in PHASE_SHEETS.items():
+        if phase not in ('all', num) or num not in phases:
+            continue
+        if base_name not in wb.sheetnames:
+            print(f"   [!] Sheet not found, skipping: {base_name}")
+            continue
+
+        # A phase split at the Excel row limit continues on '(2)', …
+        for sheet_name in sheet_parts(wb, base_name):
+            ws = wb[sheet_name]
+            ai_cols, input_cols = _split_columns(
+                ws, phases[num], settings.get('ai_column_label', 'AI BOT')
+            )
+            if not ai_cols:
+                print(f"   [!] No AI BOT columns on {sheet_name} — skipping")
+                continue
+
+            rows = _read_rows(ws, input_cols)
+            if not rows:
+                print(f"   [!] No data rows on {sheet_name} — skipping")
+                continue
+
+            jobs.append({
+                'job_id':       sheet_name,
+                'instructions': phases[num].get('instructions', ''),
+                'fields':       list(ai_cols),
+                'rows':         rows,
+            })
+            targets[sheet_name] = (ws, ai_cols)
+
+    if not jobs:
+        print("   [!] Nothing for the AI Bot to fill")
+        return
+
+    if endpoint is None:
+        endpoint = resolve_endpoint(settings, endpoint_url)
+
+    results, stats = fill_jobs(jobs, endpoint, settings, cache_dir)
+
+    for sheet_name, answers in results.items():
+        ws, ai_cols = targets[sheet_name]
+        for excel_row, answer in answers.items():
+            for field, col_idx in ai_cols.items():
+                value = answer.get(field, '')
+                if isinstance(value, (dict, list)):
+                    value = json.dumps(value, ensure_ascii=False)
+                ws.cell(row=excel_row, column=col_idx,
+                        value=value if value is not None else '')
+
+    wb.save(workbook_path)
+    print(f"   [ok] AI fills: {stats['cached'] + stats['filled']} of "
+          f"{stats['rows']} rows filled "
+          f"({stats['cached']} from cache, {stats['calls']} model calls, "
+          f"{stats['failed']} unanswered)")
+
+
+def load_prompts(prompts_path: str = None) -> dict:
+    with open(prompts_path or PROMPTS_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f) or {}
+
+
+def _split_columns(ws, phase_cfg: dict, ai_label: str):
+    """
+    Returns ({field: col_idx} for AI columns,
+             {header: col_idx} for every other labelled column).
+    """
+    from openpyxl.utils import column_index_from_string
+
+    headers = {}
+    for cell in ws[HEADER_ROW]:
+        if cell.value not in (None, ''):
+            headers[cell.column] = str(cell.value).strip()
+
+    explicit = phase_cfg.get('columns')
+    if explicit:
+        ai_cols = {
+            field: column_index_from_string(letter)
+            for letter, field in explicit.items()
+        }
+    else:
+        label = ai_label.upper()
+        ai_cols = {}
+        for cell in ws[SOURCE_ROW]:
+            if cell.value and label in str(cell.value).upper():
+                field = headers.get(cell.column) or cell.column_letter
+                ai_cols[field] = cell.column
+
+    ai_idx = set(ai_cols.values())
+    input_cols = {
+        header: col for col, header in headers.items()
+        if col not in ai_idx
+    }
+    return ai_cols, input_cols
+
+
+def _read_rows(ws, input_cols: dict) -> list:
+    """Row dicts keyed by header, tagged with their sheet row number."""
+    rows = []
+    for excel_row, values in enumerate(
+        ws.iter_rows(min_row=FIRST_DATA_ROW, values_only=True),
+        start=FIRST_DATA_ROW
+    ):
+        row = {'row': excel_row}
+        for header, col in input_cols.items():
+            value = values[col - 1] if col - 1 < len(values) else None
+            if value not in (None, ''):
+                row[header] = value
+        if len(row) > 1:
+            rows.append(row)
+    return rows
@@ -0,0 +1,83 @@
+# JCRUNCH module
+import asyncio
+import json
+import os
+import urllib.request
+
+
+def resolve_endpoint(settings: dict, endpoint_url: str = None):
+    """
+    Pick the model endpoint for this run.
+
+    endpoint_url (or JCRUNCH_AI_ENDPOINT) → plain HTTP endpoint, e.g. a
+    local stub server for offline testing. Otherwise the Anthropic API,
+    which requires ANTHROPIC_API_KEY.
+    """
+    url = endpoint_url or os.environ.get('JCRUNCH_AI_ENDPOINT')
+    if url:
+        return http_endpoint(url, settings)
+    return anthropic_endpoint(settings)
+
+
+def http_endpoint(url: str, settings: dict, timeout: float = 120.0):
+    """
+    POSTs {"model", "max_tokens", "system", "prompt"} as JSON to url.
+    Expects a JSON reply of the form {"text": "..."}.
+    urllib blocks, so each call runs on the default executor.
+    """
+    model      = settings.get('model', '')
+    max_tokens = settings.get('max_tokens', 4096)
+
+    def post(system, prompt):
+        body = json.dumps({
+            'model':      model,
+            'max_tokens': max_tokens,
+            'system':     system,
+            'prompt':     prompt,
+        }).encode('utf-8')
+        req = urllib.request.Request(
+            url, data=body,
+            headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode('utf-8')).get('text', '')
+
+    async def endpoint(system: str, prompt: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, post, system, prompt)
+
+    return endpoint
+
+
+def anthropic_endpoint(settings: dict):
+    """Claude Messages API via the async anthropic client."""
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    import anthropic
+
+    if not os.environ.get('ANTHROPIC_API_KEY'):
+        raise RuntimeError(
+            "ANTHROPIC_API_KEY is not set — add it to your .env file"
+        )
+
+    client     = anthropic.AsyncAnthropic()
+    model      = settings.get('model')
+    max_tokens = settings.get('max_tokens', 4096)
+
+    async def endpoint(system: str, prompt: str) -> str:
+        message = await client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            system=system,
+            messages=[{'role': 'user', 'content': prompt}],
+        )
+        return ''.join(
+            block.text for block in message.content
+            if getattr(block, 'type', '') == 'text'
+        )
+
+    return endpoint
@@ -0,0 +1,205 @@
+# JCRUNCH module
+import asyncio
+import hashlib
+import json
+import os
+
+
+def fill_jobs(jobs: list, endpoint, settings: dict, cache_dir: str) -> tuple:
+    """
+    Fill AI columns for every row of every job.
+
+    jobs = [{
+        'job_id':       'Phase 1 — Taxonomy Audit',
+        'instructions': 'For each tag ...',
+        'fields':       ['Consolidation Suggestion', ...],  # outputs
+        'rows':         [{'row': 4, 'Tag ID': '...', ...}, ...],
+    }]
+
+    endpoint — async callable endpoint(system, prompt) -> str
+    settings — model, system, batch_size, max_concurrency,
+               requests_per_minute, retries (see config/ai_prompts.json)
+
+    Rows already answered in cache_dir are served from disk. Only the
+    remaining rows are batched and sent, concurrently, under the rate
+    limit. Returns ({job_id: {row: {field: value}}}, stats).
+    """
+    return asyncio.run(_fill_jobs(jobs, endpoint, settings, cache_dir))
+
+
+async def _fill_jobs(jobs, endpoint, settings, cache_dir):
+    results = {job['job_id']: {} for job in jobs}
+    stats   = {'rows': 0, 'cached': 0, 'filled': 0, 'calls': 0, 'failed': 0}
+
+    batch_size = max(1, int(settings.get('batch_size', 25)))
+    batches = []
+
+    for job in jobs:
+        pending = []
+        for row in job['rows']:
+            stats['rows'] += 1
+            key = _row_key(settings, job, row)
+            hit = _cache_get(cache_dir, key)
+            if hit is not None:
+                results[job['job_id']][row['row']] = hit
+                stats['cached'] += 1
+            else:
+                pending.append((key, row))
+
+        for i in range(0, len(pending), batch_size):
+            batches.append((job, pending[i:i + batch_size]))
+
+    if not batches:
+        return results, stats
+
+    semaphore = asyncio.Semaphore(
+        max(1, int(settings.get('max_concurrency', 4)))
+    )
+    throttle = _rate_limiter(settings.get('requests_per_minute', 0))
+
+    async def run_batch(job, batch):
+        prompt = build_prompt(job, [row for _, row in batch])
+        async with semaphore:
+            reply = await _call_with_retries(
+                endpoint, settings, prompt, throttle, stats
+            )
+        answers = parse_reply(reply, job['fields']) if reply else {}
+
+        for key, row in batch:
+            answer = answers.get(row['row'])
+            if answer is None:
+                stats['failed'] += 1
+                continue
+            results[job['job_id']][row['row']] = answer
+            _cache_put(cache_dir, key, answer)
+            stats['filled'] += 1
+
+    await asyncio.gather(*(run_batch(job, b) for job, b in batches))
+    return results, stats
+
+
+async def _call_with_retries(endpoint, settings, prompt, throttle, stats):
+    retries = int(settings.get('retries', 2))
+    system  = settings.get('system', '')
+    for attempt in range(retries + 1):
+        await throttle()
+        stats['calls'] += 1
+        try:
+            return await endpoint(system, prompt)
+        except Exception as e:
+            if attempt == retries:
+                print(f"   WARNING AI batch failed: {e}")
+                return None
+            await asyncio.sleep(2 ** attempt)
+    return None
+
+
+def build_prompt(job: dict, rows: list) -> str:
+    """
+    One prompt per batch. Rows go in as JSON lines keyed by their
+    sheet row number so replies can be matched back in any order.
+    """
+    fields = ', '.join(f'"{f}"' for f in job['fields'])
+    lines  = '\n'.join(
+        json.dumps(row, ensure_ascii=False, default=str) for row in rows
+    )
+    return (
+        f"{job['instructions']}\n\n"
+        f"Fill these columns for every row: {fields}\n\n"
+        f"Rows (one JSON object per line):\n{lines}\n\n"
+        f"Reply with only a JSON array, one object per row, each "
+        f"containing \"row\" and every column listed above."
+    )
+
+
+def parse_reply(reply: str, fields: list) -> dict:
+    """
+    Extract {row: {field: value}} from a model reply.
+    Tolerates prose or code fences around the JSON array.
+    """
+    start = reply.find('[')
+    end   = reply.rfind(']')
+    if start == -1 or end <= start:
+        return {}
+    try:
+        items = json.loads(reply[start:end + 1])
+    except ValueError:
+        return {}
+
+    answers = {}
+    for item in items:
+        if not isinstance(item, dict) or 'row' not in item:
+            continue
+        try:
+            row = int(item['row'])
+        except (TypeError, ValueError):
+            continue
+        answers[row] = {f: item.get(f, '') for f in fields}
+    return answers
+
+
+def _rate_limiter(requests_per_minute):
+    """
+    Returns an async wait() that spaces calls evenly at the given rate.
+    0 or None disables throttling.
+    """
+    interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+    lock     = asyncio.Lock()
+    state    = {'next': 0.0}
+
+    async def wait():
+        if not interval:
+            return
+        async with lock:
+            loop  = asyncio.get_running_loop()
+            delay = state['next'] - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            state['next'] = max(loop.time(), state['next']) + interval
+
+    return wait
+
+
+def _row_key(settings: dict, job: dict, row: dict) -> str:
+    """
+    Cache key — hash of everything that shapes the answer.
+    The sheet row number is excluded so re-sorted sheets still hit.
+    """
+    content = {k: v for k, v in row.items() if k != 'row'}
+    payload = json.dumps({
+        'model':        settings.get('model', ''),
+        'system':       settings.get('system', ''),
+        'instructions': job['instructions'],
+        'fields':       job['fields'],
+        'row':          content,
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    # Two-character shard keeps directories small on big workbooks
+    return os.path.join(cache_dir, key[:2], key + '.json')
+
+
+def _cache_get(cache_dir: str, key: str):
+    if not cache_dir:
+        return None
+    path = _cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_put(cache_dir: str, key: str, answer: dict):
+    if not cache_dir:
+        return
+    path = _cache_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(answer, f, ensure_ascii=False)
+    os.replace(tmp, path)
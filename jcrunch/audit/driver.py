@@ -0,0 +1,71 @@
+# JCRUNCH module
+
+# Phase → auditor modules. Phase 3 is extracted during the package walk
+PHASE_AUDITORS = {
+    '1': ['audit.tag_auditor'],
+    '2': ['audit.metadata_auditor', 'audit.reference_auditor'],
+    '4': ['audit.folder_auditor'],
+    '5': ['audit.namespace_auditor'],
+}
+
+# Record streams, in the order they are walked
+STREAMS = (
+    ('property',   'properties'),
+    ('node',       'nodes'),
+    ('assignment', 'tag_assignments'),
+)
+
+
+def auditors_for_phase(phase: str = 'all') -> list:
+    """AUDITOR specs enabled for --phase, in phase order."""
+    import importlib
+    return [
+        importlib.import_module(module).AUDITOR
+        for key, modules in PHASE_AUDITORS.items()
+        if phase in ('all', key)
+        for module in modules
+    ]
+
+
+def run_audits(harvest: dict, auditors: list):
+    """
+    Walk properties, nodes and tag assignments exactly once each and
+    hand every record to each enabled auditor's accumulator.
+
+    An auditor is a dict of callables:
+      'begin'(harvest) → state, or None to skip this auditor
+      'property' / 'node' / 'assignment'(state, record)   optional
+      'finish'(harvest, state)
+
+    Adding an auditor adds a callback per record, never another pass.
+    No database. No file writes. Mutates harvest dict only.
+    """
+    active = []
+    for auditor in auditors:
+        state = auditor['begin'](harvest)
+        if state is not None:
+            active.append((auditor, state))
+
+    for kind, key in STREAMS:
+        sinks = [
+            (auditor[kind], state)
+            for auditor, state in active
+            if kind in auditor
+        ]
+        if not sinks:
+            continue
+        records = harvest.get(key, {})
+        # Keyed dicts, or parser/spill.py's merged view once spilled
+        if hasattr(records, 'values'):
+            records = records.values()
+        if len(sinks) == 1:
+            feed, state = sinks[0]
+            for record in records:
+                feed(state, record)
+        else:
+            for record in records:
+                for feed, state in sinks:
+                    feed(state, record)
+
+    for auditor, state in active:
+        auditor['finish'](harvest, state)
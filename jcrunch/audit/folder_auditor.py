@@ -1,63 +1,88 @@
-import re
-
-
-METADATA_LIKE_ORIENTATIONS = {'landscape', 'portrait', 'square'}
-METADATA_LIKE_STATES       = {'approved', 'archive', 'archived'}
-METADATA_LIKE_COLORS       = {'color', 'colour'}
-METADATA_LIKE_REGIONS      = {
-    'north', 'south', 'east', 'west',
-    'apac', 'emea', 'nam', 'latam'
-}
+from audit.driver import run_audits
+from audit.folder_tree import (
+    build_folder_tree,
+    finish_rollup,
+    seed_node,
+    seed_storage,
+    start_rollup,
+)
+from audit.rules import get_folder_name_matcher, matches_name
+from audit.sampling import sample_fraction, scale_rows
 
 
 def run_folder_audit(harvest: dict):
     """
     Enriches harvest['folders'] in place.
-    Adds child_count, asset_count, is_metadata_like to every folder.
+    Adds child_count, asset_count, is_metadata_like, and the recursive
+    rollups total_descendants, subtree_depth, last_modified_rollup,
+    storage_bytes, storage_compressed, binary_count, original_bytes,
+    rendition_bytes (binary sizes from harvest['storage']).
+    The folder tree is indexed once and rolled up in a single
+    bottom-up pass (audit/folder_tree.py) — no prefix scans.
     No database. No file writes. Mutates harvest dict only.
     """
+    run_audits(harvest, [AUDITOR])
+
+
+def _begin(harvest: dict):
     folders = harvest.get('folders', {})
     if not folders:
         print("   [!] No folders found in harvest — skipping")
-        return
-
-    nodes = harvest.get('nodes', {})
-
-    # Pre-compute child counts
-    # Count how many folders list each path as their parent_folder
-    child_counts = {}
-    for f in folders.values():
-        parent = f.get('parent_folder', '')
-        if parent:
-            child_counts[parent] = child_counts.get(parent, 0) + 1
-
-    # Pre-compute asset counts per folder prefix
-    # dam:Asset nodes only
-    asset_counts = {}
-    for node in nodes.values():
-        if node.get('node_type') == 'dam:Asset':
-            node_path = node.get('path', '')
-            for folder_path in folders:
-                prefix = folder_path.rstrip('/') + '/'
-                if node_path.startswith(prefix):
-                    asset_counts[folder_path] = \
-                        asset_counts.get(folder_path, 0) + 1
+        return None
+
+    tree = build_folder_tree(folders)
+    harvest['folder_tree'] = tree
+    return start_rollup(tree)
+
+
+def _finish(harvest: dict, rollup: dict):
+    tree    = harvest['folder_tree']
+    folders = harvest['folders']
+    seed_storage(rollup, harvest.get('storage', {}))
+    rollup  = finish_rollup(rollup)
+
+    # Compile metadata-like rules once — config/audit_rules.json
+    matcher = get_folder_name_matcher()
 
     enriched = 0
-    for folder_path, folder in folders.items():
+    for fid, folder_path in enumerate(tree['paths']):
+        folder = folders[folder_path]
         folder_name = folder.get('folder_name', '')
 
         folder.update({
-            'child_count':      child_counts.get(folder_path, 0),
-            'asset_count':      asset_counts.get(folder_path, 0),
-            'is_metadata_like': _is_metadata_like(folder_name),
+            'child_count':          rollup['child_count'][fid],
+            'asset_count':          rollup['asset_count'][fid],
+            'is_metadata_like':     _is_metadata_like(folder_name, matcher),
+            'total_descendants':    rollup['total_descendants'][fid],
+            'subtree_depth':        rollup['subtree_depth'][fid],
+            'last_modified_rollup': rollup['last_modified'][fid],
+            'storage_bytes':        rollup['storage_bytes'][fid],
+            'storage_compressed':   rollup['storage_compressed'][fid],
+            'binary_count':         rollup['binary_count'][fid],
+            'original_bytes':       rollup['original_bytes'][fid],
+            'rendition_bytes':      rollup['rendition_bytes'][fid],
         })
         enriched += 1
 
+    # --sample: asset counts are the only sampled rollup — the tree,
+    # descendants and storage come from every entry name
+    scale_rows(folders.values(), 'asset_count', 'asset_count_ci',
+               sample_fraction(harvest))
+
     print(f"   [ok] Folder audit complete: {enriched} folders enriched")
 
 
-def _is_metadata_like(name: str) -> str:
+# Phase 4 accumulator — see audit/driver.py
+AUDITOR = {
+    'phase':  '4',
+    'name':   'folder',
+    'begin':  _begin,
+    'node':   seed_node,
+    'finish': _finish,
+}
+
+
+def _is_metadata_like(name: str, matcher: dict = None) -> str:
     """
     Returns 'Yes' if folder name matches a metadata-like pattern.
     Returns 'No' otherwise.
@@ -65,19 +90,10 @@ def _is_metadata_like(name: str) -> str:
     if not name:
         return 'No'
 
-    n = name.strip().lower()
+    if matcher is None:
+        matcher = get_folder_name_matcher()
 
-    if re.match(r'^\d+$', n):
-        return 'Yes'
-    if re.match(r'^q[1-4]$', n):
-        return 'Yes'
-    if n in METADATA_LIKE_ORIENTATIONS:
-        return 'Yes'
-    if n in METADATA_LIKE_STATES:
-        return 'Yes'
-    if n in METADATA_LIKE_COLORS:
-        return 'Yes'
-    if n in METADATA_LIKE_REGIONS:
+    if matches_name(matcher, name.strip().lower()):
         return 'Yes'
 
     return 'No'
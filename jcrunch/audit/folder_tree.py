@@ -0,0 +1,211 @@
+# JCRUNCH module
+from array import array
+
+# Rollup arrays fed from harvest['storage'], in its list order
+STORAGE_COLUMNS = ('storage_bytes', 'storage_compressed', 'binary_count',
+                   'original_bytes', 'rendition_bytes')
+
+
+def build_folder_tree(folders: dict) -> dict:
+    """
+    Index harvest['folders'] as an integer-id tree, built once.
+
+    Folder ids follow sorted path order, so every ancestor has a smaller
+    id than its descendants: walking ids high → low visits children
+    before parents (a post-order for rollups), low → high visits
+    parents first.
+
+    A folder's tree parent is its nearest ancestor present in the
+    harvest, so gaps (paths with no .content.xml) never split the tree.
+
+    tree = {
+        'paths':       [folder_path, ...],     # id → path
+        'ids':         {folder_path: id},
+        'parent':      array('i'),             # id → parent id, -1 = root
+        'direct':      array('b'),             # 1 if parent is the exact
+                                               #   parent_folder
+        'child_start': array('i'),             # CSR adjacency: children of
+        'child_ids':   array('i'),             #   i are child_ids[start[i]:
+                                               #   start[i + 1]]
+    }
+    """
+    paths = sorted(folders)
+    ids   = {path: i for i, path in enumerate(paths)}
+    n     = len(paths)
+
+    parent = array('i', [-1]) * n
+    direct = array('b', [0]) * n
+    for i, path in enumerate(paths):
+        declared = folders[path].get('parent_folder', '')
+        pid = ids.get(declared) if declared else None
+        if pid is not None:
+            parent[i] = pid
+            direct[i] = 1
+            continue
+        parent[i] = _nearest_ancestor(path, ids)
+
+    # Counting sort on parent id → CSR child lists
+    child_start = array('i', [0]) * (n + 1)
+    for pid in parent:
+        if pid >= 0:
+            child_start[pid + 1] += 1
+    for i in range(n):
+        child_start[i + 1] += child_start[i]
+    fill      = array('i', child_start)
+    child_ids = array('i', [0]) * child_start[n]
+    for i, pid in enumerate(parent):
+        if pid >= 0:
+            child_ids[fill[pid]] = i
+            fill[pid] += 1
+
+    return {
+        'paths':       paths,
+        'ids':         ids,
+        'parent':      parent,
+        'direct':      direct,
+        'child_start': child_start,
+        'child_ids':   child_ids,
+    }
+
+
+def folder_children(tree: dict, folder_id: int):
+    start = tree['child_start']
+    return tree['child_ids'][start[folder_id]:start[folder_id + 1]]
+
+
+def owning_folder(tree: dict, path: str, strict: bool = False) -> int:
+    """
+    Id of the folder a node path belongs to: the path itself if it is a
+    folder (unless strict), else its nearest ancestor folder. -1 if none.
+    """
+    if not strict:
+        fid = tree['ids'].get(path)
+        if fid is not None:
+            return fid
+    return _nearest_ancestor(path, tree['ids'])
+
+
+def rollup_folders(tree: dict, nodes: dict) -> dict:
+    """
+    One bottom-up pass over the tree.
+
+    Returns per-folder arrays (indexed by folder id):
+      child_count        direct child folders (exact parent_folder)
+      asset_count        dam:Asset nodes anywhere below the folder
+      total_descendants  folders anywhere below the folder
+      subtree_depth      levels below the folder (0 = leaf)
+      last_modified      newest last_modified in the subtree ('' if none)
+      storage_bytes      binary bytes in the subtree (uncompressed)
+      storage_compressed binary bytes in the subtree as stored in the zip
+      binary_count       binary files in the subtree
+      original_bytes     bytes of original renditions in the subtree
+      rendition_bytes    bytes of all other renditions in the subtree
+    """
+    rollup = start_rollup(tree)
+    for node in nodes.values():
+        seed_node(rollup, node)
+    return finish_rollup(rollup)
+
+
+def start_rollup(tree: dict) -> dict:
+    """Empty per-folder arrays, ready for seed_node()."""
+    n = len(tree['paths'])
+    return {
+        'tree':              tree,
+        'child_count':       array('i', [0]) * n,
+        'asset_count':       array('i', [0]) * n,
+        'total_descendants': array('i', [0]) * n,
+        'subtree_depth':     array('i', [0]) * n,
+        'last_modified':     [''] * n,
+        'storage_bytes':      array('q', [0]) * n,
+        'storage_compressed': array('q', [0]) * n,
+        'binary_count':       array('q', [0]) * n,
+        'original_bytes':     array('q', [0]) * n,
+        'rendition_bytes':    array('q', [0]) * n,
+    }
+
+
+def seed_node(rollup: dict, node: dict):
+    """Credit one node to the folder that owns it directly."""
+    tree = rollup['tree']
+    path = node.get('path', '')
+    if node.get('node_type') == 'dam:Asset':
+        fid = owning_folder(tree, path, strict=True)
+        if fid >= 0:
+            rollup['asset_count'][fid] += 1
+    stamp = _timestamp(node.get('last_modified'))
+    if stamp:
+        fid = owning_folder(tree, _folder_of(path))
+        if fid >= 0 and stamp > rollup['last_modified'][fid]:
+            rollup['last_modified'][fid] = stamp
+
+
+def seed_storage(rollup: dict, storage: dict):
+    """Credit harvest['storage'] totals to the folders that own them."""
+    tree = rollup['tree']
+    columns = [rollup[key] for key in STORAGE_COLUMNS]
+    for owner, totals in storage.items():
+        fid = owning_folder(tree, owner)
+        if fid < 0:
+            continue
+        for column, value in zip(columns, totals):
+            column[fid] += value
+
+
+def finish_rollup(rollup: dict) -> dict:
+    """Push the seeded values up the tree. Returns the rollup arrays."""
+    tree          = rollup.pop('tree')
+    parent        = tree['parent']
+    direct        = tree['direct']
+    child_count   = rollup['child_count']
+    asset_count   = rollup['asset_count']
+    descendants   = rollup['total_descendants']
+    subtree_depth = rollup['subtree_depth']
+    last_modified = rollup['last_modified']
+    sums = [rollup[key] for key in STORAGE_COLUMNS]
+
+    # Children have larger ids than parents — high → low is bottom-up
+    for i in range(len(parent) - 1, -1, -1):
+        pid = parent[i]
+        if pid < 0:
+            continue
+        if direct[i]:
+            child_count[pid] += 1
+        asset_count[pid] += asset_count[i]
+        descendants[pid] += descendants[i] + 1
+        if subtree_depth[i] + 1 > subtree_depth[pid]:
+            subtree_depth[pid] = subtree_depth[i] + 1
+        if last_modified[i] > last_modified[pid]:
+            last_modified[pid] = last_modified[i]
+        for column in sums:
+            column[pid] += column[i]
+
+    return rollup
+
+
+def _nearest_ancestor(path: str, ids: dict) -> int:
+    if path == '/':
+        return -1
+    while '/' in path.lstrip('/'):
+        path = path.rsplit('/', 1)[0]
+        fid = ids.get(path)
+        if fid is not None:
+            return fid
+    # Package rooted at jcr_root/ itself — '/' is everyone's ancestor
+    return ids.get('/', -1)
+
+
+def _folder_of(path: str) -> str:
+    if '/jcr:content' in path:
+        return path.split('/jcr:content')[0]
+    return path
+
+
+def _timestamp(value) -> str:
+    """Strip Vault type hints like {Date} so ISO strings compare."""
+    if not value:
+        return ''
+    value = str(value)
+    if value.startswith('{'):
+        value = value[value.find('}') + 1:]
+    return value
@@ -0,0 +1,189 @@
+# JCRUNCH module
+import hashlib
+
+from parser.assignments import as_columns
+
+# Node record fields that take part in the content hash
+NODE_FIELDS = ('node_type', 'resource_type', 'template', 'last_modified',
+               'last_modified_by')
+
+# Compared per tag / namespace — the parsed fields, not audit output
+TAG_FIELDS       = ('tag_title', 'description')
+NAMESPACE_FIELDS = ('prefix',)
+
+# Tag assignments are diffed as if they were one multi-value property
+TAGS_FIELD = 'cq:tags'
+
+DIFF_TABLES = ('nodes', 'properties', 'tags', 'namespaces')
+
+# Field separators inside a node hash — never found in parsed XML text
+_FIELD_SEP = b'\x1f'
+_VALUE_SEP = b'\x1e'
+
+
+def diff_harvests(old: dict, new: dict) -> dict:
+    """
+    Release-over-release diff of two harvests:
+
+      diff = {
+          'rows':    [{'table', 'path', 'field', 'change', 'old', 'new'}],
+          'summary': {table: {'added': n, 'removed': n, 'changed': n}},
+      }
+
+    Every node is reduced to one content hash (its node fields, sorted
+    properties and sorted tags) and the two node sets are merge-joined
+    in path order. Properties are compared only under nodes whose hash
+    differs, so unchanged content costs one hash per node — the run is
+    linear in package size. Added and removed nodes are reported as
+    one node row, not a row per property.
+    No database. No file writes. Reads both harvest dicts only.
+    """
+    rows = []
+    summary = {table: {'added': 0, 'removed': 0, 'changed': 0}
+               for table in DIFF_TABLES}
+
+    def emit(table, path, field, change, old_value='', new_value=''):
+        summary[table][change] += 1
+        rows.append({'table': table, 'path': path, 'field': field,
+                     'change': change, 'old': _cell(old_value),
+                     'new': _cell(new_value)})
+
+    old_index = node_index(old)
+    new_index = node_index(new)
+    for path, a, b in merge_join(old_index, new_index):
+        if b is None:
+            emit('nodes', path, '', 'removed')
+        elif a is None:
+            emit('nodes', path, '', 'added')
+        elif a['hash'] != b['hash']:
+            fields = _changed_fields(old['nodes'][path], new['nodes'][path],
+                                     NODE_FIELDS)
+            changed = _diff_properties(emit, path, a, b)
+            if changed:
+                fields.append(f'{changed} properties')
+            emit('nodes', path, ', '.join(fields), 'changed')
+
+    for table, fields in (('tags', TAG_FIELDS),
+                          ('namespaces', NAMESPACE_FIELDS)):
+        for key, a, b in merge_join(old.get(table, {}), new.get(table, {})):
+            if b is None:
+                emit(table, key, '', 'removed')
+            elif a is None:
+                emit(table, key, '', 'added')
+            else:
+                for field in _changed_fields(a, b, fields):
+                    emit(table, key, field, 'changed',
+                         a.get(field), b.get(field))
+
+    return {'rows': rows, 'summary': summary}
+
+
+def node_index(harvest: dict) -> dict:
+    """
+    {jcr_path: {'hash', 'properties', 'tags'}} — 'properties' maps each
+    full_name to its value, 'tags' is the sorted tag references. One
+    pass over properties and one over the assignment columns.
+    """
+    index = {}
+    for path, node in harvest.get('nodes', {}).items():
+        index[path] = {'node': node, 'properties': {}, 'tags': ()}
+
+    for (path, full_name), prop in harvest.get('properties', {}).items():
+        entry = index.get(path)
+        if entry is not None:
+            entry['properties'][full_name] = prop.get('value')
+
+    columns = as_columns(harvest.get('tag_assignments', []))
+    tags = {}
+    for path_id, ref_id in zip(columns['node'], columns['tag']):
+        tags.setdefault(path_id, []).append(columns['refs'][ref_id])
+    for path_id, refs in tags.items():
+        entry = index.get(columns['paths'][path_id])
+        if entry is not None:
+            entry['tags'] = tuple(sorted(refs))
+
+    for entry in index.values():
+        entry['hash'] = _node_hash(entry.pop('node'), entry['properties'],
+                                   entry['tags'])
+    return index
+
+
+def merge_join(old: dict, new: dict):
+    """
+    Yield (key, old value or None, new value or None) for every key of
+    either dict, in key order. Harvest dicts fill in zip entry order,
+    which packages already keep sorted, so the sorts are near-linear
+    runs for Timsort.
+    """
+    old_keys = sorted(old)
+    new_keys = sorted(new)
+    i = j = 0
+    while i < len(old_keys) and j < len(new_keys):
+        a, b = old_keys[i], new_keys[j]
+        if a == b:
+            yield a, old[a], new[b]
+            i += 1
+            j += 1
+        elif a < b:
+            yield a, old[a], None
+            i += 1
+        else:
+            yield b, None, new[b]
+            j += 1
+    for a in old_keys[i:]:
+        yield a, old[a], None
+    for b in new_keys[j:]:
+        yield b, None, new[b]
+
+
+def _diff_properties(emit, path: str, a: dict, b: dict) -> int:
+    """Property and tag rows for one changed node. Returns how many."""
+    old_props = dict(a['properties'])
+    new_props = dict(b['properties'])
+    if a['tags'] != b['tags']:
+        if a['tags']:
+            old_props[TAGS_FIELD] = ', '.join(a['tags'])
+        if b['tags']:
+            new_props[TAGS_FIELD] = ', '.join(b['tags'])
+
+    changed = 0
+    for field, old_value, new_value in merge_join(old_props, new_props):
+        if field not in new_props:
+            change = 'removed'
+        elif field not in old_props:
+            change = 'added'
+        elif old_value != new_value:
+            change = 'changed'
+        else:
+            continue
+        emit('properties', path, field, change, old_value, new_value)
+        changed += 1
+    return changed
+
+
+def _changed_fields(a: dict, b: dict, fields) -> list:
+    return [field for field in fields if a.get(field) != b.get(field)]
+
+
+def _node_hash(node: dict, properties: dict, tags: tuple) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for field in NODE_FIELDS:
+        h.update(_encode(node.get(field)))
+        h.update(_FIELD_SEP)
+    for full_name in sorted(properties):
+        h.update(full_name.encode())
+        h.update(_VALUE_SEP)
+        h.update(_encode(properties[full_name]))
+        h.update(_FIELD_SEP)
+    for ref in tags:
+        h.update(ref.encode())
+        h.update(_FIELD_SEP)
+    return h.digest()
+
+
+def _encode(value) -> bytes:
+    return b'' if value is None else str(value).encode()
+
+
+def _cell(value) -> str:
+    return '' if value is None else str(value)
@@ -1,5 +1,16 @@
 import re
 
+from audit.driver import run_audits
+from audit.sampling import sample_fraction, scale_rows
+from audit.sketches import (
+    HLL_ERROR,
+    add_value,
+    distinct_estimate,
+    is_exact,
+    new_value_profile,
+    top_values,
+)
+
 
 # Namespaces that are system-managed in AEM
 SYSTEM_NAMESPACES = {
@@ -7,57 +18,67 @@ SYSTEM_NAMESPACES = {
     'rep', 'nt', 'mix', 'vlt', 'cq'
 }
 
+# Most common values listed per field, and their display length
+TOP_VALUES_SHOWN = 5
+TOP_VALUE_CHARS  = 40
+
 
 def run_metadata_audit(harvest: dict):
     """
     Aggregates harvest['properties'] into harvest['metadata_fields'].
     Each unique full_name becomes one metadata field row.
-    Computes: data_type, is_system_managed, usage_count, anomaly_flags.
+    Computes: data_type, is_system_managed, usage_count, anomaly_flags,
+    and per-field value profiles (audit/sketches.py): distinct_values,
+    top_values, distinct_method.
     No database. No file writes. Mutates harvest dict only.
     """
-    properties = harvest.get('properties', {})
-    if not properties:
+    run_audits(harvest, [AUDITOR])
+
+
+def _begin(harvest: dict):
+    if not harvest.get('properties'):
         print("   [!] No properties found in harvest — skipping")
         harvest['metadata_fields'] = {}
-        return
+        return None
 
     # Aggregate — one entry per unique full_name
-    # Track: node paths that use it, all values seen
-    aggregated = {}  # {full_name: {namespace, name, node_paths, values}}
+    # Track: node count, first non-blank value, bounded value profile
+    return {}  # {full_name: {namespace, usage, sample, profile}}
 
-    for prop in properties.values():
-        full_name  = prop.get('full_name', '')
-        namespace  = prop.get('namespace', '')
-        name       = prop.get('name', '')
-        value      = prop.get('value', '')
-        jcr_path   = prop.get('jcr_path', '')
 
-        if not full_name:
-            continue
+def _add_property(aggregated: dict, prop: dict):
+    full_name = prop.get('full_name', '')
+    if not full_name:
+        return
+
+    agg = aggregated.get(full_name)
+    if agg is None:
+        agg = aggregated[full_name] = {
+            'namespace':  prop.get('namespace', ''),
+            'usage':      0,
+            'sample':     None,
+            'profile':    new_value_profile(),
+        }
 
-        if full_name not in aggregated:
-            aggregated[full_name] = {
-                'full_name':  full_name,
-                'namespace':  namespace,
-                'name':       name,
-                'node_paths': set(),
-                'values':     [],
-            }
+    # Properties are keyed by (jcr_path, full_name) — one per node
+    agg['usage'] += 1
+    value = prop.get('value', '')
+    add_value(agg['profile'], value)
+    if agg['sample'] is None and value and str(value).strip():
+        agg['sample'] = value
 
-        aggregated[full_name]['node_paths'].add(jcr_path)
-        if value:
-            aggregated[full_name]['values'].append(value)
 
-    # Build metadata_fields dict
+def _finish(harvest: dict, aggregated: dict):
     metadata_fields = {}
 
     for full_name, agg in aggregated.items():
         namespace   = agg['namespace']
-        usage_count = len(agg['node_paths'])
+        usage_count = agg['usage']
+        profile     = agg['profile']
 
-        # Infer data type from sampled values
-        sample_values = agg['values']
-        data_type = _infer_data_type(sample_values)
+        # Infer data type from the first non-blank value
+        sample = agg['sample']
+        data_type = _infer_data_type([sample] if sample is not None else [])
 
         # System managed flag
         is_system = 'Yes' if namespace in SYSTEM_NAMESPACES else 'No'
@@ -77,13 +98,28 @@ def run_metadata_audit(harvest: dict):
             'is_system_managed':    is_system,
             'current_usage_count':  usage_count,
             'anomaly_flags':        anomaly_flags,
+            'distinct_values':      distinct_estimate(profile),
+            'top_values':           _format_top_values(profile),
+            'distinct_method':      _distinct_method(profile),
         }
 
+    scale_rows(metadata_fields.values(), 'current_usage_count', 'usage_ci',
+               sample_fraction(harvest))
     harvest['metadata_fields'] = metadata_fields
     print(f"   [ok] Metadata audit complete: "
           f"{len(metadata_fields)} unique fields aggregated")
 
 
+# Phase 2 accumulator — see audit/driver.py
+AUDITOR = {
+    'phase':    '2',
+    'name':     'metadata',
+    'begin':    _begin,
+    'property': _add_property,
+    'finish':   _finish,
+}
+
+
 def _infer_data_type(values: list) -> str:
     """
     Infer data type from a list of observed values.
@@ -108,3 +144,20 @@ def _infer_data_type(values: list) -> str:
         return 'String'
 
     return 'String'
+
+
+def _format_top_values(profile: dict) -> str:
+    """'value (count), ...' — counts prefixed ~ when sketched."""
+    mark = '' if is_exact(profile) else '~'
+    parts = []
+    for value, count in top_values(profile, TOP_VALUES_SHOWN):
+        if len(value) > TOP_VALUE_CHARS:
+            value = value[:TOP_VALUE_CHARS - 3] + '...'
+        parts.append(f'{value} ({mark}{count})')
+    return ', '.join(parts)
+
+
+def _distinct_method(profile: dict) -> str:
+    if is_exact(profile):
+        return 'Exact'
+    return f'Estimated (±{HLL_ERROR:.1%})'
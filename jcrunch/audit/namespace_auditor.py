@@ -1,38 +1,58 @@
+from audit.driver import run_audits
+from audit.rules import classify_uri, get_namespace_classifier
+
+
+# Derived Phase 5 columns per namespace type — computed once per type
+_PROFILE_CACHE = {}
+
+
 def run_namespace_audit(harvest: dict):
     """
     Enriches harvest['namespaces'] in place.
     Adds all derived columns needed by Phase 5 workbook sheet.
     No database. No file writes. Mutates harvest dict only.
     """
-    namespaces = harvest.get('namespaces', {})
-    if not namespaces:
+    run_audits(harvest, [AUDITOR])
+
+
+def _begin(harvest: dict):
+    if not harvest.get('namespaces'):
         print("   [!] No namespaces found in harvest — skipping")
+        return None
+
+    # Property usage counts per namespace prefix
+    return {
+        'field_counts': {},   # {prefix: int}
+        'field_names':  {},   # {prefix: set of field names}
+    }
+
+
+def _add_property(state: dict, prop: dict):
+    prefix = prop.get('namespace', '')
+    if not prefix:
         return
+    counts = state['field_counts']
+    counts[prefix] = counts.get(prefix, 0) + 1
+    names = state['field_names'].get(prefix)
+    if names is None:
+        names = state['field_names'][prefix] = set()
+    names.add(prop.get('name', ''))
+
 
-    # Pre-compute property usage counts per namespace prefix
-    # harvest['properties'] is a dict keyed by (jcr_path, full_name)
-    prefix_field_counts  = {}   # {prefix: int}
-    prefix_field_names   = {}   # {prefix: set of field names}
-
-    for prop in harvest.get('properties', {}).values():
-        prefix = prop.get('namespace', '')
-        name   = prop.get('name', '')
-        if prefix:
-            prefix_field_counts[prefix] = \
-                prefix_field_counts.get(prefix, 0) + 1
-            if prefix not in prefix_field_names:
-                prefix_field_names[prefix] = set()
-            prefix_field_names[prefix].add(name)
+def _finish(harvest: dict, state: dict):
+    prefix_field_counts = state['field_counts']
+    prefix_field_names  = state['field_names']
+
+    # Compile namespace_map.json once per process — automaton and memo
+    # cache are module state
+    classifier = get_namespace_classifier()
 
     enriched = 0
-    for uri, ns in namespaces.items():
+    for uri, ns in harvest['namespaces'].items():
         prefix = ns.get('prefix', '')
 
-        ns_type  = _classify_type(uri)
-        support  = _classify_support(ns_type)
-        strategy = _classify_strategy(support)
-        effort   = _classify_effort(strategy)
-        timeline = _classify_timeline(effort)
+        ns_type = _classify_type(uri, classifier)
+        profile = _namespace_profile(ns_type)
 
         # used_in — count of properties using this prefix
         count   = prefix_field_counts.get(prefix, 0)
@@ -48,10 +68,10 @@ def run_namespace_audit(harvest: dict):
         ns.update({
             'namespace_id':        prefix,
             'namespace_type':      ns_type,
-            'cloud_support':       support,
-            'migration_strategy':  strategy,
-            'effort':              effort,
-            'timeline_days':       timeline,
+            'cloud_support':       profile['cloud_support'],
+            'migration_strategy':  profile['migration_strategy'],
+            'effort':              profile['effort'],
+            'timeline_days':       profile['timeline_days'],
             'used_in':             used_in,
             'fields_in_namespace': fields_str,
         })
@@ -60,21 +80,41 @@ def run_namespace_audit(harvest: dict):
     print(f"   [ok] Namespace audit complete: {enriched} namespaces enriched")
 
 
-def _classify_type(uri: str) -> str:
-    uri_lower = uri.lower()
-    if any(t in uri_lower for t in
-           ['jcr', 'oak', 'sling', 'granite', 'day.com/jcr']):
-        return 'System (Repo)'
-    if any(t in uri_lower for t in
-           ['w3.org', 'purl.org', 'iptc', 'cipa', 'prism']):
-        return 'Standard'
-    if 'adobe' in uri_lower:
-        return 'Vendor (Adobe)'
-    if 'microsoft' in uri_lower:
-        return 'Vendor (Microsoft)'
-    if 'apple' in uri_lower:
-        return 'Vendor (Apple)'
-    return 'Custom'
+# Phase 5 accumulator — see audit/driver.py
+AUDITOR = {
+    'phase':    '5',
+    'name':     'namespace',
+    'begin':    _begin,
+    'property': _add_property,
+    'finish':   _finish,
+}
+
+
+def _classify_type(uri: str, classifier: dict = None) -> str:
+    """
+    Exact URI → longest prefix → substring terms → default.
+    Tables live in config/namespace_map.json.
+    """
+    if classifier is None:
+        classifier = get_namespace_classifier()
+    return classify_uri(classifier, uri)
+
+
+def _namespace_profile(namespace_type: str) -> dict:
+    """Support → strategy → effort → timeline chain, once per type."""
+    profile = _PROFILE_CACHE.get(namespace_type)
+    if profile is None:
+        support  = _classify_support(namespace_type)
+        strategy = _classify_strategy(support)
+        effort   = _classify_effort(strategy)
+        profile  = {
+            'cloud_support':      support,
+            'migration_strategy': strategy,
+            'effort':             effort,
+            'timeline_days':      _classify_timeline(effort),
+        }
+        _PROFILE_CACHE[namespace_type] = profile
+    return profile
 
 
 def _classify_support(namespace_type: str) -> str:
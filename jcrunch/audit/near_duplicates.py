@@ -0,0 +1,199 @@
+# JCRUNCH module
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from hashlib import blake2b
+
+# MinHash signature = LSH_BANDS bands of LSH_ROWS hashes. 16 x 3 makes
+# a pair with Jaccard 0.6 a candidate ~98% of the time, 0.3 ~35%.
+# Fewer rows per band floods the buckets — unrelated titles still
+# share common trigrams
+LSH_BANDS  = 16
+LSH_ROWS   = 3
+NUM_HASHES = LSH_BANDS * LSH_ROWS
+
+# Character n-grams of the padded, normalised title
+SHINGLE_SIZE = 3
+
+# Verified Jaccard needed to join a cluster ("cycling" ~ "bicycling" = 0.6)
+SIMILARITY_THRESHOLD = 0.6
+
+# Buckets larger than this only compare members to the first one —
+# keeps pathological buckets from going quadratic
+MAX_BUCKET = 200
+
+# Each blake2b person string yields 16 independent 32-bit hashes
+_PERSONS = [f'jcrunch{i}'.encode() for i in range(-(-NUM_HASHES // 16))]
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def find_near_duplicates(titles: dict, weights: dict = None,
+                         threshold: float = SIMILARITY_THRESHOLD) -> dict:
+    """
+    Cluster tags whose titles are near-duplicates in near-linear time.
+
+    titles:  {tag_id: title}
+    weights: {tag_id: number} — heaviest member names the cluster
+             (ties → smallest tag_id)
+
+    Titles are normalised first, so "Cycling" / "cycling " collapse
+    exactly. Distinct normalised titles are then MinHashed over
+    character shingles, banded into LSH buckets, and candidate pairs
+    verified with the exact shingle Jaccard before being merged.
+
+    Returns {tag_id: {'cluster', 'cluster_size', 'similarity'}} for tags
+    in clusters of two or more; similarity is the best verified Jaccard
+    with another member (1.0 for exact normalised matches).
+    """
+    weights = weights or {}
+
+    # One entry per distinct normalised title
+    norm_ids = {}
+    members  = []
+    for tag_id, title in titles.items():
+        norm = normalise_title(title)
+        if not norm:
+            continue
+        uid = norm_ids.get(norm)
+        if uid is None:
+            uid = norm_ids[norm] = len(members)
+            members.append([])
+        members[uid].append(tag_id)
+
+    n = len(members)
+    shingle_sets = [shingles(norm) for norm in norm_ids]
+    similarity = array('d', [0.0]) * n
+    for uid in range(n):
+        if len(members[uid]) > 1:
+            similarity[uid] = 1.0
+
+    # LSH banding — every title gets LSH_BANDS band keys, stored as
+    # 64-bit hashes in one flat array (row per title, column per band)
+    vectors = {}
+    band_keys = array('q')
+    for shingle_set in shingle_sets:
+        signature = minhash(shingle_set, vectors)
+        band_keys.extend(map(hash, zip(
+            *(signature[row::LSH_ROWS] for row in range(LSH_ROWS))
+        )))
+    vectors.clear()
+
+    parent = list(range(n))
+    checked = set()
+    for band in range(LSH_BANDS):
+        keys = band_keys[band::LSH_BANDS]
+        shared = {key for key, count in Counter(keys).items() if count > 1}
+        if not shared:
+            continue
+        buckets = {}
+        for uid, key in enumerate(keys):
+            if key in shared:
+                buckets.setdefault(key, []).append(uid)
+
+        for bucket in buckets.values():
+            for a, b in _bucket_pairs(bucket):
+                pair = (a, b) if a < b else (b, a)
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                score = jaccard(shingle_sets[a], shingle_sets[b])
+                if score < threshold:
+                    continue
+                _union(parent, a, b)
+                if score > similarity[a]:
+                    similarity[a] = score
+                if score > similarity[b]:
+                    similarity[b] = score
+
+    # Expand distinct titles back to tags
+    clusters = {}
+    for uid in range(n):
+        clusters.setdefault(_find(parent, uid), []).append(uid)
+
+    result = {}
+    for uids in clusters.values():
+        tag_ids = [tag_id for uid in uids for tag_id in members[uid]]
+        if len(tag_ids) < 2:
+            continue
+        leader = min(tag_ids, key=lambda t: (-weights.get(t, 0), t))
+        for uid in uids:
+            for tag_id in members[uid]:
+                result[tag_id] = {
+                    'cluster':      leader,
+                    'cluster_size': len(tag_ids),
+                    'similarity':   round(similarity[uid], 2),
+                }
+    return result
+
+
+def normalise_title(title) -> str:
+    """Lower-case, accents stripped, punctuation → single spaces."""
+    if not title:
+        return ''
+    text = unicodedata.normalize('NFKD', str(title))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+def shingles(norm: str) -> frozenset:
+    padded = f' {norm} '
+    if len(padded) <= SHINGLE_SIZE:
+        return frozenset([padded])
+    return frozenset(
+        padded[i:i + SHINGLE_SIZE]
+        for i in range(len(padded) - SHINGLE_SIZE + 1)
+    )
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+def minhash(shingle_set: frozenset, vectors: dict) -> tuple:
+    """
+    NUM_HASHES-wide MinHash signature. Each shingle's hash vector is
+    computed once and cached in `vectors`; the signature is then one
+    elementwise min across the title's vectors.
+    """
+    rows = []
+    for shingle in shingle_set:
+        vector = vectors.get(shingle)
+        if vector is None:
+            vector = vectors[shingle] = _shingle_vector(shingle)
+        rows.append(vector)
+    return tuple(map(min, zip(*rows)))
+
+
+def _shingle_vector(shingle: str) -> tuple:
+    data = shingle.encode('utf-8', 'surrogatepass')
+    raw = b''.join(
+        blake2b(data, digest_size=64, person=person).digest()
+        for person in _PERSONS
+    )
+    return tuple(array('I', raw)[:NUM_HASHES])
+
+
+def _bucket_pairs(bucket: list):
+    if len(bucket) > MAX_BUCKET:
+        leader = bucket[0]
+        for other in bucket[1:]:
+            yield leader, other
+        return
+    for i, a in enumerate(bucket):
+        for b in bucket[i + 1:]:
+            yield a, b
+
+
+def _find(parent: list, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _union(parent: list, a: int, b: int):
+    ra, rb = _find(parent, a), _find(parent, b)
+    if ra != rb:
+        parent[max(ra, rb)] = min(ra, rb)
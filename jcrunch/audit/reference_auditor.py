@@ -0,0 +1,83 @@
+# JCRUNCH module
+from audit.driver import run_audits
+from parser.reference_index import reference_target, resolve_reference
+
+
+def run_reference_audit(harvest: dict):
+    """
+    Checks every path-valued property against harvest['reference_index'].
+    Builds harvest['broken_references'] (missing targets inside the
+    package's filter roots) and harvest['inbound_references']
+    ({node_path: row} for every referenced path, most referenced first).
+    No database. No file writes. Mutates harvest dict only.
+    """
+    run_audits(harvest, [AUDITOR])
+
+
+def _begin(harvest: dict):
+    index = harvest.get('reference_index')
+    if not index or not index.get('paths'):
+        print("   [!] No reference index in harvest — skipping")
+        harvest['broken_references'] = {}
+        harvest['inbound_references'] = {}
+        return None
+    return {
+        'index':    index,
+        'inbound':  {},   # {resolved target: count}
+        'broken':   {},   # {target: report row}
+        'checked':  0,
+        'external': 0,
+    }
+
+
+def _add_property(state: dict, prop: dict):
+    target = reference_target(prop.get('value'))
+    if not target:
+        return
+    state['checked'] += 1
+
+    status, path = resolve_reference(state['index'], target)
+    if status == 'ok':
+        inbound = state['inbound']
+        inbound[path] = inbound.get(path, 0) + 1
+    elif status == 'broken':
+        row = state['broken'].get(path)
+        if row is None:
+            state['broken'][path] = {
+                'target_path':      path,
+                'reference_count':  1,
+                'example_source':   prop.get('jcr_path', ''),
+                'example_property': prop.get('full_name', ''),
+            }
+        else:
+            row['reference_count'] += 1
+    else:
+        state['external'] += 1
+
+
+def _finish(harvest: dict, state: dict):
+    nodes = harvest.get('nodes', {})
+    harvest['broken_references']  = state['broken']
+    harvest['inbound_references'] = {
+        path: {
+            'node_path':       path,
+            'reference_count': count,
+            'node_type':       nodes.get(path, {}).get('node_type', ''),
+        }
+        for path, count in sorted(state['inbound'].items(),
+                                  key=lambda item: (-item[1], item[0]))
+    }
+    print(f"   [ok] Reference audit complete: "
+          f"{state['checked']} references checked, "
+          f"{len(state['broken'])} broken targets, "
+          f"{state['external']} outside the package")
+
+
+# Runs alongside Phase 2 — see audit/driver.py
+AUDITOR = {
+    'phase':    '2',
+    'name':     'reference',
+    'begin':    _begin,
+    'property': _add_property,
+    'finish':   _finish,
+}
@@ -0,0 +1,332 @@
+# JCRUNCH module
+import json
+import os
+import re
+from collections import deque
+
+
+# Shipped rule set — copy and edit to customise without patching code
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'config', 'audit_rules.json'
+)
+
+# Namespace classification tables — exact URI, prefix, substring terms
+DEFAULT_NAMESPACE_MAP_PATH = os.path.join(
+    os.path.dirname(DEFAULT_RULES_PATH), 'namespace_map.json'
+)
+
+# Compiled plans are cached per config path — one compile per process
+_PLAN_CACHE = {}
+
+
+def load_rules(rules_path: str = None) -> dict:
+    """
+    Read the audit rule config. Missing or empty file returns {}.
+    rules_path defaults to config/audit_rules.json.
+    """
+    path = rules_path or DEFAULT_RULES_PATH
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f) or {}
+
+
+def get_tag_status_plan(rules_path: str = None) -> dict:
+    """
+    Compiled Phase 1 status plan, built once per config path.
+
+    plan = {
+        'rules':       [(status, test), ...],  # priority order
+        'cloud_notes': {status: note},
+    }
+
+    Each test is called as
+      test(tag_id, leaf, title, asset_count, title_counts, depth) -> bool
+    """
+    key = ('tag_status', rules_path or DEFAULT_RULES_PATH)
+    if key not in _PLAN_CACHE:
+        section = load_rules(rules_path).get('tag_status', [])
+        _PLAN_CACHE[key] = compile_tag_status_rules(section)
+    return _PLAN_CACHE[key]
+
+
+def get_folder_name_matcher(rules_path: str = None) -> dict:
+    """
+    Compiled Phase 4 metadata-like matcher, built once per config path.
+    matcher = {'pattern': compiled regex or None, 'keywords': frozenset}
+    """
+    key = ('folder_metadata_like', rules_path or DEFAULT_RULES_PATH)
+    if key not in _PLAN_CACHE:
+        section = load_rules(rules_path).get('folder_metadata_like', {})
+        _PLAN_CACHE[key] = compile_name_matcher(section)
+    return _PLAN_CACHE[key]
+
+
+def get_namespace_classifier(map_path: str = None) -> dict:
+    """
+    Compiled Phase 5 URI classifier, built once per config path.
+    Carries its own memo cache, so a URI seen in any earlier package
+    of the same process is classified with one dict lookup.
+    """
+    path = map_path or DEFAULT_NAMESPACE_MAP_PATH
+    key = ('namespace_map', path)
+    if key not in _PLAN_CACHE:
+        _PLAN_CACHE[key] = compile_namespace_map(load_rules(path))
+    return _PLAN_CACHE[key]
+
+
+def clear_rule_cache():
+    """Drop compiled plans — next lookup re-reads the config."""
+    _PLAN_CACHE.clear()
+
+
+def compile_tag_status_rules(rules: list) -> dict:
+    """
+    Turn a list of rule dicts into an ordered evaluation plan.
+    Rules are sorted by 'priority' (file order breaks ties).
+    Every regex is compiled here — never per tag.
+
+    Supported 'when' kinds:
+      missing_title               no title
+      leaf_matches   patterns     regex search on the leaf segment
+      id_matches     patterns     regex search on the full tag_id
+      id_has_word    keywords     whole-word match anywhere in tag_id
+      leaf_in        keywords     exact (lower-cased) leaf lookup
+      duplicate_title             title shared by more than one tag
+      usage_eq / usage_gt / usage_lt   value
+      depth_gt                    value
+      always                      default / catch-all
+
+    Usage rules may add "count": "subtree" to test the tag's usage
+    including every descendant tag instead of its own usage.
+    """
+    ordered = sorted(
+        enumerate(rules),
+        key=lambda pair: (pair[1].get('priority', pair[0]), pair[0])
+    )
+
+    plan = {'rules': [], 'cloud_notes': {}, 'subtree': set()}
+    for _, rule in ordered:
+        status = rule.get('status')
+        if not status:
+            continue
+        plan['rules'].append((status, _compile_tag_test(rule)))
+        if rule.get('count') == 'subtree':
+            plan['subtree'].add(status)
+        if rule.get('cloud_notes'):
+            plan['cloud_notes'][status] = rule['cloud_notes']
+    return plan
+
+
+def compile_name_matcher(section: dict) -> dict:
+    """
+    Merge every pattern group into one anchored alternation and every
+    keyword group into one frozenset. Names are lower-cased by callers.
+    """
+    patterns = []
+    for group in (section.get('patterns') or {}).values():
+        patterns.extend(group)
+
+    keywords = set()
+    for group in (section.get('keywords') or {}).values():
+        keywords.update(k.strip().lower() for k in group)
+
+    pattern = None
+    if patterns:
+        pattern = re.compile(
+            '(?:' + '|'.join(f'(?:{p})' for p in patterns) + r')\Z'
+        )
+    return {'pattern': pattern, 'keywords': frozenset(keywords)}
+
+
+def matches_name(matcher: dict, name: str) -> bool:
+    """True if a lower-cased name hits a keyword or the merged pattern."""
+    if name in matcher['keywords']:
+        return True
+    pattern = matcher['pattern']
+    return bool(pattern and pattern.match(name))
+
+
+def compile_namespace_map(config: dict) -> dict:
+    """
+    Compile namespace_map.json into lookup tables.
+
+    Resolution order for a lower-cased URI:
+      1. exact     {uri: type}                  dict lookup
+      2. prefix    {uri_prefix: type}           longest match, char trie
+      3. contains  [{type, terms}, ...]         Aho-Corasick, list order
+                                                is priority
+      4. default_type
+    """
+    exact = {
+        uri.lower(): ns_type
+        for uri, ns_type in (config.get('exact') or {}).items()
+    }
+
+    prefix_trie = {}
+    for prefix, ns_type in (config.get('prefix') or {}).items():
+        node = prefix_trie
+        for ch in prefix.lower():
+            node = node.setdefault(ch, {})
+        node[None] = ns_type
+
+    terms, term_ranks, rank_types = [], [], []
+    for rank, group in enumerate(config.get('contains') or []):
+        rank_types.append(group.get('type', 'Custom'))
+        for term in group.get('terms', []):
+            terms.append(term.lower())
+            term_ranks.append(rank)
+
+    return {
+        'exact':        exact,
+        'prefix_trie':  prefix_trie,
+        'automaton':    build_automaton(terms),
+        'term_ranks':   term_ranks,
+        'rank_types':   rank_types,
+        'default_type': config.get('default_type', 'Custom'),
+        'cache':        {},
+    }
+
+
+def classify_uri(classifier: dict, uri: str) -> str:
+    """Namespace type for a URI — memoised per classifier."""
+    cache = classifier['cache']
+    ns_type = cache.get(uri)
+    if ns_type is not None:
+        return ns_type
+
+    uri_lower = uri.lower()
+    ns_type = classifier['exact'].get(uri_lower)
+
+    if ns_type is None:
+        node = classifier['prefix_trie']
+        for ch in uri_lower:
+            node = node.get(ch)
+            if node is None:
+                break
+            ns_type = node.get(None, ns_type)
+
+    if ns_type is None:
+        hits = scan_automaton(classifier['automaton'], uri_lower)
+        if hits:
+            ranks = classifier['term_ranks']
+            best = min(ranks[i] for i in hits)
+            ns_type = classifier['rank_types'][best]
+
+    if ns_type is None:
+        ns_type = classifier['default_type']
+
+    cache[uri] = ns_type
+    return ns_type
+
+
+def build_automaton(terms: list) -> dict:
+    """
+    Aho-Corasick automaton over terms — one pass over the text finds
+    every term it contains, however many terms there are.
+    automaton = {'goto': [{ch: state}], 'fail': [state], 'out': [[idx]]}
+    """
+    goto, fail, out = [{}], [0], [[]]
+
+    for idx, term in enumerate(terms):
+        state = 0
+        for ch in term:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto.append({})
+                fail.append(0)
+                out.append([])
+                goto[state][ch] = nxt
+            state = nxt
+        out[state].append(idx)
+
+    # Breadth-first — a state's failure link is resolved before its children
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for ch, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[nxt] = goto[f].get(ch, 0)
+            out[nxt] = out[nxt] + out[fail[nxt]]
+
+    return {'goto': goto, 'fail': fail, 'out': out}
+
+
+def scan_automaton(automaton: dict, text: str) -> set:
+    """Indexes of every term found anywhere in text."""
+    goto, fail, out = automaton['goto'], automaton['fail'], automaton['out']
+    hits  = set()
+    state = 0
+    for ch in text:
+        while state and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        if out[state]:
+            hits.update(out[state])
+    return hits
+
+
+def _compile_tag_test(rule: dict):
+    when  = rule.get('when', 'always')
+    flags = re.IGNORECASE if rule.get('ignore_case') else 0
+
+    if when == 'missing_title':
+        return lambda tag_id, leaf, title, count, titles, depth: not title
+
+    if when in ('leaf_matches', 'id_matches'):
+        if not rule.get('patterns'):
+            return _never
+        merged = re.compile(
+            '|'.join(f'(?:{p})' for p in rule.get('patterns', [])),
+            flags
+        )
+        if when == 'leaf_matches':
+            return lambda tag_id, leaf, title, count, titles, depth: \
+                merged.search(leaf) is not None
+        return lambda tag_id, leaf, title, count, titles, depth: \
+            merged.search(tag_id) is not None
+
+    if when == 'id_has_word':
+        if not rule.get('keywords'):
+            return _never
+        words = '|'.join(re.escape(k) for k in rule.get('keywords', []))
+        merged = re.compile(rf'\b(?:{words})\b', flags)
+        return lambda tag_id, leaf, title, count, titles, depth: \
+            merged.search(tag_id) is not None
+
+    if when == 'leaf_in':
+        lookup = frozenset(k.lower() for k in rule.get('keywords', []))
+        return lambda tag_id, leaf, title, count, titles, depth: \
+            leaf.lower() in lookup
+
+    if when == 'duplicate_title':
+        return lambda tag_id, leaf, title, count, titles, depth: \
+            titles.get(title, 0) > 1
+
+    value = rule.get('value', 0)
+    if when == 'usage_eq':
+        return lambda tag_id, leaf, title, count, titles, depth: \
+            count == value
+    if when == 'usage_gt':
+        return lambda tag_id, leaf, title, count, titles, depth: \
+            count > value
+    if when == 'usage_lt':
+        return lambda tag_id, leaf, title, count, titles, depth: \
+            count < value
+    if when == 'depth_gt':
+        return lambda tag_id, leaf, title, count, titles, depth: \
+            depth > value
+
+    if when == 'always':
+        return lambda tag_id, leaf, title, count, titles, depth: True
+
+    raise ValueError(f"Unknown tag status rule kind: {when!r}")
+
+
+def _never(tag_id, leaf, title, count, titles, depth):
+    return False
@@ -0,0 +1,52 @@
+# JCRUNCH module
+import math
+
+# Two-sided 95% normal quantile
+CONFIDENCE_Z = 1.96
+
+# Zero observed → the population count is below 3 / fraction with 95%
+# confidence (rule of three)
+ZERO_COUNT_BOUND = 3
+
+
+def sample_fraction(harvest: dict):
+    """The --sample fraction the harvest was parsed with, or None."""
+    sample = harvest.get('sample')
+    return sample['fraction'] if sample else None
+
+
+def scale_count(count: int, fraction: float) -> tuple:
+    """
+    (estimate, margin) for a count observed in a Bernoulli sample of
+    content nodes. estimate = count / fraction; the 95% margin uses the
+    binomial variance count · (1 - fraction) / fraction².
+    """
+    estimate = round(count / fraction)
+    if count:
+        margin = CONFIDENCE_Z * math.sqrt(count * (1 - fraction)) / fraction
+    else:
+        margin = ZERO_COUNT_BOUND * (1 - fraction) / fraction
+    return estimate, round(margin)
+
+
+def scale_rows(rows, count_key: str, interval_key: str, fraction):
+    """
+    Replace each row's sampled count with its estimate and fill
+    interval_key with the confidence interval — blank on a full run.
+    The observed count is kept in 'sample_count', so re-running an
+    audit never scales twice.
+    """
+    for row in rows:
+        if fraction is None:
+            row[interval_key] = ''
+            continue
+        observed = row.setdefault('sample_count', row.get(count_key) or 0)
+        estimate, margin = scale_count(observed, fraction)
+        row[count_key] = estimate
+        row[interval_key] = format_interval(margin, fraction)
+
+
+def format_interval(margin: int, fraction: float) -> str:
+    """'Estimated ±120 (95% CI, 1% sample)'"""
+    return f"Estimated ±{margin:,} (95% CI, {fraction:.2%} sample)" \
+        .replace('.00%', '%')
@@ -0,0 +1,195 @@
+# JCRUNCH module
+import math
+from array import array
+from collections import Counter
+from hashlib import blake2b
+
+# Exact counting up to this many distinct values per field, sketches after
+EXACT_LIMIT = 1024
+
+# HyperLogLog — 2^12 one-byte registers, ~1.6% standard error
+HLL_PRECISION = 12
+HLL_ERROR     = 1.04 / math.sqrt(1 << HLL_PRECISION)
+
+# Count-Min — depth rows of width counters, overestimates by at most
+# e/width of the total count with probability 1 - e^-depth
+CMS_WIDTH = 1024
+CMS_DEPTH = 4
+
+# Heavy-hitter candidates kept alongside the Count-Min sketch
+TOP_K = 32
+
+_MASK32 = 0xFFFFFFFF
+
+
+def new_value_profile() -> dict:
+    """
+    Per-field value profile with bounded memory.
+
+    Exact {value: count} until EXACT_LIMIT distinct values, then
+    promoted to a HyperLogLog (distinct count) plus a Count-Min sketch
+    with a TOP_K candidate table (most common values).
+    """
+    return {'total': 0, 'exact': {}, 'hll': None, 'cms': None, 'top': None}
+
+
+def add_value(profile: dict, value):
+    if value is None:
+        return
+    value = str(value)
+    if not value.strip():
+        return
+    profile['total'] += 1
+
+    exact = profile['exact']
+    if exact is not None:
+        exact[value] = exact.get(value, 0) + 1
+        if len(exact) > EXACT_LIMIT:
+            _promote(profile)
+        return
+
+    h = _hash64(value)
+    hll_add(profile['hll'], h)
+    count = cms_add(profile['cms'], h)
+    top_offer(profile['top'], value, count)
+
+
+def is_exact(profile: dict) -> bool:
+    return profile['exact'] is not None
+
+
+def distinct_estimate(profile: dict) -> int:
+    if profile['exact'] is not None:
+        return len(profile['exact'])
+    return hll_count(profile['hll'])
+
+
+def top_values(profile: dict, n: int = 5) -> list:
+    """[(value, count)] most common first. Counts are upper bounds once
+    the profile has been promoted to sketches, and a candidate whose
+    count is within the Count-Min error bound is left out — it may
+    occur only once, its count all collisions."""
+    if profile['exact'] is not None:
+        counts = profile['exact']
+    else:
+        bound = cms_error(profile['cms'], profile['total'])
+        counts = {value: count
+                  for value, count in profile['top']['counts'].items()
+                  if count > bound}
+    return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+
+def _promote(profile: dict):
+    exact = profile.pop('exact')
+    profile['exact'] = None
+    profile['hll'] = hll = hll_new()
+    profile['cms'] = cms = cms_new()
+    profile['top'] = top = top_new()
+    for value, count in exact.items():
+        h = _hash64(value)
+        hll_add(hll, h)
+        top_offer(top, value, cms_add(cms, h, count))
+
+
+# ── HyperLogLog ────────────────────────────────────────────────────
+
+def hll_new(precision: int = HLL_PRECISION) -> dict:
+    return {'p': precision, 'registers': bytearray(1 << precision)}
+
+
+def hll_add(hll: dict, h: int):
+    p = hll['p']
+    idx = h >> (64 - p)
+    rest = h & ((1 << (64 - p)) - 1)
+    rank = (64 - p) - rest.bit_length() + 1
+    registers = hll['registers']
+    if rank > registers[idx]:
+        registers[idx] = rank
+
+
+def hll_count(hll: dict) -> int:
+    registers = hll['registers']
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    histogram = Counter(registers)
+    estimate = alpha * m * m / sum(
+        count * 2.0 ** -rank for rank, count in histogram.items()
+    )
+    zeros = histogram.get(0, 0)
+    # Small-range correction — linear counting
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+
+# ── Count-Min with conservative update ─────────────────────────────
+
+def cms_new(width: int = CMS_WIDTH, depth: int = CMS_DEPTH) -> dict:
+    return {
+        'width': width,
+        'depth': depth,
+        'rows':  range(depth),
+        'table': array('I', [0]) * (width * depth),
+    }
+
+
+def cms_add(cms: dict, h: int, n: int = 1) -> int:
+    """Add n occurrences, return the new frequency estimate."""
+    cells = _cms_cells(cms, h)
+    table = cms['table']
+    counts = [table[c] for c in cells]
+    estimate = min(counts) + n
+    # Conservative update — only raise counters below the new estimate
+    for c, count in zip(cells, counts):
+        if count < estimate:
+            table[c] = estimate
+    return estimate
+
+
+def cms_error(cms: dict, total: int) -> float:
+    """Most an estimate can overshoot (with high probability): e/width
+    of the total count."""
+    return math.e * total / cms['width']
+
+
+def cms_estimate(cms: dict, h: int) -> int:
+    table = cms['table']
+    return min([table[c] for c in _cms_cells(cms, h)])
+
+
+def _cms_cells(cms: dict, h: int) -> list:
+    # Double hashing — row i uses column (h1 + i * h2) mod width
+    width = cms['width']
+    h1 = h & _MASK32
+    h2 = (h >> 32) | 1
+    return [row * width + (h1 + row * h2) % width
+            for row in cms['rows']]
+
+
+# ── Heavy-hitter candidates ────────────────────────────────────────
+
+def top_new(k: int = TOP_K) -> dict:
+    # floor is a lower bound on the smallest candidate count
+    return {'k': k, 'counts': {}, 'floor': 0}
+
+
+def top_offer(top: dict, value: str, count: int):
+    counts = top['counts']
+    if value in counts or len(counts) < top['k']:
+        counts[value] = count
+        return
+    if count <= top['floor']:
+        return
+    smallest = min(counts, key=counts.get)
+    if count > counts[smallest]:
+        del counts[smallest]
+        counts[value] = count
+        smallest = min(counts, key=counts.get)
+    top['floor'] = counts[smallest]
+
+
+def _hash64(value: str) -> int:
+    # Stable across runs, unlike hash() under PYTHONHASHSEED
+    digest = blake2b(value.encode('utf-8', 'surrogatepass'),
+                     digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
@@ -1,22 +1,40 @@
-import re
+from audit.driver import run_audits
+from audit.near_duplicates import find_near_duplicates
+from audit.rules import get_tag_status_plan
+from audit.sampling import sample_fraction, scale_rows
 from parser.tag_resolver import (
-    build_tag_hierarchy,
-    calculate_depth,
+    build_tag_closure,
+    closure_hierarchy,
     extract_parent,
     extract_label,
+    rollup_tag_subtrees,
 )
 
 
 def run_tag_audit(harvest: dict):
     """
     Enriches harvest['tags'] in place.
-    Adds all derived columns needed by Phase 1 workbook sheet.
+    Adds all derived columns needed by Phase 1 workbook sheet, plus
+    subtree_usage / descendant_count rolled up over the tag closure
+    table (harvest['tag_closure'], parser/tag_resolver.py).
     No database. No file writes. Mutates harvest dict only.
     """
-    tags = harvest.get('tags', {})
-    if not tags:
+    run_audits(harvest, [AUDITOR])
+
+
+def _begin(harvest: dict):
+    if not harvest.get('tags'):
         print("   [!] No tags found in harvest — skipping tag audit")
-        return
+        return None
+    return {}
+
+
+def _finish(harvest: dict, state: dict):
+    tags = harvest['tags']
+
+    # --sample: usage counts become estimates before anything reads them
+    scale_rows(tags.values(), 'asset_count', 'asset_count_ci',
+               sample_fraction(harvest))
 
     # Build lookup dict for hierarchy resolution
     # {tag_id: {'tag_title': ..., 'description': ...}}
@@ -28,6 +46,25 @@ def run_tag_audit(harvest: dict):
         for tag_id, t in tags.items()
     }
 
+    # Compile status rules once — config/audit_rules.json
+    plan = get_tag_status_plan()
+
+    # Closure table once, then every tag's lineage and subtree totals
+    # come from arrays — no per-tag ancestor string joins
+    closure = build_tag_closure(tags)
+    harvest['tag_closure'] = closure
+    rollup = rollup_tag_subtrees(closure, [
+        tags[tag_id].get('asset_count', 0) for tag_id in closure['ids']
+    ])
+
+    # Near-duplicate titles ("Cycling" / "Bicycling") — MinHash + LSH,
+    # near-linear; the most-used tag names each cluster
+    near = find_near_duplicates(
+        {tag_id: t.get('tag_title') for tag_id, t in tags.items()},
+        weights={tag_id: t.get('asset_count', 0)
+                 for tag_id, t in tags.items()},
+    )
+
     # Build title frequency map for duplicate detection
     # Must be built BEFORE the loop
     title_counts = {}
@@ -39,22 +76,25 @@ def run_tag_audit(harvest: dict):
     enriched = 0
     for tag_id, tag in tags.items():
 
-        depth   = calculate_depth(tag_id)
+        tid     = closure['index'][tag_id]
+        depth   = closure['depth'][tid]
         parent  = extract_parent(tag_id)
         label   = extract_label(tag_id)
 
         title       = (tag.get('tag_title') or '').strip()
         asset_count = tag.get('asset_count', 0)
+        subtree     = rollup['subtree_usage'][tid]
 
         status      = _calculate_status(
             tag_id, title, asset_count,
-            title_counts, depth
+            title_counts, depth, plan, subtree
         )
-        cloud_notes = _calculate_cloud_notes(status)
+        cloud_notes = _calculate_cloud_notes(status, plan)
         rec_map     = f"/content/cq:tags/{tag_id}"
         full_path   = f"/content/cq:tags/{tag_id}"
 
-        hierarchy   = build_tag_hierarchy(tag_id, tag_lookup)
+        hierarchy   = closure_hierarchy(closure, tid, tag_lookup)
+        duplicate   = near.get(tag_id, {})
 
         # Mutate the tag dict in place — add all derived keys
         tag.update({
@@ -77,10 +117,27 @@ def run_tag_audit(harvest: dict):
             'l4_id':          hierarchy.get('l4_id', ''),
             'l4_title':       hierarchy.get('l4_title', ''),
             'l4_desc':        hierarchy.get('l4_desc', ''),
+            'duplicate_cluster':  duplicate.get('cluster', ''),
+            'cluster_size':       duplicate.get('cluster_size', ''),
+            'similarity_score':   duplicate.get('similarity', ''),
+            'subtree_usage':      subtree,
+            'descendant_count':   rollup['descendant_count'][tid],
+            'title_path':         hierarchy['title_path'],
         })
         enriched += 1
 
-    print(f"   [ok] Tag audit complete: {enriched} tags enriched")
+    print(f"   [ok] Tag audit complete: {enriched} tags enriched, "
+          f"{len(near)} in near-duplicate clusters")
+
+
+# Phase 1 accumulator — usage counts come from count_tag_usage(), so
+# the tag audit needs no record stream of its own (audit/driver.py)
+AUDITOR = {
+    'phase':  '1',
+    'name':   'tag',
+    'begin':  _begin,
+    'finish': _finish,
+}
 
 
 def _calculate_status(
@@ -88,63 +145,38 @@ def _calculate_status(
     tag_title: str,
     asset_count: int,
     title_counts: dict,
-    depth: int
+    depth: int,
+    plan: dict = None,
+    subtree_count: int = None
 ) -> str:
     """
     Gatekeeper priority chain — first match wins.
-    Mirrors the Column G formula from the workbook exactly.
+    Rules come from config/audit_rules.json; the shipped set mirrors
+    the Column G formula from the workbook exactly, except that Zero
+    Usage tests subtree_count ("count": "subtree") so a parent whose
+    children are used is not flagged.
     """
-    leaf = extract_label(tag_id)
-
-    # Priority 1 — Missing Title
-    if not tag_title:
-        return 'DEPRECATE - Missing Title'
-
-    # Priority 2 — Bad Naming (uppercase or space in leaf segment)
-    if re.search(r'[A-Z\s]', leaf):
-        return 'DEPRECATE - Bad Naming'
-
-    # Priority 3 — Obsolete keywords anywhere in tag_id
-    if re.search(
-        r'\b(test|temp|mock|old|delete|backup|draft)\b',
-        tag_id,
-        re.IGNORECASE
-    ):
-        return 'DEPRECATE - Obsolete'
+    if plan is None:
+        plan = get_tag_status_plan()
 
-    # Priority 4 — Duplicate Title
-    if title_counts.get(tag_title, 0) > 1:
-        return 'CONSOLIDATE - Duplicate Title'
-
-    # Priority 5 — Zero Usage
-    if asset_count == 0:
-        return 'REVIEW - Zero Usage'
-
-    # Priority 6 — High Usage
-    if asset_count > 100:
-        return 'REVIEW - High Usage'
+    leaf = extract_label(tag_id)
+    subtree_rules = plan.get('subtree', ())
+    if subtree_count is None:
+        subtree_count = asset_count
 
-    # Priority 7 — Too Deep
-    if depth > 4:
-        return 'REVIEW - Too Deep'
+    for status, test in plan['rules']:
+        count = subtree_count if status in subtree_rules else asset_count
+        if test(tag_id, leaf, tag_title, count, title_counts, depth):
+            return status
 
-    # Priority 8 — Default
     return 'KEEP - Standard'
 
 
-def _calculate_cloud_notes(status: str) -> str:
+def _calculate_cloud_notes(status: str, plan: dict = None) -> str:
     """
     Translate status into a human-readable migration action.
     Mirrors Column H translation formula from the workbook.
     """
-    notes_map = {
-        'DEPRECATE - Missing Title':     'Do not migrate — no title defined',
-        'DEPRECATE - Bad Naming':        'Do not migrate — fix naming convention first',
-        'DEPRECATE - Obsolete':          'Do not migrate — obsolete tag detected',
-        'CONSOLIDATE - Duplicate Title': 'Merge with duplicate before migrating',
-        'REVIEW - Zero Usage':           'Audit required — tag is unused',
-        'REVIEW - High Usage':           'Audit required — high usage, verify mapping',
-        'REVIEW - Too Deep':             'Audit required — exceeds recommended depth',
-        'KEEP - Standard':               'Migrate as-is',
-    }
-    return notes_map.get(status, 'Manual review required')
+    if plan is None:
+        plan = get_tag_status_plan()
+    return plan['cloud_notes'].get(status, 'Manual review required')
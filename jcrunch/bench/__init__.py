@@ -0,0 +1 @@
+# JCRUNCH module
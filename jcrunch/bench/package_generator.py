@@ -0,0 +1,363 @@
+"""
+package_generator.py — synthetic AEM Package Manager exports
+
+Builds realistic package zips for benchmarks and tests:
+  - a CQ tag taxonomy (configurable depth and breadth)
+  - a DAM folder tree — a metadata_folders share named like years,
+    quarters, sizes, regions or language codes — with dam:Asset nodes, nested
+    _jcr_content/metadata subtrees carrying cq:tags and custom
+    namespace properties, an original rendition and web/thumbnail
+    renditions
+  - cq:Page content nodes with their own jcr:content
+  - path references (dc:relation, fileReference) — a broken_refs
+    fraction point at assets that do not exist
+  - runtime workflow models (/var/workflow/models) and a launcher
+    config (/conf/global/settings/workflow/launcher)
+
+Usage:
+    python bench/package_generator.py --out synthetic.zip --assets 5000
+
+Output is deterministic for a given seed.
+"""
+
+import argparse
+import os
+import random
+import zipfile
+
+JCR_NS = {
+    'jcr':   'http://www.jcp.org/jcr/1.0',
+    'nt':    'http://www.jcp.org/jcr/nt/1.0',
+    'cq':    'http://www.day.com/jcr/cq/1.0',
+    'sling': 'http://sling.apache.org/jcr/sling/1.0',
+    'dam':   'http://www.day.com/dam/1.0',
+    'dc':    'http://purl.org/dc/elements/1.1/',
+    'tiff':  'http://ns.adobe.com/tiff/1.0/',
+}
+
+FOLDER_WORDS = [
+    'brand', 'campaigns', 'products', 'events', 'people', 'logos',
+    'landscape', 'portrait', 'approved', 'archive', 'emea', 'apac',
+    'q1', 'q2', '2023', '2024', 'social', 'print', 'web', 'video',
+]
+# Folder names that encode metadata — the Phase 4 is_metadata_like
+# cases (years, quarters, orientation, state and region keywords) next
+# to sizes and language codes the shipped rules do not flag
+METADATA_FOLDER_NAMES = [
+    '2019', '2020', '2021', '2022', '2023', '2024', 'q1', 'q2', 'q3', 'q4',
+    'landscape', 'portrait', 'approved', 'archive', 'emea', 'apac',
+    '1920x1080', '800x600', 'en', 'de', 'fr-fr',
+]
+TAG_WORDS = [
+    'activity', 'cycling', 'hiking', 'surfing', 'travel', 'product',
+    'region', 'season', 'summer', 'winter', 'audience', 'adult',
+    'Kids', 'old', 'color', 'style', 'orientation', 'landscape',
+]
+
+# Extra DAM renditions, smallest share of the original first
+RENDITION_NAMES = [
+    'cq5dam.web.1280.1280.jpeg',
+    'cq5dam.thumbnail.319.319.png',
+    'cq5dam.thumbnail.48.48.png',
+]
+
+DEFAULTS = {
+    'tag_namespaces':    2,
+    'tag_depth':         3,
+    'tag_breadth':       4,
+    'folder_depth':      3,
+    'folder_breadth':    3,
+    'metadata_folders':  0.25,
+    'assets':            500,
+    'pages':             50,
+    'namespaces':        3,
+    'tags_per_asset':    3,
+    'props_per_asset':   4,
+    'rendition_bytes':   2048,
+    'renditions':        2,
+    'workflows':         2,
+    'workflow_steps':    5,
+    'broken_refs':       0.05,
+    'seed':              42,
+}
+
+
+def generate_package(out_path: str, **params) -> dict:
+    """
+    Write a synthetic AEM package zip to out_path.
+    Any key from DEFAULTS may be overridden.
+    Returns a summary dict of what was generated.
+    """
+    p   = dict(DEFAULTS, **params)
+    rnd = random.Random(p['seed'])
+
+    summary = {'tags': 0, 'folders': 0, 'metadata_folders': 0,
+               'assets': 0, 'pages': 0,
+               'tag_assignments': 0, 'entries': 0,
+               'references': 0, 'broken_references': 0}
+
+    def reference(targets):
+        """An existing target, or (broken_refs of the time) a missing one."""
+        summary['references'] += 1
+        target = targets[rnd.randrange(len(targets))]
+        if rnd.random() < p['broken_refs']:
+            summary['broken_references'] += 1
+            return target.rsplit('.', 1)[0] + '-deleted.jpg'
+        return target
+
+    custom_ns = {
+        f'ns{i}': f'http://www.example.com/ns{i}/1.0'
+        for i in range(p['namespaces'])
+    }
+
+    with zipfile.ZipFile(out_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+
+        def add(name, data):
+            zf.writestr(name, data)
+            summary['entries'] += 1
+
+        add('META-INF/vault/properties.xml', _PROPERTIES_XML)
+        add('META-INF/vault/filter.xml', _FILTER_XML)
+
+        # ── Tag taxonomy ─────────────────────────────────────────
+        tag_ids = []
+        for n in range(p['tag_namespaces']):
+            root_id = f'taxonomy-{n}'
+            frontier = [root_id]
+            tag_ids.append(root_id)
+            for _ in range(p['tag_depth'] - 1):
+                nxt = []
+                for parent in frontier:
+                    for b in range(p['tag_breadth']):
+                        word = TAG_WORDS[rnd.randrange(len(TAG_WORDS))]
+                        nxt.append(f'{parent}/{word}-{b}')
+                tag_ids.extend(nxt)
+                frontier = nxt
+
+        for tag_id in tag_ids:
+            leaf  = tag_id.rsplit('/', 1)[-1]
+            title = leaf.split('-')[0].title()
+            add(f'jcr_root/content/cq:tags/{tag_id}/.content.xml',
+                _node('cq:Tag', {'jcr:title': title,
+                                 'jcr:description': f'{title} tag',
+                                 'sling:resourceType': 'cq/tagging/components/tag'}))
+        summary['tags'] = len(tag_ids)
+
+        # ── DAM folders ──────────────────────────────────────────
+        folders  = ['/content/dam/synthetic']
+        frontier = list(folders)
+        for _ in range(p['folder_depth']):
+            nxt = []
+            for parent in frontier:
+                # Siblings never share a metadata name
+                names = rnd.sample(METADATA_FOLDER_NAMES,
+                                   min(p['folder_breadth'],
+                                       len(METADATA_FOLDER_NAMES)))
+                for b in range(p['folder_breadth']):
+                    if b < len(names) and rnd.random() < p['metadata_folders']:
+                        nxt.append(f'{parent}/{names[b]}')
+                        summary['metadata_folders'] += 1
+                        continue
+                    word = FOLDER_WORDS[rnd.randrange(len(FOLDER_WORDS))]
+                    nxt.append(f'{parent}/{word}-{b}')
+            folders.extend(nxt)
+            frontier = nxt
+
+        for folder in folders:
+            add(f'jcr_root{folder}/.content.xml',
+                _node('sling:OrderedFolder',
+                      {'jcr:title': folder.rsplit('/', 1)[-1]}))
+        summary['folders'] = len(folders)
+
+        # ── DAM assets ───────────────────────────────────────────
+        rendition = bytes(rnd.getrandbits(8)
+                          for _ in range(p['rendition_bytes']))
+        assets = []
+        for i in range(p['assets']):
+            folder = folders[rnd.randrange(len(folders))]
+            asset  = f'{folder}/asset-{i}.jpg'
+            add(f'jcr_root{asset}/.content.xml',
+                _node('dam:Asset', {
+                    'jcr:created':   '2024-01-15T10:00:00.000Z',
+                    'jcr:createdBy': 'admin',
+                }))
+
+            chosen = rnd.sample(tag_ids, min(p['tags_per_asset'], len(tag_ids)))
+            props = {
+                'dc:title':        f'Asset {i}',
+                'dc:format':       'image/jpeg',
+                'tiff:ImageWidth': str(rnd.randrange(400, 6000)),
+                'cq:tags':         '[' + ','.join(
+                    _tag_ref(t, rnd) for t in chosen) + ']',
+            }
+            if assets:
+                props['dc:relation'] = reference(assets)
+            for k in range(p['props_per_asset']):
+                if custom_ns:
+                    prefix = f'ns{k % len(custom_ns)}'
+                    props[f'{prefix}:field{k}'] = rnd.choice(
+                        ['alpha', 'beta', 'gamma', '2024-05-01',
+                         '/content/dam/synthetic', 'true', '42'])
+            add(f'jcr_root{asset}/_jcr_content/.content.xml',
+                _node('dam:AssetContent', {
+                    'jcr:lastModified':   '2024-03-01T12:00:00.000Z',
+                    'jcr:lastModifiedBy': 'admin',
+                }))
+            add(f'jcr_root{asset}/_jcr_content/metadata/.content.xml',
+                _node('nt:unstructured', props, custom_ns))
+            add(f'jcr_root{asset}/_jcr_content/renditions/original',
+                rendition)
+            for r, name in enumerate(RENDITION_NAMES[:p['renditions']]):
+                add(f'jcr_root{asset}/_jcr_content/renditions/{name}',
+                    rendition[:len(rendition) >> (r + 2)])
+            summary['tag_assignments'] += len(chosen)
+            assets.append(asset)
+        summary['assets'] = p['assets']
+
+        # ── Pages ────────────────────────────────────────────────
+        for i in range(p['pages']):
+            page = f'/content/synthetic/en/page-{i}'
+            add(f'jcr_root{page}/.content.xml', _node('cq:Page', {}))
+            chosen = rnd.sample(tag_ids, min(2, len(tag_ids)))
+            links = {}
+            if assets:
+                links['fileReference'] = reference(assets)
+            if i:
+                # Outside the filter roots — never reported as broken
+                links['cq:redirectTarget'] = \
+                    f'/content/other-site/en/page-{i}.html'
+            add(f'jcr_root{page}/_jcr_content/.content.xml',
+                _node('cq:PageContent', dict(links, **{
+                    'jcr:title':          f'Page {i}',
+                    'cq:template':        '/conf/synthetic/settings/wcm/templates/page',
+                    'sling:resourceType': 'synthetic/components/page',
+                    'cq:lastModified':    '2024-02-01T09:30:00.000Z',
+                    'cq:lastModifiedBy':  'author',
+                    'cq:tags':            '[' + ','.join(chosen) + ']',
+                })))
+            summary['tag_assignments'] += len(chosen)
+        summary['pages'] = p['pages']
+
+        # ── Workflow models + launchers ──────────────────────────
+        launchers = []
+        for w in range(p['workflows']):
+            model = f'/var/workflow/models/synthetic/wf-{w}'
+            add(f'jcr_root{model}/.content.xml',
+                _workflow_model(f'Synthetic Workflow {w}',
+                                p['workflow_steps'], tag_ids, rnd))
+            launchers.append(
+                f'<launcher{w} jcr:primaryType="cq:WorkflowLauncher"'
+                f' eventType="{{Long}}1" nodetype="dam:AssetContent"'
+                f' glob="/content/dam/synthetic(/.*)?/jcr:content/renditions/original"'
+                f' workflow="{model}" enabled="{{Boolean}}true"/>'
+            )
+        if launchers:
+            add('jcr_root/conf/global/settings/workflow/launcher/config/.content.xml',
+                _xml_doc('<jcr:root {ns}\n    jcr:primaryType="sling:Folder">'
+                         + ''.join(launchers) + '</jcr:root>'))
+        summary['workflow_steps'] = p['workflows'] * p['workflow_steps']
+
+    summary['zip_bytes'] = os.path.getsize(out_path)
+    return summary
+
+
+def _tag_ref(tag_id: str, rnd) -> str:
+    """AEM stores most assignments as namespace:path, some as full paths."""
+    roll = rnd.random()
+    if roll < 0.6:
+        namespace, _, path = tag_id.partition('/')
+        return f'{namespace}:{path}'
+    if roll < 0.8:
+        return f'/content/cq:tags/{tag_id}'
+    return tag_id
+
+
+def _node(primary_type: str, attrs: dict, extra_ns: dict = None) -> bytes:
+    ns = dict(JCR_NS, **(extra_ns or {}))
+    decl = '\n    '.join(f'xmlns:{k}="{v}"' for k, v in ns.items())
+    body = ''.join(
+        f'\n    {k}="{_escape(v)}"' for k, v in attrs.items()
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<jcr:root {decl}\n    jcr:primaryType="{primary_type}"{body}/>\n'
+    ).encode('utf-8')
+
+
+def _workflow_model(title: str, steps: int, tag_ids: list, rnd) -> bytes:
+    nodes = ['<node0 jcr:primaryType="cq:WorkflowNode" title="Start" type="START"/>']
+    transitions = []
+    for i in range(1, steps + 1):
+        tag_id = tag_ids[rnd.randrange(len(tag_ids))]
+        nodes.append(
+            f'<node{i} jcr:primaryType="cq:WorkflowNode" title="Step {i}"'
+            f' type="PROCESS"><metaData jcr:primaryType="nt:unstructured"'
+            f' PROCESS="com.example.SyntheticProcess{i}"'
+            f' PROCESS_ARGS="dc:title,dc:description,/content/cq:tags/{tag_id}"/>'
+            f'</node{i}>'
+        )
+        transitions.append(
+            f'<node{i - 1}_x0023_node{i} jcr:primaryType="cq:WorkflowTransition"'
+            f' from="node{i - 1}" to="node{i}" rule=""/>'
+        )
+    nodes.append(f'<node{steps + 1} jcr:primaryType="cq:WorkflowNode" title="End" type="END"/>')
+    return _xml_doc(
+        '<jcr:root {ns}\n    jcr:primaryType="cq:WorkflowModel"'
+        f' title="{_escape(title)}">'
+        '<nodes jcr:primaryType="nt:unstructured">' + ''.join(nodes) + '</nodes>'
+        '<transitions jcr:primaryType="nt:unstructured">'
+        + ''.join(transitions) + '</transitions></jcr:root>'
+    )
+
+
+def _xml_doc(template: str) -> bytes:
+    decl = '\n    '.join(f'xmlns:{k}="{v}"' for k, v in JCR_NS.items())
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            + template.replace('{ns}', decl, 1) + '\n').encode('utf-8')
+
+
+def _escape(value: str) -> str:
+    return (str(value).replace('&', '&amp;').replace('"', '&quot;')
+            .replace('<', '&lt;').replace('>', '&gt;'))
+
+
+_PROPERTIES_XML = b"""<?xml version="1.0" encoding="utf-8" standalone="no"?>
+<!DOCTYPE properties SYSTEM "http://java.sun.com/dtd/properties.dtd">
+<properties>
+<entry key="name">synthetic-package</entry>
+<entry key="group">jcrunch-bench</entry>
+<entry key="version">1.0</entry>
+</properties>
+"""
+
+_FILTER_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<workspaceFilter version="1.0">
+    <filter root="/content/cq:tags"/>
+    <filter root="/content/dam/synthetic"/>
+    <filter root="/content/synthetic"/>
+    <filter root="/var/workflow/models/synthetic"/>
+    <filter root="/conf/global/settings/workflow/launcher"/>
+</workspaceFilter>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic AEM Package Manager export."
+    )
+    parser.add_argument("--out", required=True, help="Output .zip path")
+    for key, default in DEFAULTS.items():
+        parser.add_argument(
+            f"--{key.replace('_', '-')}", type=type(default), default=default,
+            dest=key, help=f"default: {default}"
+        )
+    args = vars(parser.parse_args())
+    out  = args.pop('out')
+    summary = generate_package(out, **args)
+    print(f"[ok] Wrote {out}")
+    for key, value in summary.items():
+        print(f"     {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
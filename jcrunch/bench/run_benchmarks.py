@@ -0,0 +1,203 @@
+"""
+run_benchmarks.py — JCRUNCH pipeline benchmarks
+
+Generates synthetic packages at several scales and times every
+pipeline stage: walk_package, merge_harvests, each run_*_audit and
+write_all_phases. Results are printed as a table and written as JSON
+for regression tracking.
+
+Usage:
+    python bench/run_benchmarks.py --scales small,medium --out bench_results.json
+    python bench/run_benchmarks.py --scales large --repeat 3 --workbook template.xlsx
+
+Without --workbook, a blank workbook with the five phase sheets is
+created for the write stage (requires openpyxl).
+"""
+
+import argparse
+import contextlib
+import copy
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+JCRUNCH_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, JCRUNCH_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from package_generator import generate_package
+
+# Generator parameters per named scale
+SCALES = {
+    'tiny':   {'tag_depth': 2, 'tag_breadth': 3, 'folder_depth': 2,
+               'folder_breadth': 2, 'assets': 50, 'pages': 10},
+    'small':  {'tag_depth': 3, 'tag_breadth': 4, 'folder_depth': 3,
+               'folder_breadth': 3, 'assets': 1000, 'pages': 100},
+    'medium': {'tag_depth': 4, 'tag_breadth': 5, 'folder_depth': 4,
+               'folder_breadth': 4, 'assets': 10000, 'pages': 1000},
+    'large':  {'tag_depth': 5, 'tag_breadth': 5, 'folder_depth': 5,
+               'folder_breadth': 4, 'assets': 50000, 'pages': 5000},
+}
+
+AUDITS = [
+    ('run_tag_audit',       'audit.tag_auditor'),
+    ('run_metadata_audit',  'audit.metadata_auditor'),
+    ('run_reference_audit', 'audit.reference_auditor'),
+    ('run_folder_audit',    'audit.folder_auditor'),
+    ('run_namespace_audit', 'audit.namespace_auditor'),
+]
+
+
+def bench_scale(name: str, params: dict, workdir: str,
+                repeat: int = 1, workbook: str = None) -> dict:
+    """
+    Time every stage for one scale. Best of `repeat` runs per stage.
+    Stages whose dependencies are missing are reported as skipped.
+    """
+    from parser.package_reader import walk_package
+
+    zip_path = os.path.join(workdir, f'{name}.zip')
+    summary  = generate_package(zip_path, **params)
+
+    timings = {}
+    skipped = {}
+
+    harvest, timings['walk_package'] = _best(
+        repeat, lambda: walk_package(zip_path)
+    )
+
+    try:
+        from jcrunch import merge_harvests
+    except ImportError as e:
+        skipped['merge_harvests'] = str(e)
+        merged = harvest
+    else:
+        merged, timings['merge_harvests'] = _best(
+            repeat, lambda: merge_harvests([harvest])
+        )
+
+    # Audits mutate the harvest — extra repeats run on copies, the
+    # last run enriches `merged` itself for the write stage
+    for func_name, module_name in AUDITS:
+        func = getattr(__import__(module_name, fromlist=[func_name]),
+                       func_name)
+        runs  = []
+        total = max(1, repeat)
+        for i in range(total):
+            target = merged if i == total - 1 else copy.deepcopy(merged)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                func(target)
+            runs.append(time.perf_counter() - start)
+        timings[func_name] = min(runs)
+
+    try:
+        from export.workbook_writer import write_all_phases
+        template = workbook or _blank_workbook(workdir)
+    except ImportError as e:
+        skipped['write_all_phases'] = str(e)
+    else:
+        out = os.path.join(workdir, f'{name}.xlsx')
+
+        def write():
+            shutil.copy2(template, out)
+            write_all_phases(merged, out)
+
+        _, timings['write_all_phases'] = _best(repeat, write)
+
+    return {
+        'scale':    name,
+        'params':   params,
+        'package':  summary,
+        'counts': {
+            'nodes':           len(merged.get('nodes', {})),
+            'properties':      len(merged.get('properties', {})),
+            'tags':            len(merged.get('tags', {})),
+            'tag_assignments': len(merged.get('tag_assignments', [])),
+            'folders':         len(merged.get('folders', {})),
+            'namespaces':      len(merged.get('namespaces', {})),
+        },
+        'timings_s': {k: round(v, 6) for k, v in timings.items()},
+        'skipped':   skipped,
+    }
+
+
+def _best(repeat: int, fn):
+    """Run fn `repeat` times with stdout silenced. Returns (result, best)."""
+    best, result = None, None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def _blank_workbook(workdir: str) -> str:
+    import openpyxl
+    from export.workbook_writer import SHEET_MAP
+
+    path = os.path.join(workdir, '_template.xlsx')
+    if not os.path.exists(path):
+        wb = openpyxl.Workbook()
+        wb.remove(wb.active)
+        for sheet_name in SHEET_MAP:
+            wb.create_sheet(sheet_name)
+        wb.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the JCRUNCH pipeline on synthetic packages."
+    )
+    parser.add_argument(
+        "--scales", default="small",
+        help=f"Comma-separated scales: {', '.join(SCALES)}  [default: small]"
+    )
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Runs per stage, best time kept  [default: 1]")
+    parser.add_argument("--workbook", default=None,
+                        help="Workbook template for the write stage")
+    parser.add_argument("--out", default="bench_results.json",
+                        help="JSON results path  [default: bench_results.json]")
+    args = parser.parse_args()
+
+    names = [s.strip() for s in args.scales.split(',') if s.strip()]
+    for name in names:
+        if name not in SCALES:
+            print(f"[!] Unknown scale: {name}")
+            sys.exit(1)
+
+    report = {
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python':       platform.python_version(),
+        'platform':     platform.platform(),
+        'results':      [],
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            print(f"[>>] Scale: {name}")
+            result = bench_scale(name, SCALES[name], workdir,
+                                 args.repeat, args.workbook)
+            report['results'].append(result)
+            for stage, seconds in result['timings_s'].items():
+                print(f"     {stage:<22} {seconds:>10.3f} s")
+            for stage, reason in result['skipped'].items():
+                print(f"     {stage:<22}    skipped ({reason})")
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[ok] Results written: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# JCRUNCH module
+import csv
+
+from audit.harvest_diff import DIFF_TABLES
+
+DIFF_COLUMNS = ('table', 'path', 'field', 'change', 'old', 'new')
+
+# xlsx output: one sheet per diffed table, plus the counts
+SUMMARY_SHEET = 'Diff Summary'
+DIFF_SHEETS = {
+    'nodes':      'Nodes',
+    'properties': 'Properties',
+    'tags':       'Tags',
+    'namespaces': 'Namespaces',
+}
+
+
+def write_diff(diff: dict, out_path: str):
+    """
+    Write a harvest diff to .csv (one file, the table named per row) or
+    .xlsx (a summary sheet and one sheet per table, write-only mode).
+    """
+    if out_path.lower().endswith('.xlsx'):
+        _write_xlsx(diff, out_path)
+    else:
+        _write_csv(diff, out_path)
+
+
+def _write_csv(diff: dict, out_path: str):
+    with open(out_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=DIFF_COLUMNS)
+        writer.writeheader()
+        writer.writerows(diff['rows'])
+
+
+def _write_xlsx(diff: dict, out_path: str):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    summary = wb.create_sheet(SUMMARY_SHEET)
+    summary.append(['Table', 'Added', 'Removed', 'Changed'])
+    for table in DIFF_TABLES:
+        counts = diff['summary'][table]
+        summary.append([DIFF_SHEETS[table], counts['added'],
+                        counts['removed'], counts['changed']])
+
+    sheets = {}
+    for table in DIFF_TABLES:
+        sheets[table] = wb.create_sheet(DIFF_SHEETS[table])
+        sheets[table].append(['Path', 'Field', 'Change', 'Old', 'New'])
+    for row in diff['rows']:
+        sheets[row['table']].append([row['path'], row['field'],
+                                     row['change'], row['old'], row['new']])
+    wb.save(out_path)
@@ -0,0 +1,985 @@
+# JCRUNCH module
+import html
+import math
+import os
+import posixpath
+import re
+import struct
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from xml.etree import ElementTree
+
+from parser.zip_index import close_package, open_package, raw_entry, read_entry
+
+# Worker processes rendering sheet XML — only with a core to spare
+_CPUS = os.cpu_count() or 1
+WRITE_PROCESSES = min(4, _CPUS) if _CPUS > 1 else 0
+
+# Smaller sheets render in the parent — starting a process costs more
+PARALLEL_MIN_ROWS = 20_000
+
+# zlib level for rendered sheets — the level openpyxl saves with
+DEFLATE_LEVEL = 6
+
+# Rows rendered, encoded and compressed as one unit of work — chunks
+# of a large sheet go to the worker processes, at most
+# CHUNKS_IN_FLIGHT per worker at a time
+RENDER_CHUNK_ROWS = 1024
+CHUNKS_IN_FLIGHT = 2
+
+# Excel's limit on sheet name length
+SHEET_NAME_MAX = 31
+
+# Lists every continuation sheet when a phase overflows one sheet
+INDEX_SHEET = 'JCRUNCH Sheet Index'
+INDEX_CONFIG = {
+    'data_key': None,
+    'row_source': 'list',
+    'create': True,
+    'title': 'Sheets split at the Excel row limit',
+    'columns': {
+        'A': 'sheet', 'B': 'part_of', 'C': 'first_row', 'D': 'last_row',
+        'E': 'rows',
+    },
+    'headers': {
+        'A': 'Sheet', 'B': 'Part of', 'C': 'First Row #', 'D': 'Last Row #',
+        'E': 'Rows',
+    },
+}
+
+# Shared strings are inflated and parsed this many bytes at a time
+SHARED_READ_BYTES = 1 << 16
+
+# Package parts every SpreadsheetML workbook has
+CONTENT_TYPES = '[Content_Types].xml'
+WORKBOOK_PART = 'xl/workbook.xml'
+WORKBOOK_RELS = 'xl/_rels/workbook.xml.rels'
+
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = ('http://schemas.openxmlformats.org/officeDocument/2006/'
+           'relationships')
+_WORKSHEET_REL = _REL_NS + '/worksheet'
+_SHARED_STRINGS_REL = _REL_NS + '/sharedStrings'
+_WORKSHEET_TYPE = ('application/vnd.openxmlformats-officedocument.'
+                   'spreadsheetml.worksheet+xml')
+
+# Zip records written by _assemble (APPNOTE 4.3)
+_LOCAL_STRUCT = struct.Struct('<4s5H3I2H')
+_CDIR_STRUCT  = struct.Struct('<4s6H3I5H2I')
+_EOCD_STRUCT  = struct.Struct('<4s4H2IH')
+_FLAG_UTF8    = 0x800
+_ZIP32_MAX    = 0xFFFFFFFF
+
+_SHEET_DATA = re.compile(r'<sheetData\b[^>]*?(?:/>|>(.*?)</sheetData>)', re.S)
+_ROW        = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+_CELL       = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_ROW_NUM    = re.compile(r'\br="(\d+)"')
+_CELL_REF   = re.compile(r'\br="([A-Z]+)\d+"')
+_STYLE      = re.compile(r'\bs="\d+"')
+_SPANS      = re.compile(r'\s+spans="[^"]*"')
+_DIMENSION  = re.compile(r'<dimension\b[^>]*/>')
+_DIM_REF    = re.compile(r'ref="([A-Z]+)\d+(?::([A-Z]+)\d+)?"')
+_HAS_VALUE  = re.compile(r'<v>[^<]+</v>|<is>')
+_V_TEXT     = re.compile(r'<v>([^<]*)</v>')
+_T_TEXT     = re.compile(r'<t\b[^>]*>([^<]*)</t>')
+_SHARED_TYPE = re.compile(r'\bt="s"')
+_CALC_CHAIN = re.compile(r'<(?:Relationship|Override)\b[^>]*calcChain[^>]*/>')
+_SHEET_TAG  = re.compile(r'<sheet\b[^>]*/>')
+_NAME_ATTR  = re.compile(r'\bname="([^"]*)"')
+_DEFINED_NAME = re.compile(r'<definedName\b[^>]*?(?:/>|>.*?</definedName>)',
+                           re.S)
+_LOCAL_SHEET  = re.compile(r'\blocalSheetId="(\d+)"')
+_WORKBOOK_VIEW = re.compile(r'<workbookView\b[^>]*/>')
+_VIEW_TAB     = re.compile(r'\b(activeTab|firstSheet)="(\d+)"')
+_RELATIONSHIP = re.compile(r'<Relationship\b[^>]*/>')
+_REL_ID       = re.compile(r'\bId="([^"]*)"')
+_OVERRIDE     = re.compile(r'<Override\b[^>]*/>')
+_PART_NAME    = re.compile(r'\bPartName="([^"]*)"')
+
+# Worksheet elements that point into the sheet's own relationships —
+# a continuation sheet has none, so they are left out
+_PART_REFS = re.compile(
+    r'<(drawing|legacyDrawing|legacyDrawingHF|drawingHF|picture|'
+    r'oleObjects|controls|tableParts)\b[^>]*?(?:/>|>.*?</\1>)', re.S)
+_LINKED_HYPERLINK = re.compile(r'<hyperlink\b[^>]*\b\w+:id="[^"]*"[^>]*/>')
+_LINKED_EXT  = re.compile(r'<ext\b(?:(?!</ext>).)*?\b\w+:id=".*?</ext>', re.S)
+_EMPTY_LIST  = re.compile(r'<(hyperlinks|extLst)\b[^>]*>\s*</\1>')
+_TAB_SELECTED = re.compile(r'\s+tabSelected="[^"]*"')
+_CODE_NAME    = re.compile(r'\s+codeName="[^"]*"')
+
+# Row-3 source label of every column JCRUNCH writes
+JCRUNCH_LABEL = 'JCRUNCH'
+
+# Characters XML 1.0 cannot carry, even escaped
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+class Unsupported(Exception):
+    """The template needs the openpyxl path — nothing has been written."""
+
+
+def write_phases_ooxml(harvest: dict, workbook_path: str, sheet_map: dict,
+                       first_row: int, max_rows: int,
+                       processes: int = WRITE_PROCESSES) -> bool:
+    """
+    Write the phase sheets by generating their worksheet XML directly.
+
+    Every sheet in sheet_map is rendered from its template part: rows
+    above first_row (title, headers, source labels) are kept as they
+    are, missing JCRUNCH headers are added, old data rows are dropped
+    and the harvest rows streamed in their place. Rows are read from
+    the harvest lazily and rendered RENDER_CHUNK_ROWS at a time — on
+    worker processes for large sheets, each chunk deflated on its own —
+    and the workbook is reassembled with every other part (styles,
+    shared strings, vbaProject.bin, the customUI ribbon from
+    vba/inject_ribbon.py) copied over still compressed, byte for byte.
+
+    A sheet with more than max_rows rows continues on extra worksheet
+    parts — 'Phase 4 — Folder Redesign (2)', … — laid out like its
+    template, and INDEX_SHEET lists which rows landed where.
+    Continuation and index sheets an earlier run left behind are reused
+    or removed.
+
+    Returns False, having written nothing, when the template needs the
+    openpyxl path (an unexpected layout).
+    """
+    index = open_package(workbook_path)
+    out_path = workbook_path + '.jcrunch-tmp'
+    try:
+        try:
+            plan = _plan(harvest, index, sheet_map, first_row, max_rows)
+        except Unsupported as e:
+            print(f"   [!] OOXML export not possible ({e}) — "
+                  f"using openpyxl")
+            return False
+        for note in plan['notes']:
+            print(note)
+
+        big = any(task['count'] >= PARALLEL_MIN_ROWS
+                  for task in plan['tasks'])
+        workers = processes if big else 0
+        print(f"   [>>] Rendering {len(plan['tasks'])} sheets"
+              + (f" ({workers} worker processes)" if workers else ""))
+        with tempfile.TemporaryDirectory(prefix='jcrunch-xlsx-') as tmp:
+            rendered = _render_all(plan['tasks'], tmp, workers)
+            _assemble(index, plan, rendered, out_path)
+    except BaseException:
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        raise
+    finally:
+        close_package(index)
+
+    os.replace(out_path, workbook_path)
+    print(f"   [saved] Workbook saved: {workbook_path}")
+    return True
+
+
+def render_rows(letters: list, first_row: int, rows: list) -> tuple:
+    """
+    Worker: one chunk of data rows as deflate blocks ending on a sync
+    flush, so chunks compressed apart can be concatenated.
+    Returns (crc32, uncompressed size, compressed bytes).
+    """
+    parts = []
+    for n, values in enumerate(rows):
+        r = first_row + n
+        cells = ''.join(
+            _cell(f'{letter}{r}', value)
+            for letter, value in zip(letters, values)
+            if value is not None and value != ''
+        )
+        if cells:
+            parts.append(f'<row r="{r}">{cells}</row>')
+    return _deflate(''.join(parts))
+
+
+def continuation_name(sheet_name: str, part: int) -> str:
+    """'Phase 4 — Folder Redesign (2)' — the base is shortened when
+    needed to stay within Excel's 31-character sheet names."""
+    suffix = f' ({part})'
+    return sheet_name[:SHEET_NAME_MAX - len(suffix)].rstrip() + suffix
+
+
+def crc32_combine(crc1: int, crc2: int, len2: int) -> int:
+    """CRC-32 of A + B from crc32(A), crc32(B) and len(B) — zlib's
+    crc32_combine(), which Python's zlib does not expose."""
+    return _multmodp(_x2nmodp(len2, 3), crc1) ^ crc2
+
+
+def column_index(letters: str) -> int:
+    """'A' → 1, 'AE' → 31."""
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index
+
+
+def column_letter(index: int) -> str:
+    """31 → 'AE'."""
+    letters = ''
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def claim_columns(config: dict, headers: dict, labels: dict,
+                  width: int) -> tuple:
+    """
+    Decide where each mapped field of one sheet is written.
+
+    Columns in config['headers'] were added after the template was
+    designed, so the template may already use their letters for AI BOT
+    or MANUAL columns. Such a column is written in place only when its
+    source label (row 3) is JCRUNCH, or its header (row 2) and label
+    are both empty. Otherwise it moves past the template's last column
+    — back to the column an earlier run moved it to, when that column's
+    header matches. Baseline columns are always written in place.
+
+    headers, labels — {column index: text} from rows 2 and 3
+    width           — the template's last used column
+    Returns ([(column index, harvest key)] in column order,
+             {column index: header to fill in with a JCRUNCH label},
+             [(letter, new letter, template header)] per moved column)
+    """
+    added = config.get('headers', {})
+    columns, fill, pending = [], {}, []
+    for letter, key in config['columns'].items():
+        col = column_index(letter)
+        header, label = headers.get(col, ''), labels.get(col, '')
+        if letter not in added:
+            columns.append((col, key))
+        elif label.upper() == JCRUNCH_LABEL or not (header or label):
+            columns.append((col, key))
+            if not header:
+                fill[col] = added[letter]
+        else:
+            pending.append((letter, key, header or label))
+
+    moved = []
+    if pending:
+        taken = {col for col, _ in columns}
+        earlier = {text: col for col, text in headers.items()
+                   if labels.get(col, '').upper() == JCRUNCH_LABEL
+                   and col not in taken}
+        free = max([width] + list(taken)) + 1
+        for letter, key, held in pending:
+            col = earlier.pop(added[letter], None)
+            if col is None:
+                col, free = free, free + 1
+                fill[col] = added[letter]
+            columns.append((col, key))
+            moved.append((letter, column_letter(col), held))
+    return sorted(columns), fill, moved
+
+
+def _plan(harvest: dict, index: dict, sheet_map: dict, first_row: int,
+          max_rows: int) -> dict:
+    """
+    Everything decided before a byte is written:
+      plan = {
+          'tasks':    [render task per worksheet part],
+          'modified': {part: new XML text},   # workbook, rels, types
+          'drop':     {part},                  # calcChain, stale sheets
+          'notes':    [messages],
+      }
+    A task's rows are an iterator over the harvest, never a copy — the
+    parts of a split sheet share one and take 'count' rows each.
+    """
+    entries = index['entries']
+    for part in (CONTENT_TYPES, WORKBOOK_PART, WORKBOOK_RELS):
+        if part not in entries:
+            raise Unsupported(f"no {part}")
+    workbook_xml = _read_text(index, WORKBOOK_PART)
+    rels_xml     = _read_text(index, WORKBOOK_RELS)
+    types_xml    = _read_text(index, CONTENT_TYPES)
+
+    sheets, next_sheet_id, shared_part = _sheet_parts(workbook_xml,
+                                                      rels_xml)
+
+    plan = {'tasks': [], 'modified': {}, 'drop': set(), 'notes': []}
+    new_sheets = []
+    removed = []
+    partitions = []
+    templates = []
+
+    def sheet_part(name):
+        part = sheets.get(name)
+        if part is None:
+            part = _free_part(entries, new_sheets)
+            new_sheets.append((name, part))
+        return part
+
+    for sheet_name, config in sheet_map.items():
+        raw_data = harvest.get(config['data_key'])
+        if sheet_name in sheets:
+            template = _read_text(index, sheets[sheet_name])
+        elif config.get('create') and raw_data:
+            template = _new_sheet_xml(config.get('title', sheet_name))
+        else:
+            if not config.get('create'):
+                plan['notes'].append(
+                    f"   [!] Sheet not found, skipping: {sheet_name}")
+            continue
+
+        # Rows past max_rows continue on extra sheets; continuation
+        # sheets an earlier run needed beyond these go
+        count = len(raw_data) if raw_data else 0
+        names = [sheet_name] + [continuation_name(sheet_name, k)
+                                for k in range(2, -(-count // max_rows) + 1)]
+        k = len(names) + 1
+        while continuation_name(sheet_name, k) in sheets:
+            removed.append(continuation_name(sheet_name, k))
+            k += 1
+        if len(names) > 1:
+            plan['notes'].append(
+                f"   [!] {sheet_name}: {count} rows exceed one sheet — "
+                f"splitting across {len(names)} sheets")
+            for i, name in enumerate(names):
+                last = min(count, (i + 1) * max_rows)
+                partitions.append({
+                    'sheet': name, 'part_of': sheet_name,
+                    'first_row': i * max_rows + 1, 'last_row': last,
+                    'rows': last - i * max_rows,
+                })
+        parts = [(name, sheet_part(name)) for name in names]
+        templates.append((sheet_name, config, raw_data, parts,
+                          _template_rows(template, first_row)))
+
+    if partitions:
+        template = (_read_text(index, sheets[INDEX_SHEET])
+                    if INDEX_SHEET in sheets
+                    else _new_sheet_xml(INDEX_CONFIG['title']))
+        templates.append((INDEX_SHEET, INDEX_CONFIG, partitions,
+                          [(INDEX_SHEET, sheet_part(INDEX_SHEET))],
+                          _template_rows(template, first_row)))
+    elif INDEX_SHEET in sheets:
+        removed.append(INDEX_SHEET)
+
+    # Header and label text — shared strings read up to the last needed
+    header_row, label_row = first_row - 2, first_row - 1
+    wanted = set()
+    for *_, (_, kept, _) in templates:
+        for r in (header_row, label_row):
+            wanted |= _shared_refs(kept.get(r))
+    shared = _shared_strings(index, shared_part, wanted)
+
+    for sheet_name, config, raw_data, parts, (head, kept, tail) in templates:
+        if not raw_data:
+            plan['notes'].append(
+                f"   [!] No data for {sheet_name} "
+                f"(harvest['{config['data_key']}'] is empty)")
+            raw_data = ()
+
+        columns, fill, moved = claim_columns(
+            config, _row_texts(kept.get(header_row), shared),
+            _row_texts(kept.get(label_row), shared),
+            _template_width(head, kept))
+        for letter, new_letter, held in moved:
+            plan['notes'].append(
+                f"   [!] {sheet_name}: column {letter} holds '{held}' — "
+                f"written to column {new_letter} instead")
+
+        # One lazy pass over the harvest, shared by every part
+        if config['row_source'] == 'dict_values' and raw_data:
+            raw_data = raw_data.values()
+        rows = iter(raw_data)
+        remaining = len(raw_data)
+        for i, (name, part) in enumerate(parts):
+            count = min(remaining, max_rows)
+            remaining -= count
+            part_head, part_tail = _split_template(
+                head, kept, tail, first_row, fill,
+                [col for col, _ in columns], count)
+            if i:
+                part_head, part_tail, dropped = _continuation_xml(part_head,
+                                                                  part_tail)
+                if dropped and i == 1:
+                    plan['notes'].append(
+                        f"   [!] {sheet_name}: drawings, comments and "
+                        f"tables are not copied to continuation sheets")
+            plan['tasks'].append({
+                'sheet': name, 'part': part, 'head': part_head,
+                'tail': part_tail, 'columns': [col for col, _ in columns],
+                'keys': [key for _, key in columns], 'rows': rows,
+                'count': count, 'first_row': first_row,
+            })
+
+    # calcChain lists formula cells of rows that are gone — Excel
+    # rebuilds it, as it does after openpyxl saves
+    original = (workbook_xml, rels_xml, types_xml)
+    for rel in ElementTree.fromstring(rels_xml.encode('utf-8')):
+        if rel.get('Type', '').endswith('/calcChain'):
+            plan['drop'].add(_part_path(rel.get('Target')))
+    if plan['drop']:
+        rels_xml  = _CALC_CHAIN.sub('', rels_xml)
+        types_xml = _CALC_CHAIN.sub('', types_xml)
+
+    if removed:
+        workbook_xml, rels_xml, types_xml = _remove_sheets(
+            plan, index, removed, sheets, workbook_xml, rels_xml, types_xml)
+    if new_sheets:
+        workbook_xml, rels_xml, types_xml = _add_sheets(
+            new_sheets, next_sheet_id, workbook_xml, rels_xml, types_xml)
+    for part, old, new in zip((WORKBOOK_PART, WORKBOOK_RELS, CONTENT_TYPES),
+                              original, (workbook_xml, rels_xml, types_xml)):
+        if new != old:
+            plan['modified'][part] = new
+    return plan
+
+
+def _sheet_parts(workbook_xml: str, rels_xml: str) -> tuple:
+    """({sheet name: part path}, next free sheetId, shared strings part)"""
+    workbook = ElementTree.fromstring(workbook_xml.encode('utf-8'))
+    if workbook.tag != f'{{{_MAIN_NS}}}workbook':
+        raise Unsupported("not a transitional SpreadsheetML workbook")
+    rels = ElementTree.fromstring(rels_xml.encode('utf-8'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels
+               if rel.get('Type') == _WORKSHEET_REL}
+    shared_part = next((_part_path(rel.get('Target')) for rel in rels
+                        if rel.get('Type') == _SHARED_STRINGS_REL), None)
+
+    sheets = {}
+    next_id = 1
+    for sheet in workbook.iter(f'{{{_MAIN_NS}}}sheet'):
+        next_id = max(next_id, int(sheet.get('sheetId', 0)) + 1)
+        target = targets.get(sheet.get(f'{{{_REL_NS}}}id'))
+        if target:
+            sheets[sheet.get('name')] = _part_path(target)
+    return sheets, next_id, shared_part
+
+
+def _template_rows(template: str, first_row: int) -> tuple:
+    """(text before <sheetData>, {row number: kept row XML} for the rows
+    above first_row, text after </sheetData>) — data rows are dropped."""
+    m = _SHEET_DATA.search(template)
+    if m is None:
+        raise Unsupported("worksheet without sheetData")
+
+    kept = {}
+    r = 0
+    for row in _ROW.finditer(m.group(1) or ''):
+        num = _ROW_NUM.search(row.group(1))
+        r = int(num.group(1)) if num else r + 1
+        if r >= first_row:
+            break
+        kept[r] = row.group(0)
+    return template[:m.start()], kept, template[m.end():]
+
+
+def _split_template(head: str, kept: dict, tail: str, first_row: int,
+                    fill: dict, columns: list, row_count: int) -> tuple:
+    """
+    (head, tail) around the data rows: head runs up to and including
+    the kept header rows, tail from </sheetData> on. Headers in fill
+    go into the header row, 'JCRUNCH' into the row below it, and the
+    dimension is widened to the new extent.
+    """
+    header_row, label_row = first_row - 2, first_row - 1
+    if fill:
+        kept = dict(kept)
+        kept[header_row] = _put_cells(kept.get(header_row), header_row,
+                                      fill)
+        kept[label_row] = _put_cells(kept.get(label_row), label_row,
+                                     {col: JCRUNCH_LABEL for col in fill})
+
+    last_row = first_row + row_count - 1 if row_count else max(kept, default=1)
+    dimension = _DIMENSION.search(head)
+    if dimension:
+        ref = _DIM_REF.search(dimension.group(0))
+        last_col = max([column_index(ref.group(2) or ref.group(1))
+                        if ref else 1] + columns + list(fill))
+        head = (head[:dimension.start()]
+                + f'<dimension ref="A1:{column_letter(last_col)}{last_row}"/>'
+                + head[dimension.end():])
+
+    head += '<sheetData>' + ''.join(kept[r] for r in sorted(kept))
+    return head, '</sheetData>' + tail
+
+
+def _template_width(head: str, kept: dict) -> int:
+    """Last column the template uses — its dimension or kept rows."""
+    width = 0
+    dimension = _DIMENSION.search(head)
+    ref = dimension and _DIM_REF.search(dimension.group(0))
+    if ref:
+        width = column_index(ref.group(2) or ref.group(1))
+    for row in kept.values():
+        for cell in _CELL.finditer(row):
+            col = _CELL_REF.search(cell.group(1))
+            if col:
+                width = max(width, column_index(col.group(1)))
+    return width
+
+
+def _row_texts(row: str, shared: dict) -> dict:
+    """{column index: text} of one kept row's non-empty cells."""
+    texts = {}
+    for cell in _CELL.finditer(row or ''):
+        ref = _CELL_REF.search(cell.group(1))
+        body = cell.group(2) or ''
+        if ref is None or not _HAS_VALUE.search(body):
+            continue
+        if _SHARED_TYPE.search(cell.group(1)):
+            value = _V_TEXT.search(body)
+            text = shared.get(int(value.group(1)), '') if value else ''
+        elif '<is>' in body:
+            text = ''.join(_T_TEXT.findall(body))
+        else:
+            value = _V_TEXT.search(body)
+            text = value.group(1) if value else ''
+        text = html.unescape(text).strip()
+        if text:
+            texts[column_index(ref.group(1))] = text
+    return texts
+
+
+def _shared_refs(row: str) -> set:
+    """Shared string indices used by one kept row."""
+    refs = set()
+    for cell in _CELL.finditer(row or ''):
+        value = _V_TEXT.search(cell.group(2) or '')
+        if value and _SHARED_TYPE.search(cell.group(1)):
+            refs.add(int(value.group(1)))
+    return refs
+
+
+def _shared_strings(index: dict, part: str, wanted: set) -> dict:
+    """
+    {index: text} for the wanted shared strings. After a workbook has
+    been saved by openpyxl every data string lives in this part too, so
+    it is inflated and parsed incrementally and read only up to the
+    last wanted entry.
+    """
+    found = {}
+    if not wanted or part not in index['entries']:
+        return found
+    last = max(wanted)
+    method = index['entries'][part][1]
+    inflate = zlib.decompressobj(-15) if method == zlib.DEFLATED else None
+    parser = ElementTree.XMLPullParser(('end',))
+    n = 0
+    raw = raw_entry(index, part)
+    try:
+        for start in range(0, len(raw), SHARED_READ_BYTES):
+            block = bytes(raw[start:start + SHARED_READ_BYTES])
+            parser.feed(inflate.decompress(block) if inflate else block)
+            for _, el in parser.read_events():
+                if _local(el.tag) != 'si':
+                    continue
+                if n in wanted:
+                    # Rich-text runs count, phonetic readings do not
+                    phonetic = {t for run in el if _local(run.tag) == 'rPh'
+                                for t in run.iter()}
+                    found[n] = ''.join(t.text or '' for t in el.iter()
+                                       if _local(t.tag) == 't'
+                                       and t not in phonetic)
+                el.clear()
+                n += 1
+                if n > last:
+                    return found
+    finally:
+        raw.release()
+    return found
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _put_cells(row: str, r: int, values: dict) -> str:
+    """Set string cells in one kept row, keeping each replaced cell's
+    style and every other cell as it is."""
+    if not row:
+        return f'<row r="{r}">' + ''.join(
+            _cell(f'{column_letter(col)}{r}', text)
+            for col, text in sorted(values.items())) + '</row>'
+
+    m = _ROW.match(row)
+    open_tag = _SPANS.sub('', f'<row{m.group(1)}>')
+    inner = m.group(2) or ''
+    cells = {}
+    for cell in _CELL.finditer(inner):
+        ref = _CELL_REF.search(cell.group(1))
+        if ref is None:
+            raise Unsupported(f"cell without a reference in row {r}")
+        cells[column_index(ref.group(1))] = cell.group(0)
+    rest = _CELL.sub('', inner).strip()
+
+    for col, text in values.items():
+        style = _STYLE.search(_CELL.match(cells[col]).group(1)) \
+            if col in cells else None
+        cells[col] = _cell(f'{column_letter(col)}{r}', text,
+                           style.group(0) if style else '')
+    return open_tag + ''.join(cells[col] for col in sorted(cells)) \
+        + rest + '</row>'
+
+
+def _cell(ref: str, value, style: str = '') -> str:
+    """One <c> element — numbers and booleans typed, all else inline
+    strings, so sharedStrings.xml never changes."""
+    attrs = f' r="{ref}"' + (f' {style}' if style else '')
+    if isinstance(value, bool):
+        return f'<c{attrs} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, int) or \
+            isinstance(value, float) and math.isfinite(value):
+        return f'<c{attrs}><v>{value!r}</v></c>'
+    text = _xml_text(str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<c{attrs} t="inlineStr"><is><t{space}>{text}</t></is></c>'
+
+
+def _xml_text(text: str) -> str:
+    text = _ILLEGAL_XML.sub('', text)
+    return text.replace('&', '&amp;').replace('<', '&lt;') \
+        .replace('>', '&gt;')
+
+
+def _new_sheet_xml(title: str) -> str:
+    """A report sheet laid out like the phase sheets — title in A1."""
+    return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<worksheet xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+            '<dimension ref="A1"/><sheetData>'
+            f'<row r="1">{_cell("A1", title)}</row>'
+            '</sheetData></worksheet>')
+
+
+def _add_sheets(new_sheets: list, next_id: int, workbook_xml: str,
+                rels_xml: str, types_xml: str) -> tuple:
+    """Register created sheets in workbook.xml, its rels and the
+    content types — text insertion, the rest of each part untouched.
+    Returns the three parts' new text."""
+    prefix = re.search(r'xmlns:(\w+)="' + re.escape(_REL_NS) + '"',
+                       workbook_xml)
+    if prefix is None or '</sheets>' not in workbook_xml \
+            or '</Relationships>' not in rels_xml \
+            or '</Types>' not in types_xml:
+        raise Unsupported("cannot register new sheets")
+
+    taken = set(_REL_ID.findall(rels_xml))
+    sheet_tags, rel_tags, type_tags = [], [], []
+    n = 0
+    for i, (name, part) in enumerate(new_sheets):
+        n += 1
+        while f'rIdJcrunch{n}' in taken:
+            n += 1
+        rel_id = f'rIdJcrunch{n}'
+        sheet_tags.append(
+            f'<sheet name="{_xml_attr(name)}" sheetId="{next_id + i}" '
+            f'{prefix.group(1)}:id="{rel_id}"/>')
+        rel_tags.append(
+            f'<Relationship Id="{rel_id}" Type="{_WORKSHEET_REL}" '
+            f'Target="/{part}"/>')
+        type_tags.append(
+            f'<Override PartName="/{part}" ContentType="{_WORKSHEET_TYPE}"/>')
+
+    return (
+        workbook_xml.replace('</sheets>',
+                             ''.join(sheet_tags) + '</sheets>', 1),
+        rels_xml.replace('</Relationships>',
+                         ''.join(rel_tags) + '</Relationships>', 1),
+        types_xml.replace('</Types>', ''.join(type_tags) + '</Types>', 1),
+    )
+
+
+def _remove_sheets(plan: dict, index: dict, names: list, sheets: dict,
+                   workbook_xml: str, rels_xml: str, types_xml: str) -> tuple:
+    """
+    Take sheets out of the workbook by text edits: their <sheet>
+    entries, sheet-scoped defined names, relationships and content
+    types go, later sheet positions shift down, and their parts are
+    dropped. Returns the three parts' new text.
+    """
+    names = set(names)
+    positions = []
+    rel_ids = set()
+
+    def sheet_tag(m):
+        name = html.unescape(_NAME_ATTR.search(m.group(0)).group(1))
+        positions.append(name in names)
+        if name not in names:
+            return m.group(0)
+        rel = re.search(r'\b\w+:id="([^"]*)"', m.group(0))
+        if rel:
+            rel_ids.add(rel.group(1))
+        return ''
+    workbook_xml = _SHEET_TAG.sub(sheet_tag, workbook_xml)
+
+    def shifted(position):
+        """New position of a sheet, None when it is removed."""
+        if position < len(positions) and positions[position]:
+            return None
+        return position - sum(positions[:position])
+
+    def defined_name(m):
+        local = _LOCAL_SHEET.search(m.group(0))
+        if local is None:
+            return m.group(0)
+        position = shifted(int(local.group(1)))
+        if position is None:
+            return ''
+        return _LOCAL_SHEET.sub(f'localSheetId="{position}"', m.group(0))
+    workbook_xml = _DEFINED_NAME.sub(defined_name, workbook_xml)
+    workbook_xml = re.sub(r'<definedNames>\s*</definedNames>', '',
+                          workbook_xml)
+
+    def view_tab(m):
+        position = shifted(int(m.group(2)))
+        return f'{m.group(1)}="{position or 0}"'
+    workbook_xml = _WORKBOOK_VIEW.sub(
+        lambda m: _VIEW_TAB.sub(view_tab, m.group(0)), workbook_xml)
+
+    rels_xml = _RELATIONSHIP.sub(
+        lambda m: '' if _REL_ID.search(m.group(0)).group(1) in rel_ids
+        else m.group(0), rels_xml)
+
+    parts = {sheets[name] for name in names}
+    types_xml = _OVERRIDE.sub(
+        lambda m: '' if _PART_NAME.search(m.group(0)).group(1).lstrip('/')
+        in parts else m.group(0), types_xml)
+    for part in parts:
+        folder, base = posixpath.split(part)
+        for name in (part, posixpath.join(folder, '_rels', base + '.rels')):
+            if name in index['entries']:
+                plan['drop'].add(name)
+    for name in sorted(names):
+        plan['notes'].append(f"   [ok] Removed stale sheet: {name}")
+    return workbook_xml, rels_xml, types_xml
+
+
+def _continuation_xml(head: str, tail: str) -> tuple:
+    """
+    A continuation sheet's (head, tail) from its template's: not the
+    selected tab, no VBA code name, and nothing that points into the
+    template's own relationships (drawings, comments, tables, linked
+    hyperlinks). Data validations and conditional formats are kept.
+    Returns (head, tail, whether anything was left out).
+    """
+    head = _CODE_NAME.sub('', _TAB_SELECTED.sub('', head))
+    stripped = _PART_REFS.sub('', tail)
+    stripped = _LINKED_HYPERLINK.sub('', stripped)
+    stripped = _EMPTY_LIST.sub('', _LINKED_EXT.sub('', stripped))
+    return head, stripped, stripped != tail
+
+
+def _render_all(tasks: list, tmp: str, workers: int) -> dict:
+    """
+    {part: (temp path, crc, compressed, uncompressed)}. Tasks render in
+    order, so the parts of a split sheet take their rows from the
+    shared iterator in turn; chunks of large sheets go to the workers.
+    """
+    rendered = {}
+    pool = ProcessPoolExecutor(workers) if workers else None
+    try:
+        for i, task in enumerate(tasks):
+            path = os.path.join(tmp, f'sheet{i}.deflate')
+            parallel = pool if task['count'] >= PARALLEL_MIN_ROWS else None
+            rendered[task['part']] = (path,) + _render_task(
+                task, path, parallel, workers)
+            print(f"   [ok] {task['sheet']}: {task['count']} rows written")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return rendered
+
+
+def _render_task(task: dict, path: str, pool, workers: int) -> tuple:
+    """
+    One worksheet part deflated into path: head, data row chunks, tail.
+    Rows are projected onto the task's keys here, a chunk at a time —
+    only chunks in flight are ever held. Returns (crc32, compressed
+    size, uncompressed size).
+    """
+    letters = [column_letter(col) for col in task['columns']]
+    keys = task['keys']
+    rows = islice(task['rows'], task['count'])
+    totals = [0, 0, 0]   # crc, compressed, uncompressed
+
+    with open(path, 'wb') as f:
+        def put(chunk: tuple):
+            crc, size, data = chunk
+            totals[0] = crc32_combine(totals[0], crc, size)
+            totals[1] += len(data)
+            totals[2] += size
+            f.write(data)
+
+        put(_deflate(task['head']))
+        r = task['first_row']
+        pending = deque()
+        while True:
+            chunk = [tuple(row.get(key) for key in keys)
+                     for row in islice(rows, RENDER_CHUNK_ROWS)]
+            if not chunk:
+                break
+            if pool is None:
+                put(render_rows(letters, r, chunk))
+            else:
+                pending.append(pool.submit(render_rows, letters, r, chunk))
+                if len(pending) >= CHUNKS_IN_FLIGHT * workers:
+                    put(pending.popleft().result())
+            r += len(chunk)
+        while pending:
+            put(pending.popleft().result())
+        put(_deflate(task['tail'], final=True))
+    return totals[0], totals[1], totals[2]
+
+
+def _deflate(text: str, final: bool = False) -> tuple:
+    """(crc32, size, raw deflate bytes) — ends on a sync flush, or with
+    the final block when final."""
+    data = text.encode('utf-8')
+    compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -15)
+    packed = compressor.compress(data) + compressor.flush(
+        zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+    return zlib.crc32(data), len(data), packed
+
+
+# crc32_combine() — CRC-32 polynomial arithmetic (zlib crc32.c).
+# Polynomials are reflected: bit 31 is x^0
+_CRC_POLY = 0xEDB88320
+
+
+def _multmodp(a: int, b: int) -> int:
+    """a(x) * b(x) modulo the CRC-32 polynomial."""
+    m = 1 << 31
+    p = 0
+    while True:
+        if a & m:
+            p ^= b
+            if a & (m - 1) == 0:
+                return p
+        m >>= 1
+        b = (b >> 1) ^ _CRC_POLY if b & 1 else b >> 1
+
+
+def _x2n_table() -> list:
+    """x^(2^k) modulo the polynomial, k = 0..31."""
+    table = [1 << 30]   # x^1
+    for _ in range(31):
+        table.append(_multmodp(table[-1], table[-1]))
+    return table
+
+
+_X2N = _x2n_table()
+
+
+def _x2nmodp(n: int, k: int) -> int:
+    """x^(n * 2^k) modulo the polynomial."""
+    p = 1 << 31   # x^0
+    while n:
+        if n & 1:
+            p = _multmodp(_X2N[k & 31], p)
+        n >>= 1
+        k += 1
+    return p
+
+
+def _assemble(index: dict, plan: dict, rendered: dict, out_path: str):
+    """
+    Write the new zip: template entries in their original order —
+    rendered sheets and modified parts swapped in, everything else
+    copied still compressed — then the created sheets.
+    """
+    now = time.localtime()
+    dos_time = now.tm_hour << 11 | now.tm_min << 5 | now.tm_sec // 2
+    dos_date = (now.tm_year - 1980) << 9 | now.tm_mon << 5 | now.tm_mday
+    central = []
+
+    with open(out_path, 'wb') as f:
+        def add(name, method, crc, csize, usize, write):
+            offset = f.tell()
+            if _ZIP32_MAX in (offset, csize, usize) or \
+                    max(offset, csize, usize) > _ZIP32_MAX:
+                raise RuntimeError(f"{name}: past the 4 GB zip limit")
+            raw_name = name.encode('utf-8')
+            flags = 0 if raw_name.isascii() else _FLAG_UTF8
+            f.write(_LOCAL_STRUCT.pack(
+                b'PK\x03\x04', 20, flags, method, dos_time, dos_date,
+                crc, csize, usize, len(raw_name), 0))
+            f.write(raw_name)
+            write()
+            central.append((raw_name, flags, method, crc, csize, usize,
+                            offset))
+
+        def add_file(name, path, crc, csize, usize):
+            def write():
+                with open(path, 'rb') as src:
+                    while True:
+                        block = src.read(1 << 20)
+                        if not block:
+                            break
+                        f.write(block)
+            add(name, zlib.DEFLATED, crc, csize, usize, write)
+
+        def add_text(name, text):
+            data = text.encode('utf-8')
+            compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -15)
+            packed = compressor.compress(data) + compressor.flush()
+            add(name, zlib.DEFLATED, zlib.crc32(data), len(packed),
+                len(data), lambda: f.write(packed))
+
+        def add_raw(name):
+            _, method, csize, usize, crc, _ = index['entries'][name]
+
+            def write():
+                data = raw_entry(index, name)
+                try:
+                    f.write(data)
+                finally:
+                    data.release()
+            add(name, method, crc, csize, usize, write)
+
+        for name in index['entries']:
+            if name in plan['drop']:
+                continue
+            if name in rendered:
+                add_file(name, *rendered[name])
+            elif name in plan['modified']:
+                add_text(name, plan['modified'][name])
+            else:
+                add_raw(name)
+        for part, entry in rendered.items():
+            if part not in index['entries']:
+                add_file(part, *entry)
+
+        cdir_offset = f.tell()
+        for raw_name, flags, method, crc, csize, usize, offset in central:
+            f.write(_CDIR_STRUCT.pack(
+                b'PK\x01\x02', 20, 20, flags, method, dos_time, dos_date,
+                crc, csize, usize, len(raw_name), 0, 0, 0, 0, 0, offset))
+            f.write(raw_name)
+        cdir_size = f.tell() - cdir_offset
+        f.write(_EOCD_STRUCT.pack(b'PK\x05\x06', 0, 0, len(central),
+                                  len(central), cdir_size, cdir_offset, 0))
+
+
+def _read_text(index: dict, part: str) -> str:
+    data = read_entry(index, part)
+    try:
+        return bytes(data).decode('utf-8')
+    finally:
+        data.release()
+
+
+def _part_path(target: str) -> str:
+    """Relationship target (relative to xl/, or absolute) → zip name."""
+    if target.startswith('/'):
+        return target[1:]
+    return posixpath.normpath(posixpath.join('xl', target))
+
+
+def _free_part(entries: dict, new_sheets: list) -> str:
+    taken = set(entries) | {part for _, part in new_sheets}
+    n = 1
+    while f'xl/worksheets/sheet{n}.xml' in taken:
+        n += 1
+    return f'xl/worksheets/sheet{n}.xml'
+
+
+def _xml_attr(text: str) -> str:
+    return _xml_text(text).replace('"', '&quot;')
@@ -0,0 +1,345 @@
+# JCRUNCH module
+import json
+import os
+from array import array
+from collections.abc import MutableMapping
+
+from parser.assignments import TagAssignments, as_columns
+from parser.path_filter import trie_paths
+from parser.reference_index import add_root, new_reference_index
+
+# Bumped whenever a table's layout changes — older snapshots are refused
+SNAPSHOT_VERSION = 2
+
+# Written next to the tables: version, row counts, --sample details
+SNAPSHOT_META = 'snapshot.json'
+
+# harvest key → key column(s) the dict is keyed by. Each becomes
+# <name>.arrow in the snapshot directory
+KEYED_TABLES = {
+    'nodes':             'path',
+    'properties':        ('jcr_path', 'full_name'),
+    'tags':              'tag_id',
+    'folders':           'folder_path',
+    'namespaces':        'uri',
+    'rendition_storage': 'rendition_type',
+    'unresolved_tags':   'tag_ref',
+}
+
+# Keyed tables no audit writes to — iterated batch by batch, never held
+# as one dict unless a row is looked up by key
+STREAMED_TABLES = {'properties'}
+
+# harvest['storage'] = {owner: [bytes, compressed, files, original_bytes,
+# rendition_bytes]} — one column per list slot
+STORAGE_COLUMNS = ('bytes', 'compressed', 'files', 'original_bytes',
+                   'rendition_bytes')
+
+
+def write_snapshot(harvest: dict, path: str) -> dict:
+    """
+    Write the merged harvest as Arrow IPC files, one per table:
+
+      <path>/nodes.arrow  properties.arrow  tags.arrow  folders.arrow
+             namespaces.arrow  tag_assignments.arrow  storage.arrow
+             rendition_storage.arrow  unresolved_tags.arrow
+             workflows.arrow  reference_paths.arrow  snapshot.json
+
+    The reference index goes with it — its paths as a table, its
+    covered roots and taxonomy_pruned in snapshot.json — so a run from
+    the snapshot checks references as the package run did.
+
+    An IPC file holds one schema, so --snapshot names a directory.
+    tag_assignments is written as two dictionary-encoded columns whose
+    indices are the array('I') id columns themselves — no per-row
+    strings are built. Returns the row count per table.
+    No database. No workbook writes. Reads harvest dict only.
+    """
+    pa = _pyarrow()
+    os.makedirs(path, exist_ok=True)
+
+    tables = {}
+    for name, key in KEYED_TABLES.items():
+        tables[name] = _rows_table(pa, harvest.get(name, {}).values(),
+                                   _key_columns(key))
+    tables['tag_assignments'] = _assignments_table(
+        pa, as_columns(harvest.get('tag_assignments', [])))
+    tables['storage'] = _storage_table(pa, harvest.get('storage', {}))
+    tables['workflows'] = _rows_table(pa, harvest.get('workflows', []),
+                                      ('step_number',))
+    index = harvest.get('reference_index') or new_reference_index()
+    tables['reference_paths'] = pa.table(
+        {'path': pa.array(sorted(index['paths']), pa.string())})
+
+    counts = {}
+    for name, table in tables.items():
+        with pa.OSFile(os.path.join(path, f'{name}.arrow'), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        counts[name] = table.num_rows
+
+    with open(os.path.join(path, SNAPSHOT_META), 'w',
+              encoding='utf-8') as f:
+        json.dump({
+            'version': SNAPSHOT_VERSION,
+            'tables':  counts,
+            'sample':  harvest.get('sample'),
+            'reference_roots': trie_paths(index['roots']),
+            'taxonomy_pruned': bool(harvest.get('taxonomy_pruned')),
+        }, f, indent=2)
+    return counts
+
+
+def open_snapshot(path: str) -> dict:
+    """
+    {table name: pyarrow.Table}, memory-mapped — nothing is read until a
+    column is touched. For notebooks: open_snapshot(p)['tags'].to_pandas()
+    """
+    pa = _pyarrow()
+    meta = _read_meta(path)
+    tables = {}
+    for name in meta['tables']:
+        source = pa.memory_map(os.path.join(path, f'{name}.arrow'), 'r')
+        tables[name] = pa.ipc.open_file(source).read_all()
+    return tables
+
+
+def load_snapshot(path: str) -> dict:
+    """
+    A snapshot back into a harvest dict the audit phases accept — the
+    same keys walk_package + merge_harvests produce.
+
+    Tables stay memory-mapped Arrow: keyed tables are ArrowRows, which
+    build their dict on the first lookup or write, and the reference
+    paths an ArrowPaths set built on the first membership test. Loading
+    reads nothing but the tag assignment columns.
+    """
+    meta = _read_meta(path)
+    tables = open_snapshot(path)
+
+    harvest = {}
+    for name, key in KEYED_TABLES.items():
+        harvest[name] = ArrowRows(tables[name], _key_columns(key),
+                                  streamed=name in STREAMED_TABLES)
+    harvest['tag_assignments'] = TagAssignments(
+        _assignments_columns(tables['tag_assignments']))
+    harvest['storage'] = ArrowRows(tables['storage'], ('owner',),
+                                   value=_storage_totals)
+    harvest['workflows']   = tables['workflows'].to_pylist()
+    harvest['subpackages'] = []
+    harvest['sample']      = meta.get('sample')
+    harvest['taxonomy_pruned'] = meta.get('taxonomy_pruned', False)
+
+    index = new_reference_index()
+    index['paths'] = ArrowPaths(tables['reference_paths'].column('path'))
+    for root in meta.get('reference_roots', []):
+        add_root(index, root)
+    harvest['reference_index'] = index
+    return harvest
+
+
+class ArrowRows(MutableMapping):
+    """
+    A keyed harvest table read from a snapshot. len() and iteration
+    come straight from the Arrow table, a batch at a time; the first
+    lookup or write turns it into the plain dict the walk would have
+    built, and every later call goes to that dict.
+
+    streamed=True tables hand out fresh row dicts on every pass, like
+    SpilledProperties — for tables the audits only read.
+    value(row) turns a row dict into the stored value (default: the
+    row itself).
+    """
+    __slots__ = ('table', 'key_columns', 'streamed', 'value', '_rows')
+
+    def __init__(self, table, key_columns: tuple, streamed: bool = False,
+                 value=None):
+        self.table = table
+        self.key_columns = key_columns
+        self.streamed = streamed
+        self.value = value
+        self._rows = None
+
+    def __len__(self):
+        if self._rows is None:
+            return self.table.num_rows
+        return len(self._rows)
+
+    def __getitem__(self, key):
+        return self._dict()[key]
+
+    def __setitem__(self, key, row):
+        self._dict()[key] = row
+
+    def __delitem__(self, key):
+        del self._dict()[key]
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        for _, row in self.items():
+            yield row
+
+    def items(self):
+        if self._rows is None and self.streamed:
+            return self._scan()
+        return iter(self._dict().items())
+
+    def _dict(self) -> dict:
+        if self._rows is None:
+            self._rows = dict(self._scan())
+            self.table = None
+        return self._rows
+
+    def _scan(self):
+        """(key, value) per row, one record batch at a time."""
+        single = len(self.key_columns) == 1
+        for batch in self.table.to_batches():
+            for row in batch.to_pylist():
+                key = (row[self.key_columns[0]] if single
+                       else tuple(row[k] for k in self.key_columns))
+                yield key, (self.value(row) if self.value else row)
+
+
+class ArrowPaths:
+    """
+    reference_index['paths'] from a snapshot: a string column that
+    becomes a frozenset on the first membership test.
+    """
+    __slots__ = ('column', '_set')
+
+    def __init__(self, column):
+        self.column = column
+        self._set = None
+
+    def __contains__(self, path):
+        if self._set is None:
+            self._set = frozenset(self.column.to_pylist())
+        return path in self._set
+
+    def __iter__(self):
+        if self._set is not None:
+            return iter(self._set)
+        return (path for chunk in self.column.chunks
+                for path in chunk.to_pylist())
+
+    def __len__(self):
+        return len(self.column)
+
+    def __bool__(self):
+        return len(self.column) > 0
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401 — registers pyarrow.ipc
+    except ImportError:
+        raise RuntimeError(
+            "Snapshots need pyarrow — pip install pyarrow"
+        ) from None
+    return pyarrow
+
+
+def _read_meta(path: str) -> dict:
+    meta_path = os.path.join(path, SNAPSHOT_META)
+    if not os.path.isfile(meta_path):
+        raise RuntimeError(f"Not a JCRUNCH snapshot: {path}")
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != SNAPSHOT_VERSION:
+        raise RuntimeError(
+            f"Snapshot {path} is version {meta.get('version')}, "
+            f"this JCRUNCH reads version {SNAPSHOT_VERSION} — re-run "
+            f"with --snapshot"
+        )
+    return meta
+
+
+def _key_columns(key) -> tuple:
+    return key if isinstance(key, tuple) else (key,)
+
+
+def _rows_table(pa, rows, key_columns: tuple):
+    """
+    Row dicts → Table, one column per key seen in any row. A column
+    whose values do not share one Arrow type (say '' next to ints) is
+    written as strings.
+    """
+    rows = list(rows)
+    names = list(key_columns)
+    for row in rows:
+        for name in row:
+            if name not in names:
+                names.append(name)
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        try:
+            columns[name] = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            columns[name] = pa.array(
+                [None if v is None else str(v) for v in values],
+                pa.string(),
+            )
+        if pa.types.is_null(columns[name].type):
+            columns[name] = columns[name].cast(pa.string())
+    return pa.table(columns)
+
+
+def _assignments_table(pa, columns: dict):
+    """Integer columns → two dictionary<uint32, string> columns, the
+    indices wrapping the array('I') buffers without a copy."""
+    n = len(columns['node'])
+
+    def encoded(ids: array, values: list):
+        if not isinstance(ids, array):
+            ids = array('I', ids)  # a spilled column, read back
+        indices = pa.Array.from_buffers(pa.uint32(), n,
+                                        [None, pa.py_buffer(ids)])
+        return pa.DictionaryArray.from_arrays(
+            indices, pa.array(values, pa.string()))
+
+    return pa.table({
+        'jcr_path': encoded(columns['node'], columns['paths']),
+        'tag_path': encoded(columns['tag'], columns['refs']),
+    })
+
+
+def _assignments_columns(table) -> dict:
+    """The dictionary-encoded table back into assignments.py columns —
+    indices are copied straight from the mapped buffer."""
+    columns = {}
+    for name, values_key, ids_key, column_key in (
+            ('jcr_path', 'paths', 'path_ids', 'node'),
+            ('tag_path', 'refs', 'ref_ids', 'tag')):
+        encoded = table.column(name).combine_chunks()
+        values = encoded.dictionary.to_pylist()
+        indices = encoded.indices
+        ids = array('I')
+        if len(indices):
+            ids.frombytes(memoryview(indices.buffers()[1])[
+                indices.offset * ids.itemsize:
+                (indices.offset + len(indices)) * ids.itemsize])
+        columns[values_key] = values
+        columns[ids_key] = {value: i for i, value in enumerate(values)}
+        columns[column_key] = ids
+    return columns
+
+
+def _storage_totals(row: dict) -> list:
+    return [row[column] for column in STORAGE_COLUMNS]
+
+
+def _storage_table(pa, storage: dict):
+    owners = list(storage)
+    columns = {'owner': pa.array(owners, pa.string())}
+    for slot, name in enumerate(STORAGE_COLUMNS):
+        columns[name] = pa.array([storage[o][slot] for o in owners],
+                                 pa.int64())
+    return pa.table(columns)
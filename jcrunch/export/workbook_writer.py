@@ -1,5 +1,24 @@
 import openpyxl
-from openpyxl.utils import column_index_from_string
+
+from export.ooxml_writer import (
+    INDEX_SHEET,
+    JCRUNCH_LABEL,
+    claim_columns,
+    continuation_name,
+    write_phases_ooxml,
+)
+
+# Excel's hard limit on rows per sheet
+EXCEL_MAX_ROWS = 1_048_576
+
+# Data starts below title, header and source-label rows
+FIRST_DATA_ROW = 4
+ROWS_PER_SHEET = EXCEL_MAX_ROWS - FIRST_DATA_ROW + 1
+
+# 'ooxml' renders sheet XML directly (export/ooxml_writer.py) and falls
+# back to openpyxl only for a template layout it cannot handle;
+# 'openpyxl' always loads and saves the workbook through openpyxl
+EXPORT_ENGINE = 'ooxml'
 
 # Exact sheet names — em-dashes, not hyphens
 SHEET_MAP = {
@@ -18,7 +37,25 @@ SHEET_MAP = {
             'S': 'l3_title',      'T': 'l4_id',
             'U': 'l4_title',      'V': 'l4_desc',
             'W': 'full_tag_path', 'X': 'tag_label',
-        }
+            'Y': 'duplicate_cluster',
+            'Z': 'cluster_size',
+            'AA': 'similarity_score',
+            'AB': 'asset_count_ci',
+            'AC': 'subtree_usage',
+            'AD': 'descendant_count',
+            'AE': 'title_path',
+        },
+        # Columns JCRUNCH added — written here only where the template
+        # leaves the letter free, otherwise past its last column
+        'headers': {
+            'Y': 'Near-Duplicate Cluster',
+            'Z': 'Cluster Size',
+            'AA': 'Similarity',
+            'AB': 'Usage Count 95% CI',
+            'AC': 'Usage incl. Descendants',
+            'AD': 'Descendant Tags',
+            'AE': 'Full Title Path',
+        },
     },
     'Phase 2 — Metadata Schema': {
         'data_key': 'metadata_fields',
@@ -28,7 +65,19 @@ SHEET_MAP = {
             'C': 'data_type',
             'F': 'namespace',
             'H': 'current_usage_count',
-        }
+            'I': 'distinct_values',
+            'J': 'top_values',
+            'K': 'distinct_method',
+            'L': 'usage_ci',
+        },
+        # Columns JCRUNCH added — written here only where the template
+        # leaves the letter free, otherwise past its last column
+        'headers': {
+            'I': 'Distinct Values',
+            'J': 'Top Values',
+            'K': 'Distinct Count Method',
+            'L': 'Usage Count 95% CI',
+        },
     },
     'Phase 3 — Workflow Extraction': {
         'data_key': 'workflows',
@@ -47,7 +96,29 @@ SHEET_MAP = {
             'C': 'depth_level',    'D': 'parent_folder',
             'E': 'child_count',    'F': 'asset_count',
             'G': 'is_metadata_like',
-        }
+            'H': 'total_descendants',
+            'I': 'subtree_depth',
+            'J': 'last_modified_rollup',
+            'K': 'storage_bytes',
+            'L': 'storage_compressed',
+            'M': 'binary_count',
+            'N': 'original_bytes',
+            'O': 'rendition_bytes',
+            'P': 'asset_count_ci',
+        },
+        # Columns JCRUNCH added — written here only where the template
+        # leaves the letter free, otherwise past its last column
+        'headers': {
+            'H': 'Total Descendants',
+            'I': 'Subtree Depth',
+            'J': 'Last Modified (Subtree)',
+            'K': 'Storage Bytes',
+            'L': 'Storage Bytes (Compressed)',
+            'M': 'Binary Files',
+            'N': 'Original Rendition Bytes',
+            'O': 'Other Rendition Bytes',
+            'P': 'Asset Count 95% CI',
+        },
     },
     'Phase 5 — Namespace Validation': {
         'data_key': 'namespaces',
@@ -61,55 +132,151 @@ SHEET_MAP = {
             'J': 'effort',           'K': 'timeline_days',
         }
     },
+    # Report sheets — not part of the template, created on demand
+    'Unresolved Tag References': {
+        'data_key': 'unresolved_tags',
+        'row_source': 'dict_values',
+        'create': True,
+        'title': 'Tag references that match no tag definition',
+        'columns': {
+            'A': 'tag_ref', 'B': 'reference_count', 'C': 'example_path',
+        },
+        'headers': {
+            'A': 'Tag Reference', 'B': 'References', 'C': 'Example Node',
+        },
+    },
+    'Storage by Rendition Type': {
+        'data_key': 'rendition_storage',
+        'row_source': 'dict_values',
+        'create': True,
+        'title': 'Binary storage per rendition type (from zip sizes)',
+        'columns': {
+            'A': 'rendition_type', 'B': 'files',
+            'C': 'bytes',          'D': 'compressed_bytes',
+        },
+        'headers': {
+            'A': 'Rendition Type', 'B': 'Files',
+            'C': 'Bytes',          'D': 'Bytes (Compressed)',
+        },
+    },
+    'Broken References': {
+        'data_key': 'broken_references',
+        'row_source': 'dict_values',
+        'create': True,
+        'title': 'Path references whose target is missing from the package',
+        'columns': {
+            'A': 'target_path',    'B': 'reference_count',
+            'C': 'example_source', 'D': 'example_property',
+        },
+        'headers': {
+            'A': 'Missing Target', 'B': 'Inbound References',
+            'C': 'Example Source Node', 'D': 'Example Property',
+        },
+    },
+    'Inbound References': {
+        'data_key': 'inbound_references',
+        'row_source': 'dict_values',
+        'create': True,
+        'title': 'Nodes referenced by other nodes — most referenced first',
+        'columns': {
+            'A': 'node_path', 'B': 'reference_count', 'C': 'node_type',
+        },
+        'headers': {
+            'A': 'Referenced Node', 'B': 'Inbound References',
+            'C': 'Node Type',
+        },
+    },
 }
 
+# --phase value → sheet name
+PHASE_SHEETS = {
+    '1': 'Phase 1 — Taxonomy Audit',
+    '2': 'Phase 2 — Metadata Schema',
+    '3': 'Phase 3 — Workflow Extraction',
+    '4': 'Phase 4 — Folder Redesign',
+    '5': 'Phase 5 — Namespace Validation',
+}
 
-def write_all_phases(harvest: dict, workbook_path: str):
+
+def write_all_phases(harvest: dict, workbook_path: str,
+                     engine: str = EXPORT_ENGINE):
     """
     Write all phase data from harvest dict into the workbook.
     Reads SHEET_MAP to know which sheet, which column, which key.
-    Starts writing at row 4. Never touches AI BOT or MANUAL columns.
+    Starts writing at row 4. Never touches AI BOT or MANUAL columns: a
+    mapped column whose letter the template already uses for one is
+    written past the template's last column instead (claim_columns).
     Saves back to workbook_path when done.
+
+    A sheet whose rows would pass Excel's 1,048,576-row limit continues
+    on copies of its template — 'Phase 4 — Folder Redesign (2)', … —
+    and INDEX_SHEET lists which rows landed where. Splits are always
+    written by the OOXML engine, which streams the rows: openpyxl would
+    hold every cell in memory, and its copy_worksheet() drops data
+    validation, conditional formatting, images and charts.
+
+    The 'ooxml' engine skips openpyxl entirely: sheets are rendered as
+    XML, large ones in worker processes, and every other workbook part
+    is copied over raw.
     """
-    # Clear stale rows from all phase sheets before writing
+    if engine == 'ooxml':
+        print(f"   [>>] Writing workbook parts: {workbook_path}")
+        if write_phases_ooxml(harvest, workbook_path, SHEET_MAP,
+                              FIRST_DATA_ROW, ROWS_PER_SHEET):
+            return
+
+    # Clear stale rows and continuation sheets before writing
     clear_phase_data(workbook_path)
 
+    if any(len(harvest.get(config['data_key']) or ()) > ROWS_PER_SHEET
+           for config in SHEET_MAP.values()):
+        print(f"   [!] Rows exceed one sheet — streaming the split "
+              f"sheets into {workbook_path}")
+        if not write_phases_ooxml(harvest, workbook_path, SHEET_MAP,
+                                  FIRST_DATA_ROW, ROWS_PER_SHEET):
+            raise RuntimeError(
+                f"{workbook_path}: sheets over {ROWS_PER_SHEET} rows "
+                f"need the OOXML engine, which cannot read this workbook")
+        return
+
     print(f"   [>>] Loading workbook: {workbook_path}")
-    wb = openpyxl.load_workbook(workbook_path)
+    wb = open_workbook(workbook_path)
 
     for sheet_name, config in SHEET_MAP.items():
 
-        if sheet_name not in wb.sheetnames:
-            print(f"   [!] Sheet not found, skipping: {sheet_name}")
-            continue
-
-        ws = wb[sheet_name]
         data_key    = config['data_key']
         row_source  = config['row_source']
-        col_map     = config['columns']
 
         # Get the data from harvest — handle missing keys gracefully
         raw_data = harvest.get(data_key)
+
+        if sheet_name not in wb.sheetnames:
+            if not (config.get('create') and raw_data):
+                if not config.get('create'):
+                    print(f"   [!] Sheet not found, skipping: {sheet_name}")
+                continue
+            _create_report_sheet(wb, sheet_name, config)
+
+        ws = wb[sheet_name]
+        columns = _claim_columns(ws, config)
+
         if not raw_data:
             print(f"   [!] No data for {sheet_name} "
                   f"(harvest['{data_key}'] is empty)")
             continue
 
-        # Normalize to a list of dicts regardless of source type
+        # Iterate lazily regardless of source type — no list copy
         if row_source == 'dict_values':
-            rows = list(raw_data.values())
-        elif row_source == 'list':
-            rows = raw_data
+            rows = raw_data.values()
         else:
-            rows = list(raw_data)
+            rows = raw_data
 
         # Write rows starting at row 4
         write_count = 0
         for i, row_dict in enumerate(rows):
-            excel_row = 4 + i
-            for col_letter, harvest_key in col_map.items():
-                col_idx = column_index_from_string(col_letter)
-                value   = row_dict.get(harvest_key, '')
+            excel_row = FIRST_DATA_ROW + i
+            for col_idx, harvest_key in columns:
+                value = row_dict.get(harvest_key, '')
                 # Write None as empty string — keeps cells clean
                 ws.cell(row=excel_row, column=col_idx,
                         value=value if value is not None else '')
@@ -121,34 +288,86 @@ def write_all_phases(harvest: dict, workbook_path: str):
     print(f"   [saved] Workbook saved: {workbook_path}")
 
 
+def open_workbook(workbook_path: str):
+    """
+    openpyxl.load_workbook for a workbook that is saved back: a
+    macro-enabled .xlsm keeps its vbaProject.bin and customUI ribbon.
+    An .xlsx is loaded without — openpyxl would save it with the
+    macro-enabled content type.
+    """
+    return openpyxl.load_workbook(
+        workbook_path, keep_vba=workbook_path.lower().endswith('.xlsm'))
+
+
+def sheet_parts(wb, sheet_name: str) -> list:
+    """The sheet and its continuation sheets, in order."""
+    names = [sheet_name] if sheet_name in wb.sheetnames else []
+    part = 2
+    while continuation_name(sheet_name, part) in wb.sheetnames:
+        names.append(continuation_name(sheet_name, part))
+        part += 1
+    return names
+
+
+def _create_report_sheet(wb, sheet_name: str, config: dict):
+    """
+    Add a report sheet laid out like the phase sheets:
+    row 1 title, row 2 headers, row 3 source label, data from row 4.
+    """
+    ws = wb.create_sheet(sheet_name)
+    ws.cell(row=1, column=1, value=config.get('title', sheet_name))
+    return ws
+
+
+def _claim_columns(ws, config: dict) -> list:
+    """
+    [(column index, harvest key)] for one sheet — decided once from
+    rows 2-3 by claim_columns(). A mapped column whose letter the
+    template uses for an AI BOT or MANUAL column moves past the last
+    column; headers JCRUNCH adds get a JCRUNCH source label.
+    Existing headers are never overwritten.
+    """
+    texts = {2: {}, 3: {}}
+    for r, row in texts.items():
+        for cell in ws[r]:
+            if cell.value not in (None, '') and str(cell.value).strip():
+                row[cell.column] = str(cell.value).strip()
+    columns, fill, moved = claim_columns(config, texts[2], texts[3],
+                                         ws.max_column)
+    for col_idx, header in fill.items():
+        ws.cell(row=2, column=col_idx, value=header)
+        ws.cell(row=3, column=col_idx, value=JCRUNCH_LABEL)
+    for letter, new_letter, held in moved:
+        print(f"   [!] {ws.title}: column {letter} holds '{held}' — "
+              f"written to column {new_letter} instead")
+    return columns
+
+
 def clear_phase_data(workbook_path: str, phase: str = 'all'):
     """
     Clear data rows (row 4 onward) from phase sheets before a re-run.
     Preserves rows 1-3 (title, headers, source labels).
     Useful when re-running JCRUNCH against a new package.
     """
-    wb = openpyxl.load_workbook(workbook_path)
+    wb = open_workbook(workbook_path)
 
     sheets_to_clear = []
     if phase == 'all':
         sheets_to_clear = list(SHEET_MAP.keys())
-    else:
-        phase_map = {
-            '1': 'Phase 1 — Taxonomy Audit',
-            '2': 'Phase 2 — Metadata Schema',
-            '3': 'Phase 3 — Workflow Extraction',
-            '4': 'Phase 4 — Folder Redesign',
-            '5': 'Phase 5 — Namespace Validation',
-        }
-        if phase in phase_map:
-            sheets_to_clear = [phase_map[phase]]
+    elif phase in PHASE_SHEETS:
+        sheets_to_clear = [PHASE_SHEETS[phase]]
 
     for sheet_name in sheets_to_clear:
         if sheet_name not in wb.sheetnames:
             continue
+        # Continuation sheets from an earlier split are rebuilt on write
+        for stale in sheet_parts(wb, sheet_name)[1:]:
+            wb.remove(wb[stale])
         ws = wb[sheet_name]
         if ws.max_row >= 4:
             ws.delete_rows(4, ws.max_row - 3)
         print(f"   [ok] Cleared: {sheet_name}")
+    if phase == 'all' and INDEX_SHEET in wb.sheetnames:
+        wb.remove(wb[INDEX_SHEET])
 
     wb.save(workbook_path)
@@ -8,6 +8,12 @@ import sys
 # Ensure imports resolve correctly when called from VBA (working dir may differ)
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from parser.assignments import TagAssignments, as_columns, merge_assignments
+from parser.reference_index import merge_reference_indexes
+from parser.spill import merge_properties, parse_size
+from parser.storage import merge_storage
+from parser.tag_resolver import count_tag_usage
+
 
 def merge_harvests(harvests):
     """Merge a list of harvest dicts into one combined harvest."""
@@ -15,17 +21,23 @@ def merge_harvests(harvests):
         'nodes':           {},
         'properties':      {},
         'tags':            {},
-        'tag_assignments': [],
+        'tag_assignments': TagAssignments(),
         'namespaces':      {},
         'folders':         {},
+        'workflows':       [],
+        'subpackages':     [],
+        'sample':          None,
+        'taxonomy_pruned': any(h.get('taxonomy_pruned') for h in harvests),
     }
 
     for h in harvests:
         merged['nodes'].update(h.get('nodes', {}))
-        merged['properties'].update(h.get('properties', {}))
         merged['namespaces'].update(h.get('namespaces', {}))
         merged['folders'].update(h.get('folders', {}))
-        merged['tag_assignments'] += h.get('tag_assignments', [])
+        merged['workflows']       += h.get('workflows', [])
+        merged['subpackages']     += h.get('subpackages', [])
+        if h.get('sample'):
+            merged['sample'] = _merge_sample(merged['sample'], h['sample'])
 
         # Union tags by tag_id (reset asset_count — recalculated below)
         for tag_id, tag_data in h.get('tags', {}).items():
@@ -33,16 +45,49 @@ def merge_harvests(harvests):
                 merged['tags'][tag_id] = dict(tag_data)
                 merged['tags'][tag_id]['asset_count'] = 0
 
-    # Recalculate asset_count from the merged tag_assignments list
-    for assignment in merged['tag_assignments']:
-        raw    = assignment['tag_path']
-        tag_id = raw.replace('/content/cq:tags/', '').strip('/')
-        if tag_id in merged['tags']:
-            merged['tags'][tag_id]['asset_count'] += 1
+    # Spilled property runs are chained, not read back
+    merged['properties'] = merge_properties(
+        [h.get('properties', {}) for h in harvests])
+
+    # Concatenate the integer assignment columns, ids re-interned
+    merged['tag_assignments'] = TagAssignments(merge_assignments([
+        as_columns(h.get('tag_assignments', [])) for h in harvests
+    ]))
+
+    # Recalculate asset_count from the merged tag_assignments columns
+    count_tag_usage(merged)
+
+    merged['storage'], merged['rendition_storage'] = \
+        merge_storage(harvests)
+
+    # References may point across packages — check against all of them
+    merged['reference_index'] = merge_reference_indexes([
+        h['reference_index'] for h in harvests if h.get('reference_index')
+    ])
 
     return merged
 
 
+def _merge_sample(into, sample: dict) -> dict:
+    """Every package is sampled at the same --sample fraction."""
+    if into is None:
+        return dict(sample)
+    into['eligible'] += sample['eligible']
+    into['parsed']   += sample['parsed']
+    return into
+
+
+def _memory_limit(value):
+    """--max-memory '4G' → bytes, or None."""
+    if value is None:
+        return None
+    try:
+        return parse_size(value)
+    except ValueError:
+        raise click.BadParameter(
+            f"{value!r} — use bytes or a K/M/G suffix, e.g. 4G")
+
+
 @click.command()
 @click.option('--package',
     type=click.Path(exists=True),
@@ -61,55 +106,159 @@ def merge_harvests(harvests):
 @click.option('--phase',
     default='all',
     help='Run specific phase: 1,2,3,4,5 or all')
-def main(package, workbook, run_ai, ai_only, phase):
+@click.option('--ai-endpoint',
+    default=None,
+    help='HTTP model endpoint for the AI Bot (default: Anthropic API)')
+@click.option('--include',
+    multiple=True,
+    help='Only audit this repository path and below (repeatable)')
+@click.option('--exclude',
+    multiple=True,
+    help='Skip this repository path and below (repeatable)')
+@click.option('--sample',
+    type=click.FloatRange(0, 1, min_open=True),
+    default=None,
+    help='Parse only this fraction of content nodes, e.g. 0.01, '
+         'and report estimated counts')
+@click.option('--max-memory',
+    default=None,
+    callback=lambda ctx, param, value: _memory_limit(value),
+    help='Harvest memory budget, e.g. 4G — properties and tag '
+         'assignments past it spill to temp files')
+@click.option('--snapshot',
+    type=click.Path(),
+    default=None,
+    help='Also write the merged harvest as Arrow IPC tables to this '
+         'directory (needs pyarrow)')
+@click.option('--from-snapshot',
+    type=click.Path(exists=True),
+    default=None,
+    help='Audit a --snapshot directory instead of reading packages')
+def main(package, workbook, run_ai, ai_only, phase, ai_endpoint,
+         include, exclude, sample, max_memory, snapshot, from_snapshot):
 
     print("JCRUNCH -- It's GR-R-REAT for metadata audits")
 
     harvest = {}
 
-    if not ai_only and package:
-        from parser.package_reader import walk_package
-        from audit.tag_auditor import run_tag_audit
-        from audit.namespace_auditor import run_namespace_audit
-        from audit.metadata_auditor import run_metadata_audit
-        from audit.folder_auditor import run_folder_audit
+    if not ai_only and (package or from_snapshot):
+        from audit.driver import auditors_for_phase, run_audits
 
-        harvests = []
-        for pkg in package:
-            print(f"Reading package: {pkg}")
-            harvests.append(walk_package(pkg))
+        if from_snapshot:
+            from export.snapshot import load_snapshot
+            print(f"Loading snapshot: {from_snapshot}")
+            harvest = load_snapshot(from_snapshot)
+        else:
+            from parser.package_reader import walk_package
+            harvests = []
+            for pkg in package:
+                print(f"Reading package: {pkg}")
+                harvests.append(walk_package(pkg, include, exclude, sample,
+                                             max_memory))
+            harvest = merge_harvests(harvests)
 
-        harvest = merge_harvests(harvests)
         print(f"   Merged: {len(harvest['nodes'])} nodes, "
               f"{len(harvest['tags'])} tags, "
               f"{len(harvest['namespaces'])} namespaces, "
-              f"{len(harvest['folders'])} folders")
-
-        if phase in ('all', '1'):
-            run_tag_audit(harvest)
-            print("   Phase 1 tag audit complete")
-        if phase in ('all', '2'):
-            run_metadata_audit(harvest)
-            print("   Phase 2 metadata audit complete")
-        if phase in ('all', '4'):
-            run_folder_audit(harvest)
-            print("   Phase 4 folder audit complete")
-        if phase in ('all', '5'):
-            run_namespace_audit(harvest)
-            print("   Phase 5 namespace audit complete")
-
-    if run_ai:
+              f"{len(harvest['folders'])} folders, "
+              f"{len(harvest['workflows'])} workflow steps")
+
+        # Snapshot the harvest as parsed — audits re-run from it
+        if snapshot:
+            from export.snapshot import write_snapshot
+            write_snapshot(harvest, snapshot)
+            print(f"   Snapshot written: {snapshot}")
+
+        # One pass over properties, nodes and tag assignments feeds
+        # every enabled phase's auditor
+        auditors = auditors_for_phase(phase)
+        run_audits(harvest, auditors)
+        for auditor in auditors:
+            print(f"   Phase {auditor['phase']} {auditor['name']} "
+                  f"audit complete")
+        if phase in ('all', '3'):
+            print(f"   Phase 3 workflow extraction complete: "
+                  f"{len(harvest['workflows'])} steps")
+
+    # --ai-only keeps the existing rows — writing would clear them
+    if not ai_only:
+        print(f"Writing to workbook: {workbook}")
+        from export.workbook_writer import write_all_phases
+        write_all_phases(harvest, workbook)
+        print("   Workbook populated")
+
+    # AI fills read the freshly written rows back from the sheets
+    if run_ai or ai_only:
         from ai.bot import run_ai_fills
         print("Running AI Bot fills...")
-        run_ai_fills(harvest, workbook, phase=phase)
+        run_ai_fills(harvest, workbook, phase=phase,
+                     endpoint_url=ai_endpoint)
         print("   AI fills complete")
 
-    print(f"Writing to workbook: {workbook}")
-    from export.workbook_writer import write_all_phases
-    write_all_phases(harvest, workbook)
-    print("   Workbook populated")
     print("JCRUNCH done. Open your workbook.")
 
 
+def load_harvest(sources, include=(), exclude=()):
+    """Package zips and --snapshot directories → one merged harvest."""
+    harvests = []
+    for source in sources:
+        if os.path.isdir(source):
+            from export.snapshot import load_snapshot
+            print(f"Loading snapshot: {source}")
+            harvests.append(load_snapshot(source))
+        else:
+            from parser.package_reader import walk_package
+            print(f"Reading package: {source}")
+            harvests.append(walk_package(source, include, exclude))
+    if len(harvests) == 1:
+        return harvests[0]
+    return merge_harvests(harvests)
+
+
+@click.command()
+@click.option('--old', 'old_sources',
+    type=click.Path(exists=True),
+    multiple=True, required=True,
+    help='Earlier package .zip or --snapshot directory (repeatable)')
+@click.option('--new', 'new_sources',
+    type=click.Path(exists=True),
+    multiple=True, required=True,
+    help='Later package .zip or --snapshot directory (repeatable)')
+@click.option('--out',
+    type=click.Path(),
+    required=True,
+    help='Diff output: .csv, or .xlsx for one sheet per table')
+@click.option('--include',
+    multiple=True,
+    help='Only diff this repository path and below (repeatable)')
+@click.option('--exclude',
+    multiple=True,
+    help='Skip this repository path and below (repeatable)')
+def diff(old_sources, new_sources, out, include, exclude):
+    """Added, removed and changed nodes, properties, tags and namespaces
+    between two releases."""
+    from audit.harvest_diff import DIFF_TABLES, diff_harvests
+    from export.diff_writer import write_diff
+
+    print("JCRUNCH diff -- It's GR-R-REAT for metadata audits")
+    old = load_harvest(old_sources, include, exclude)
+    new = load_harvest(new_sources, include, exclude)
+
+    result = diff_harvests(old, new)
+    for table in DIFF_TABLES:
+        counts = result['summary'][table]
+        print(f"   {table}: {counts['added']} added, "
+              f"{counts['removed']} removed, {counts['changed']} changed")
+
+    print(f"Writing diff: {out}")
+    write_diff(result, out)
+    print("JCRUNCH diff done.")
+
+
 if __name__ == '__main__':
-    main()
+    # `jcrunch.py diff ...` — kept apart from main so every existing
+    # `jcrunch.py --package ...` call (and the VBA ribbon) is unchanged
+    if sys.argv[1:2] == ['diff']:
+        diff(sys.argv[2:], prog_name='jcrunch.py diff')
+    else:
+        main()
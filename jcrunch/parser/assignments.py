@@ -0,0 +1,161 @@
+# JCRUNCH module
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+
+
+def new_assignments() -> dict:
+    """
+    Tag assignments as two parallel integer columns.
+
+    columns = {
+        'paths':    [jcr_path, ...],   # id → node path
+        'path_ids': {jcr_path: id},
+        'refs':     [tag_ref, ...],    # id → tag reference as written
+        'ref_ids':  {tag_ref: id},
+        'node':     array('I'),        # assignment i → path id
+        'tag':      array('I'),        # assignment i → ref id
+    }
+
+    Every path and reference string is held once, however many
+    assignments use it — 8 bytes per assignment instead of a dict.
+    """
+    return {
+        'paths': [], 'path_ids': {},
+        'refs':  [], 'ref_ids':  {},
+        'node':  array('I'), 'tag': array('I'),
+    }
+
+
+def add_assignments(columns: dict, jcr_path: str, tag_refs):
+    """Record one node's tags — the path is interned once per node."""
+    if not tag_refs:
+        return
+    path_id = _intern(columns['paths'], columns['path_ids'], jcr_path)
+    refs, ref_ids = columns['refs'], columns['ref_ids']
+    node, tag = columns['node'], columns['tag']
+    for ref in tag_refs:
+        ref_id = ref_ids.get(ref)
+        if ref_id is None:
+            ref_id = _intern(refs, ref_ids, ref)
+        node.append(path_id)
+        tag.append(ref_id)
+
+
+def ref_counts(columns: dict) -> Counter:
+    """{ref_id: assignments}, counted in C — the bincount of the tag
+    column, in first-seen order."""
+    return Counter(columns['tag'])
+
+
+def first_paths(columns: dict, ref_ids) -> dict:
+    """{ref_id: node path of its first assignment} — one pass over the
+    columns for all of ref_ids, stopping once every one has been seen."""
+    pending = set(ref_ids)
+    first = {}
+    if not pending:
+        return first
+    paths = columns['paths']
+    for path_id, ref_id in zip(columns['node'], columns['tag']):
+        if ref_id in pending:
+            pending.discard(ref_id)
+            first[ref_id] = paths[path_id]
+            if not pending:
+                break
+    return first
+
+
+def merge_assignments(columns_list) -> dict:
+    """Concatenate column sets, re-interning ids into one table."""
+    merged = new_assignments()
+    for columns in columns_list:
+        if not columns['node']:
+            continue
+        if not merged['node']:
+            # Ids of the first set carry over unchanged. A spilled
+            # column (parser/spill.py) is kept as it is, not read back
+            merged = {
+                'paths': list(columns['paths']),
+                'path_ids': dict(columns['path_ids']),
+                'refs':  list(columns['refs']),
+                'ref_ids':  dict(columns['ref_ids']),
+                'node':  _copy_column(columns['node']),
+                'tag':   _copy_column(columns['tag']),
+            }
+            continue
+        path_map = array('I', (
+            _intern(merged['paths'], merged['path_ids'], path)
+            for path in columns['paths']
+        ))
+        ref_map = array('I', (
+            _intern(merged['refs'], merged['ref_ids'], ref)
+            for ref in columns['refs']
+        ))
+        merged['node'].extend(map(path_map.__getitem__, columns['node']))
+        merged['tag'].extend(map(ref_map.__getitem__, columns['tag']))
+    return merged
+
+
+def as_columns(assignments) -> dict:
+    """Columns for a TagAssignments view, or for a plain list of
+    {jcr_path, tag_path} dicts (hand-built harvests)."""
+    if isinstance(assignments, TagAssignments):
+        return assignments.columns
+    columns = new_assignments()
+    for assignment in assignments:
+        add_assignments(columns, assignment['jcr_path'],
+                        (assignment['tag_path'],))
+    return columns
+
+
+class TagAssignments(Sequence):
+    """
+    harvest['tag_assignments'] — the old list of {jcr_path, tag_path}
+    dicts as a lazy view over the integer columns. Dicts are built only
+    when an item is read; len() and counting never build any.
+    """
+    __slots__ = ('columns',)
+
+    def __init__(self, columns: dict = None):
+        self.columns = columns if columns is not None else new_assignments()
+
+    def __len__(self):
+        return len(self.columns['node'])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        columns = self.columns
+        return {
+            'jcr_path': columns['paths'][columns['node'][i]],
+            'tag_path': columns['refs'][columns['tag'][i]],
+        }
+
+    def __iter__(self):
+        paths, refs = self.columns['paths'], self.columns['refs']
+        for path_id, ref_id in zip(self.columns['node'], self.columns['tag']):
+            yield {'jcr_path': paths[path_id], 'tag_path': refs[ref_id]}
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def append(self, assignment: dict):
+        add_assignments(self.columns, assignment['jcr_path'],
+                        (assignment['tag_path'],))
+
+    def extend(self, assignments):
+        self.columns = merge_assignments([self.columns,
+                                          as_columns(assignments)])
+
+
+def _intern(values: list, ids: dict, value) -> int:
+    value_id = ids.get(value)
+    if value_id is None:
+        value_id = ids[value] = len(values)
+        values.append(value)
+    return value_id
+
+
+def _copy_column(column):
+    return array('I', column) if isinstance(column, array) else column
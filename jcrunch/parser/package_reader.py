@@ -1,188 +1,534 @@
-import zipfile
-import os
-import tempfile
+import hashlib
+from functools import partial
 
+from parser.reference_index import (
+    FILTER_XML,
+    add_path,
+    add_root,
+    entry_jcr_paths,
+    new_reference_index,
+    read_filter_roots,
+)
+from parser.assignments import TagAssignments, add_assignments
+from parser.path_filter import (
+    compile_scope,
+    in_scope,
+    is_excluded,
+    package_scope,
+)
+from parser.pipeline import run_pipeline
+from parser.spill import (
+    NODE_ROW_BYTES,
+    PROPERTY_ROW_BYTES,
+    SPILL_CHECK_EVERY,
+    check_budget,
+    finish_spill,
+    new_spill,
+)
+from parser.storage import add_binary
+from parser.tag_resolver import count_tag_usage
+from parser.workflow_parser import is_workflow_path, parse_workflow_xml
 from parser.xml_parser import parse_content_xml
+from parser.zip_index import (
+    close_package,
+    entry_names,
+    entry_sizes,
+    open_package,
+    open_package_buffer,
+    read_entry,
+)
 
+# Tag definition properties copied onto harvest['tags']
+TAG_TEXT_FIELDS = {'jcr:title', 'jcr:description'}
 
-def walk_package(zip_path: str) -> dict:
+# Nested packages — walked in memory, never extracted
+SUBPACKAGE_ROOT = '/etc/packages/'
+MAX_SUBPACKAGE_DEPTH = 3
+MAX_SUBPACKAGE_BYTES = 512 * 1024 * 1024
+
+# Parse cache — identical .content.xml payloads (empty folders,
+# templated rendition folders) are parsed once per run
+PARSE_CACHE_MAX = 65536           # distinct payloads kept
+PARSE_CACHE_MAX_BYTES = 64 * 1024  # larger payloads are never cached
+PARSE_CACHE_BUDGET_SHARE = 8      # with --max-memory: 1/8 of the budget
+
+# --sample and --include never skip these — the tag index needs every
+# definition, whatever part of the content is audited
+ALWAYS_READ_ROOTS = ('/content/cq:tags/', '/etc/tags/')
+
+
+def walk_package(zip_path: str, include=(), exclude=(),
+                 sample: float = None, max_memory: int = None) -> dict:
     """
-    Unzip AEM package, walk jcr_root/ recursively.
+    Walk jcr_root/ inside an AEM package zip.
     Parse every .content.xml and collect into in-memory harvest dict.
-    No database. No file writes beyond a single reused temp file.
-    Returns harvest dict only.
+    No database. No file writes. Returns harvest dict only.
 
     harvest = {
         'nodes':          {},   # keyed by jcr_path
         'properties':     {},   # keyed by (jcr_path, full_name)
         'tags':           {},   # keyed by tag_id
-        'tag_assignments': [],  # list of {jcr_path, tag_path} dicts
+        'tag_assignments': TagAssignments(),  # integer columns, read
+                                              # as {jcr_path, tag_path}
         'namespaces':     {},   # keyed by namespace URI
         'folders':        {},   # keyed by folder_path
+        'workflows':      [],   # Phase 3 step records, in model order
+        'reference_index': {},  # paths present + covered roots
+        'storage':        {},   # binary sizes per owning node path
+        'rendition_storage': {},  # binary sizes per rendition type
+        'subpackages':    [],   # nested packages found under /etc/packages
+        'out_of_scope':   0,    # entries pruned by filter.xml / --include
+        'taxonomy_pruned': False,  # tag definitions pruned — see
+                                   # count_tag_usage()
+        'sample':         None, # {fraction, eligible, parsed} with --sample
+        'parse_cache':    {},   # {hits, misses, bytes} — identical
+                                # payloads; bytes = cached records
+        'spill':          None, # --max-memory budget + what spilled
     }
 
-    Windows note: zipfile.extractall() fails on paths containing colons
-    (e.g. cq:tags). We read each entry's bytes directly from the zip with
-    zf.read() and write to a single safe temp file before parsing.
-    The JCR path is derived from the zip entry name string, not the
-    filesystem path — so colons in AEM paths are never a problem.
+    The zip is memory-mapped and its central directory indexed once
+    (parser.zip_index). Each entry's bytes go straight from the mapping
+    to the XML parser — nothing is extracted, so colons in AEM paths
+    (e.g. cq:tags) never touch the Windows filesystem. The JCR path is
+    derived from the zip entry name string.
+
+    Sub-packages (jcr_root/etc/packages/**.zip) are opened in memory and
+    merged into the same harvest, up to MAX_SUBPACKAGE_DEPTH levels deep
+    and MAX_SUBPACKAGE_BYTES each.
+
+    Entries outside the package's filter.xml roots, outside every
+    include prefix or under an exclude prefix are skipped on their
+    name alone — pruned entries are never decompressed. Their paths
+    still go into the reference index, so links into the pruned part
+    are not reported as broken. Tag definitions ignore --include, so a
+    scoped run still resolves its tag references.
+
+    With sample (0 < fraction < 1) only a deterministic hash-based
+    sample of content nodes is parsed — whole assets and pages are kept
+    or dropped together. Tag definitions and workflows are always read;
+    folders and binary sizes still come from every entry name. The
+    audits scale the sampled counts (audit/sampling.py).
+
+    Byte-identical .content.xml payloads are parsed once: the parsed
+    record is cached under a hash of the bytes and reused with the new
+    JCR path bound in.
+
+    With max_memory (bytes) the harvest size is estimated as it grows;
+    over budget, properties are written out as sorted runs and tag
+    assignment ids to column files (parser/spill.py). The audits then
+    read them back through an external merge. The parse cache counts
+    towards the estimate and stops growing at 1/PARSE_CACHE_BUDGET_SHARE
+    of the budget — cached records cannot spill.
     """
     harvest = {
         'nodes':           {},
         'properties':      {},
         'tags':            {},
-        'tag_assignments': [],
+        'tag_assignments': TagAssignments(),
         'namespaces':      {},
         'folders':         {},
+        'workflows':       [],
+        'reference_index': new_reference_index(),
+        'storage':         {},
+        'rendition_storage': {},
+        'subpackages':     [],
+        'out_of_scope':    0,
+        'taxonomy_pruned': False,
+        'sample':          None,
+        'parse_cache':     {'hits': 0, 'misses': 0, 'bytes': 0},
+        'spill':           new_spill(max_memory) if max_memory else None,
     }
+    if sample is not None and sample < 1:
+        harvest['sample'] = {'fraction': sample, 'eligible': 0, 'parsed': 0}
+    scope = compile_scope(include, exclude) if include or exclude else None
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_xml = os.path.join(tmpdir, '_content.xml')
-
-        with zipfile.ZipFile(zip_path, 'r') as zf:
-            all_entries = zf.namelist()
-
-            # Locate jcr_root prefix inside the zip entry names
-            jcr_prefix = None
-            for entry in all_entries:
-                normalized = entry.replace('\\', '/')
-                parts = normalized.split('/')
-                if 'jcr_root' in parts:
-                    idx = parts.index('jcr_root')
-                    jcr_prefix = '/'.join(parts[:idx + 1]) + '/'
-                    break
-
-            if not jcr_prefix:
-                raise ValueError(
-                    "No jcr_root/ found — "
-                    "is this a valid AEM Package Manager export?"
-                )
-
-            for zip_entry in sorted(all_entries):
-                normalized = zip_entry.replace('\\', '/')
-
-                if not normalized.startswith(jcr_prefix):
-                    continue
-
-                parts = normalized.split('/')
-                if parts[-1] != '.content.xml':
-                    continue
-
-                # Build JCR path from zip entry name (no filesystem colon issue)
-                rel = normalized[len(jcr_prefix):]
-                if '/' in rel:
-                    dir_part = rel.rsplit('/', 1)[0]
-                    jcr_path = '/' + dir_part
-                else:
-                    jcr_path = '/'
-
-                # AEM folder notation: _jcr_content → jcr:content
-                jcr_path = jcr_path.replace('/_jcr_content', '/jcr:content')
-
-                # Write to safe temp file — avoids Windows colon restriction
-                with open(tmp_xml, 'wb') as f:
-                    f.write(zf.read(zip_entry))
-
-                try:
-                    result = parse_content_xml(tmp_xml, jcr_path)
-                    if not result:
-                        continue
-
-                    # Store node — dict deduplicates by path
-                    # last write wins on re-run (idempotent)
-                    harvest['nodes'][jcr_path] = {
-                        'path':             jcr_path,
-                        'node_type':        result.get('node_type'),
-                        'resource_type':    result.get('resource_type'),
-                        'template':         result.get('template'),
-                        'last_modified':    result.get('last_modified'),
-                        'last_modified_by': result.get('last_modified_by'),
-                    }
-
-                    # Store properties — keyed by (path, full_name)
-                    for prop in result.get('properties', []):
-                        key = (jcr_path, prop['full_name'])
-                        harvest['properties'][key] = {
-                            'jcr_path':  jcr_path,
-                            'namespace': prop.get('namespace', ''),
-                            'name':      prop.get('name'),
-                            'full_name': prop.get('full_name'),
-                            'value':     prop.get('value'),
-                            'is_multi':  prop.get('is_multi', False),
-                        }
-
-                    # Store tag assignments as list
-                    for tag_path in result.get('tags', []):
-                        harvest['tag_assignments'].append({
-                            'jcr_path': jcr_path,
-                            'tag_path': tag_path,
-                        })
-
-                    # Store namespaces — keyed by URI
-                    for prefix, uri in result.get('namespaces', {}).items():
-                        if uri not in harvest['namespaces']:
-                            harvest['namespaces'][uri] = {
-                                'uri':    uri,
-                                'prefix': prefix,
-                            }
-
-                    # Store folder — keyed by path
-                    folder_path = _extract_folder_path(jcr_path)
-                    if folder_path and folder_path not in harvest['folders']:
-                        harvest['folders'][folder_path] = {
-                            'folder_path':   folder_path,
-                            'folder_name':   folder_path.rsplit('/', 1)[-1],
-                            'depth_level':   folder_path.count('/'),
-                            'parent_folder': (
-                                folder_path.rsplit('/', 1)[0]
-                                if '/' in folder_path.lstrip('/')
-                                else ''
-                            ),
-                        }
-
-                    # If this is a tag definition node, store it
-                    if '/content/cq:tags/' in jcr_path:
-                        tag_id = jcr_path.replace(
-                            '/content/cq:tags/', ''
-                        ).strip('/')
-                        if tag_id:
-                            title_key = (jcr_path, 'jcr:title')
-                            desc_key  = (jcr_path, 'jcr:description')
-                            title = harvest['properties'].get(
-                                title_key, {}
-                            ).get('value', '')
-                            desc  = harvest['properties'].get(
-                                desc_key, {}
-                            ).get('value', '')
-                            harvest['tags'][tag_id] = {
-                                'tag_id':      tag_id,
-                                'tag_title':   title,
-                                'description': desc,
-                                'asset_count': 0,
-                            }
-
-                except Exception as e:
-                    print(f"   WARNING Skipping {jcr_path}: {e}")
-                    continue
-
-    # Count tag usage from tag_assignments
-    for assignment in harvest['tag_assignments']:
-        raw    = assignment['tag_path']
-        tag_id = raw.replace('/content/cq:tags/', '').strip('/')
-        if tag_id in harvest['tags']:
-            harvest['tags'][tag_id]['asset_count'] += 1
+    index = open_package(zip_path)
+    try:
+        _walk_index(harvest, index, 0, scope, _new_parse_cache(max_memory))
+    finally:
+        close_package(index)
+    if harvest['spill']:
+        finish_spill(harvest)
+
+    # Count tag usage — every reference form resolves via one index
+    count_tag_usage(harvest)
 
     print(
         f"   Harvested: "
         f"{len(harvest['nodes'])} nodes, "
         f"{len(harvest['tags'])} tags, "
         f"{len(harvest['namespaces'])} namespaces, "
-        f"{len(harvest['folders'])} folders"
+        f"{len(harvest['folders'])} folders, "
+        f"{len(harvest['workflows'])} workflow steps, "
+        f"{len(harvest['unresolved_tags'])} unresolved tag references"
     )
+    walked = sum(1 for s in harvest['subpackages'] if s['status'] == 'walked')
+    if harvest['subpackages']:
+        print(f"   Sub-packages: {walked} walked, "
+              f"{len(harvest['subpackages']) - walked} skipped")
+    stats = harvest['parse_cache']
+    if stats['hits']:
+        print(f"   Parse cache: {stats['hits']} of "
+              f"{stats['hits'] + stats['misses']} entries reused "
+              f"({stats['hits'] / (stats['hits'] + stats['misses']):.1%} "
+              f"hit rate)")
+    if harvest['sample']:
+        s = harvest['sample']
+        print(f"   Sample: parsed {s['parsed']} of {s['eligible']} "
+              f"content nodes ({s['fraction']:.1%})")
+    if harvest['out_of_scope']:
+        print(f"   Out of scope: {harvest['out_of_scope']} entries "
+              f"skipped without reading")
 
     return harvest
 
 
+def _walk_index(harvest: dict, index: dict, depth: int, scope: dict,
+                cache: dict):
+    """
+    Parse one package's jcr_root/ into the harvest. Sub-packages under
+    /etc/packages/ are opened from their bytes and walked by the same
+    loop — see _walk_subpackage().
+    """
+    references = harvest['reference_index']
+    sample = harvest.get('sample')
+    all_entries = entry_names(index)
+
+    # Locate jcr_root prefix inside the zip entry names
+    jcr_prefix = None
+    for entry in all_entries:
+        normalized = entry.replace('\\', '/')
+        parts = normalized.split('/')
+        if 'jcr_root' in parts:
+            idx = parts.index('jcr_root')
+            jcr_prefix = '/'.join(parts[:idx + 1]) + '/'
+            break
+
+    if not jcr_prefix:
+        raise ValueError(
+            "No jcr_root/ found — "
+            "is this a valid AEM Package Manager export?"
+        )
+
+    # Filter roots — where a missing reference target is broken
+    # rather than simply outside this package
+    filter_entry = jcr_prefix[:-len('jcr_root/')] + FILTER_XML
+    roots = ['/']
+    if filter_entry in index['entries']:
+        try:
+            data = read_entry(index, filter_entry)
+            try:
+                roots = read_filter_roots(data) or roots
+            finally:
+                data.release()
+        except Exception as e:
+            print(f"   WARNING Unreadable {FILTER_XML}: {e}")
+    for root in roots:
+        add_root(references, root)
+    local = package_scope(scope, roots)
+
+    # Name pass — everything the entry name alone decides. Content
+    # entries queue up for the read/parse pipeline
+    work = []
+    subpackages = []
+    for zip_entry in sorted(all_entries):
+        normalized = zip_entry.replace('\\', '/')
+
+        if not normalized.startswith(jcr_prefix):
+            continue
+
+        # Every entry is a repository path — binaries included
+        paths = entry_jcr_paths(normalized[len(jcr_prefix):])
+        for path in paths:
+            add_path(references, path)
+
+        # Scope check on the name alone — nothing has been read yet
+        if local is not None and not in_scope(local, paths[0]):
+            if _is_subpackage(paths[0]):
+                keep = not is_excluded(local, paths[0])
+            elif paths[0].startswith(ALWAYS_READ_ROOTS):
+                keep = in_scope(local, paths[0], narrow=False)
+                harvest['taxonomy_pruned'] |= not keep
+            else:
+                keep = False
+            if not keep:
+                harvest['out_of_scope'] += 1
+                continue
+
+        parts = normalized.split('/')
+        if parts[-1] != '.content.xml':
+            if _is_subpackage(paths[0]):
+                subpackages.append((zip_entry, paths[0]))
+            # Binaries — sizes from the central directory only
+            elif parts[-1] and not parts[-1].endswith('.xml'):
+                add_binary(harvest, paths[0],
+                           *entry_sizes(index, zip_entry))
+            continue
+
+        # Build JCR path from zip entry name (no filesystem colon issue)
+        rel = normalized[len(jcr_prefix):]
+        if '/' in rel:
+            dir_part = rel.rsplit('/', 1)[0]
+            jcr_path = '/' + dir_part
+        else:
+            jcr_path = '/'
+
+        # AEM folder notation: _jcr_content → jcr:content
+        jcr_path = jcr_path.replace('/_jcr_content', '/jcr:content')
+
+        # --sample: the folder is known from the name, the rest is skipped
+        if sample is not None and not _always_read(jcr_path):
+            sample['eligible'] += 1
+            if not _in_sample(jcr_path, sample['fraction']):
+                _add_folder(harvest, jcr_path)
+                continue
+            sample['parsed'] += 1
+
+        work.append((zip_entry, jcr_path))
+
+    # Readers inflate, parsers build records, this thread aggregates —
+    # results arrive in entry order, so the harvest matches a serial walk
+    def read(item):
+        return read_entry(index, item[0])
+
+    stats = harvest['parse_cache']
+    spill = harvest['spill']
+    aggregated = 0
+    parse = partial(_parse_entry, cache)
+    for (_, jcr_path), parsed, error in run_pipeline(work, read, parse):
+        if error is not None:
+            print(f"   WARNING Skipping {jcr_path}: {error}")
+            continue
+        result, steps, cached, key = parsed
+        stats['hits' if cached else 'misses'] += 1
+        if isinstance(steps, Exception):
+            print(f"   WARNING Skipping workflow {jcr_path}: {steps}")
+        elif steps:
+            harvest['workflows'].extend(steps)
+        if not result:
+            continue
+        # Only this thread admits records, so the count and byte total
+        # the budget reads are exact
+        if key is not None:
+            _cache_record(cache, key, result)
+            stats['bytes'] = cache['bytes']
+        try:
+            _aggregate(harvest, jcr_path, result)
+        except Exception as e:
+            print(f"   WARNING Skipping {jcr_path}: {e}")
+
+        # --max-memory: re-estimate now and then, spill when over
+        aggregated += 1
+        if spill is not None and aggregated % SPILL_CHECK_EVERY == 0:
+            check_budget(harvest)
+
+    # After the parent's own content, as in entry order (/etc sorts late)
+    for zip_entry, jcr_path in subpackages:
+        if not _walk_subpackage(harvest, index, zip_entry,
+                                jcr_path, depth + 1, scope, cache):
+            add_binary(harvest, jcr_path, *entry_sizes(index, zip_entry))
+
+
+def _new_parse_cache(max_memory: int = None) -> dict:
+    """
+    cache = {
+        'entries':   {(size, digest): record},
+        'bytes':     int,          # estimated size of the cached records
+        'max_bytes': int or None,  # share of --max-memory, None = no cap
+    }
+    """
+    return {
+        'entries':   {},
+        'bytes':     0,
+        'max_bytes': (max_memory // PARSE_CACHE_BUDGET_SHARE
+                      if max_memory else None),
+    }
+
+
+def _cache_record(cache: dict, key: tuple, result: dict):
+    """Aggregator stage: keep a parsed record unless the cache is full —
+    by count, or by its share of --max-memory. Parser threads only read
+    the cache."""
+    entries = cache['entries']
+    if len(entries) >= PARSE_CACHE_MAX:
+        return
+    size = (NODE_ROW_BYTES
+            + PROPERTY_ROW_BYTES * len(result.get('properties', ())))
+    if cache['max_bytes'] is not None \
+            and cache['bytes'] + size > cache['max_bytes']:
+        return
+    entries[key] = result
+    cache['bytes'] += size
+
+
+def _parse_entry(cache: dict, item: tuple, data) -> tuple:
+    """
+    Parser stage: (node record, workflow steps, cache hit, cache key)
+    from one entry's bytes. Runs on a pipeline thread — touches nothing
+    but its arguments, and only reads the parse cache.
+
+    The record depends on the bytes alone except for its 'path', so a
+    repeated payload reuses the cached record with the path rebound.
+    The aggregator copies every property out, so sharing is safe. A
+    cacheable miss returns its key; the aggregator admits the record.
+    """
+    jcr_path = item[1]
+    key = None
+    if len(data) <= PARSE_CACHE_MAX_BYTES and not is_workflow_path(jcr_path):
+        key = (len(data), hashlib.blake2b(data, digest_size=16).digest())
+        cached = cache['entries'].get(key)
+        if cached is not None:
+            data.release()
+            return dict(cached, path=jcr_path), None, True, None
+    try:
+        result = parse_content_xml(data, jcr_path)
+
+        # Phase 3 — workflow models and launchers are parsed from the
+        # same bytes, so they cost no extra pass. A bad model never
+        # drops its node
+        steps = None
+        if is_workflow_path(jcr_path):
+            try:
+                steps = parse_workflow_xml(data, jcr_path)
+            except Exception as e:
+                steps = e
+    finally:
+        data.release()
+    return result, steps, False, key
+
+
+def _aggregate(harvest: dict, jcr_path: str, result: dict):
+    """Aggregator stage: one parsed node into the harvest dicts."""
+    # Store node — dict deduplicates by path
+    # last write wins on re-run (idempotent)
+    harvest['nodes'][jcr_path] = {
+        'path':             jcr_path,
+        'node_type':        result.get('node_type'),
+        'resource_type':    result.get('resource_type'),
+        'template':         result.get('template'),
+        'last_modified':    result.get('last_modified'),
+        'last_modified_by': result.get('last_modified_by'),
+    }
+
+    # Store properties — keyed by (path, full_name)
+    # Tag title/description are picked up on the way past
+    own = {}
+    for prop in result.get('properties', []):
+        key = (jcr_path, prop['full_name'])
+        harvest['properties'][key] = {
+            'jcr_path':  jcr_path,
+            'namespace': prop.get('namespace', ''),
+            'name':      prop.get('name'),
+            'full_name': prop.get('full_name'),
+            'value':     prop.get('value'),
+            'is_multi':  prop.get('is_multi', False),
+        }
+        if prop['full_name'] in TAG_TEXT_FIELDS:
+            own[prop['full_name']] = prop.get('value') or ''
+
+    # Store tag assignments — interned ids in two array('I') columns
+    add_assignments(harvest['tag_assignments'].columns, jcr_path,
+                    result.get('tags'))
+
+    # Store namespaces — keyed by URI
+    for prefix, uri in result.get('namespaces', {}).items():
+        if uri not in harvest['namespaces']:
+            harvest['namespaces'][uri] = {
+                'uri':    uri,
+                'prefix': prefix,
+            }
+
+    _add_folder(harvest, jcr_path)
+
+    # If this is a tag definition node, store it
+    if '/content/cq:tags/' in jcr_path:
+        tag_id = jcr_path.replace('/content/cq:tags/', '').strip('/')
+        if tag_id:
+            harvest['tags'][tag_id] = {
+                'tag_id':      tag_id,
+                'tag_title':   own.get('jcr:title', ''),
+                'description': own.get('jcr:description', ''),
+                'asset_count': 0,
+            }
+
+
+def _is_subpackage(jcr_path: str) -> bool:
+    return jcr_path.startswith(SUBPACKAGE_ROOT) and jcr_path.endswith('.zip')
+
+
+def _walk_subpackage(harvest: dict, index: dict, zip_entry: str,
+                     jcr_path: str, depth: int, scope: dict,
+                     cache: dict) -> bool:
+    """
+    Walk a nested package zip straight from the parent's bytes — stored
+    entries are a view into the parent mapping, deflated ones are
+    inflated in memory. Returns False when the guards skip it, so the
+    caller accounts it as a plain binary instead.
+    """
+    size, _ = entry_sizes(index, zip_entry)
+    record = {'path': jcr_path, 'depth': depth, 'bytes': size,
+              'status': 'walked'}
+    harvest['subpackages'].append(record)
+
+    if depth > MAX_SUBPACKAGE_DEPTH:
+        record['status'] = (f'skipped: nested deeper than '
+                            f'{MAX_SUBPACKAGE_DEPTH} levels')
+    elif size > MAX_SUBPACKAGE_BYTES:
+        record['status'] = (f'skipped: larger than '
+                            f'{MAX_SUBPACKAGE_BYTES // (1024 * 1024)} MB')
+    if record['status'] != 'walked':
+        print(f"   WARNING Sub-package {jcr_path} {record['status']}")
+        return False
+
+    data = None
+    nested = None
+    try:
+        data = read_entry(index, zip_entry)
+        nested = open_package_buffer(data, jcr_path)
+        _walk_index(harvest, nested, depth, scope, cache)
+    except Exception as e:
+        record['status'] = f'skipped: {e}'
+        print(f"   WARNING Sub-package {jcr_path} {record['status']}")
+    finally:
+        if nested is not None:
+            close_package(nested)
+        if data is not None:
+            data.release()
+    return record['status'] == 'walked'
+
+
+def _add_folder(harvest: dict, jcr_path: str):
+    """Store folder — keyed by path."""
+    folder_path = _extract_folder_path(jcr_path)
+    if folder_path and folder_path not in harvest['folders']:
+        harvest['folders'][folder_path] = {
+            'folder_path':   folder_path,
+            'folder_name':   folder_path.rsplit('/', 1)[-1],
+            'depth_level':   folder_path.count('/'),
+            'parent_folder': (
+                folder_path.rsplit('/', 1)[0]
+                if '/' in folder_path.lstrip('/')
+                else ''
+            ),
+        }
+
+
+def _always_read(jcr_path: str) -> bool:
+    return jcr_path.startswith(ALWAYS_READ_ROOTS) \
+        or is_workflow_path(jcr_path)
+
+
+def _in_sample(jcr_path: str, fraction: float) -> bool:
+    """
+    Deterministic: the same node is in or out on every run. Keyed on
+    the owning node (jcr:content stripped) so an asset's metadata is
+    never sampled apart from the asset itself.
+    """
+    owner = _extract_folder_path(jcr_path).encode('utf-8')
+    digest = hashlib.blake2b(owner, digest_size=8).digest()
+    return int.from_bytes(digest, 'big') < fraction * 2 ** 64
+
+
 def _extract_folder_path(jcr_path: str) -> str:
     """
     Strip /jcr:content and everything below it.
@@ -0,0 +1,133 @@
+# JCRUNCH module
+
+# Trie node key that marks the end of a stored prefix
+_END = ''
+
+# Trailing wildcards accepted on --include/--exclude and ignored —
+# every pattern already covers its whole subtree
+_WILDCARDS = ('/**', '/*', '*')
+
+
+def new_path_trie() -> dict:
+    """Segment trie: {'content': {'dam': {'': True, ...}}}"""
+    return {}
+
+
+def trie_add(trie: dict, path: str):
+    """Store a path prefix — the trie then covers its whole subtree."""
+    node = trie
+    for segment in _segments(path):
+        node = node.setdefault(segment, {})
+    node[_END] = True
+
+
+def trie_covers(trie: dict, path: str) -> bool:
+    """True when path is a stored prefix or lies below one. O(depth)."""
+    node = trie
+    if _END in node:
+        return True
+    for segment in _segments(path):
+        node = node.get(segment)
+        if node is None:
+            return False
+        if _END in node:
+            return True
+    return False
+
+
+def trie_merge(into: dict, other: dict):
+    for key, child in other.items():
+        if key == _END:
+            into[_END] = True
+        else:
+            trie_merge(into.setdefault(key, {}), child)
+
+
+def trie_paths(trie: dict, prefix: str = '') -> list:
+    """Every stored prefix, shortest first — trie_add() them to rebuild."""
+    paths = [prefix or '/'] if _END in trie else []
+    for segment, child in sorted(trie.items()):
+        if segment != _END:
+            paths += trie_paths(child, f'{prefix}/{segment}')
+    return paths
+
+
+def compile_scope(include=(), exclude=()) -> dict:
+    """
+    --include / --exclude path patterns → scope dict:
+      scope = {
+          'include': trie or None,   # None = everything
+          'exclude': trie or None,
+          'patterns': (include, exclude),
+      }
+    Patterns are repository path prefixes (/content/dam/brand-x);
+    a trailing /* or /** is accepted and means the same thing.
+    """
+    return {
+        'include':  _pattern_trie(include),
+        'exclude':  _pattern_trie(exclude),
+        'patterns': (tuple(include), tuple(exclude)),
+    }
+
+
+def package_scope(scope: dict, roots: list) -> dict:
+    """
+    The CLI scope narrowed to one package's filter.xml roots — content
+    outside every root is not installed by Package Manager, so it is
+    not audited either. Returns None when nothing can be pruned.
+    """
+    roots_trie = new_path_trie()
+    for root in roots:
+        trie_add(roots_trie, root)
+    if _END in roots_trie:
+        roots_trie = None
+    if roots_trie is None and scope is None:
+        return None
+    if scope is None:
+        scope = compile_scope()
+    if roots_trie is None and scope['include'] is None \
+            and scope['exclude'] is None:
+        return None
+    return dict(scope, roots=roots_trie)
+
+
+def in_scope(scope: dict, jcr_path: str, narrow: bool = True) -> bool:
+    """
+    Checked against the entry name — before any bytes are read.
+    narrow=False ignores --include: for entries every scoped run needs,
+    such as tag definitions.
+    """
+    if scope is None:
+        return True
+    if scope.get('roots') is not None \
+            and not trie_covers(scope['roots'], jcr_path):
+        return False
+    if narrow and scope['include'] is not None \
+            and not trie_covers(scope['include'], jcr_path):
+        return False
+    return not is_excluded(scope, jcr_path)
+
+
+def is_excluded(scope: dict, jcr_path: str) -> bool:
+    """Only the --exclude patterns — sub-packages are not narrowed by
+    --include or the parent's filter roots, their contents are."""
+    return scope is not None and scope['exclude'] is not None \
+        and trie_covers(scope['exclude'], jcr_path)
+
+
+def _pattern_trie(patterns):
+    if not patterns:
+        return None
+    trie = new_path_trie()
+    for pattern in patterns:
+        pattern = pattern.strip()
+        for wildcard in _WILDCARDS:
+            if pattern.endswith(wildcard):
+                pattern = pattern[:-len(wildcard)]
+                break
+        trie_add(trie, pattern or '/')
+    return trie
+
+
+def _segments(path: str) -> list:
+    return [s for s in path.split('/') if s]
@@ -0,0 +1,189 @@
+# JCRUNCH module
+import os
+import queue
+import threading
+
+# Threads only pay off with a core to overlap on
+_CPUS = os.cpu_count() or 1
+
+# Reader threads inflate entries — zlib releases the GIL while it works
+READ_THREADS = 2 if _CPUS > 1 else 0
+
+# Parser threads turn entry bytes into node records
+PARSE_THREADS = 2 if _CPUS > 1 else 0
+
+# Entries handed between stages together — one queue hop per batch,
+# not per entry
+BATCH_SIZE = 64
+
+# Batches in flight at once, read through aggregated — the backpressure
+# bound on memory held in decompressed buffers
+MAX_IN_FLIGHT = 8
+
+# How often a blocked thread re-checks the stop flag (seconds)
+_POLL = 0.1
+
+# End-of-stream marker on every queue
+_DONE = object()
+
+
+def run_pipeline(items: list, read, parse,
+                 read_threads: int = READ_THREADS,
+                 parse_threads: int = PARSE_THREADS,
+                 max_in_flight: int = MAX_IN_FLIGHT,
+                 batch_size: int = BATCH_SIZE):
+    """
+    Yield (item, parsed, error) for every item, in input order.
+
+      read(item) → data            on reader threads
+      parse(item, data) → parsed   on parser threads
+
+    The caller consuming the generator is the aggregator — the only
+    thread that touches the harvest. A failing read or parse comes back
+    as that item's error and the stream carries on. Anything else — a
+    bug in a stage, or the caller raising or stopping early — sets the
+    stop flag; every thread is joined before the generator returns and
+    a stage failure is re-raised in the caller.
+
+    Backpressure: at most max_in_flight batches are between the feeder
+    and the caller, so a slow aggregator stalls the readers instead of
+    piling up decompressed buffers.
+    """
+    if read_threads < 1 or parse_threads < 1 or len(items) <= batch_size:
+        yield from _run_inline(items, read, parse)
+        return
+    batches = [items[i:i + batch_size]
+               for i in range(0, len(items), batch_size)]
+
+    stop    = threading.Event()
+    slots   = threading.Semaphore(max_in_flight)
+    read_q  = queue.Queue(max_in_flight)
+    parse_q = queue.Queue(max_in_flight)
+    done_q  = queue.Queue()
+    failure = []
+
+    def guarded(stage):
+        def run():
+            try:
+                stage()
+            except BaseException as e:
+                failure.append(e)
+                stop.set()
+                done_q.put(_DONE)
+        return run
+
+    def feed():
+        try:
+            for seq, batch in enumerate(batches):
+                while not slots.acquire(timeout=_POLL):
+                    if stop.is_set():
+                        return
+                if not _put(read_q, (seq, batch), stop):
+                    return
+        finally:
+            for _ in readers:
+                _put(read_q, _DONE, stop)
+
+    def read_stage():
+        while True:
+            task = _get(read_q, stop)
+            if task is _DONE:
+                break
+            seq, batch = task
+            loaded = []
+            for item in batch:
+                try:
+                    loaded.append((item, read(item), None))
+                except Exception as e:
+                    loaded.append((item, None, e))
+            _put(parse_q, (seq, loaded), stop)
+
+    def parse_stage():
+        while True:
+            task = _get(parse_q, stop)
+            if task is _DONE:
+                break
+            seq, loaded = task
+            out = []
+            for item, data, error in loaded:
+                if error is None:
+                    try:
+                        out.append((item, parse(item, data), None))
+                        continue
+                    except Exception as e:
+                        error = e
+                out.append((item, None, error))
+            _put(done_q, (seq, out), stop)
+        done_q.put(_DONE)
+
+    readers = [threading.Thread(target=guarded(read_stage), daemon=True)
+               for _ in range(read_threads)]
+    parsers = [threading.Thread(target=guarded(parse_stage), daemon=True)
+               for _ in range(parse_threads)]
+    feeder  = threading.Thread(target=guarded(feed), daemon=True)
+
+    def close_parsers():
+        for thread in readers:
+            thread.join()
+        for _ in parsers:
+            _put(parse_q, _DONE, stop)
+
+    closer = threading.Thread(target=close_parsers, daemon=True)
+    threads = readers + parsers + [feeder, closer]
+    for thread in threads:
+        thread.start()
+
+    pending  = {}
+    next_seq = 0
+    finished = 0
+    try:
+        while finished < len(parsers) and not failure:
+            out = done_q.get()
+            if out is _DONE:
+                finished += 1
+                continue
+            seq, results = out
+            pending[seq] = results
+            while next_seq in pending:
+                results = pending.pop(next_seq)
+                next_seq += 1
+                slots.release()
+                yield from results
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    if failure:
+        raise failure[0]
+
+
+def _run_inline(items: list, read, parse):
+    """The same contract on the calling thread — small inputs, or
+    threads disabled."""
+    for item in items:
+        try:
+            yield item, parse(item, read(item)), None
+        except Exception as e:
+            yield item, None, e
+
+
+def _put(q: queue.Queue, task, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            q.put(task, timeout=_POLL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Blocking get that returns _DONE once the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL)
+        except queue.Empty:
+            continue
+    return _DONE
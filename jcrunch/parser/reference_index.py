@@ -0,0 +1,131 @@
+# JCRUNCH module
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import unquote
+
+from parser.path_filter import new_path_trie, trie_add, trie_covers, trie_merge
+
+# Property values that look like repository references
+REFERENCE_ROOTS = ('/content/', '/conf/', '/etc/', '/apps/', '/libs/', '/var/')
+
+# Vault filter definition inside the package
+FILTER_XML = 'META-INF/vault/filter.xml'
+
+_SLASHES = re.compile(r'/{2,}')
+
+
+def new_reference_index() -> dict:
+    """
+    index = {
+        'paths': set(),   # every repository path the package contains
+        'roots': {},      # segment trie of the paths the package covers
+    }
+    """
+    return {'paths': set(), 'roots': new_path_trie()}
+
+
+def add_path(index: dict, jcr_path: str):
+    """Add a path and every ancestor — stops at the first one known."""
+    paths = index['paths']
+    while jcr_path and jcr_path not in paths:
+        paths.add(jcr_path)
+        if jcr_path == '/':
+            break
+        jcr_path = jcr_path.rsplit('/', 1)[0] or '/'
+
+
+def add_root(index: dict, root: str):
+    """Mark a subtree as covered — references inside it must resolve."""
+    trie_add(index['roots'], normalise_path(root))
+
+
+def is_covered(index: dict, path: str) -> bool:
+    return trie_covers(index['roots'], path)
+
+
+def merge_reference_indexes(indexes: list) -> dict:
+    merged = new_reference_index()
+    for index in indexes:
+        merged['paths'].update(index['paths'])
+        trie_merge(merged['roots'], index['roots'])
+    return merged
+
+
+def entry_jcr_paths(rel: str) -> list:
+    """
+    Repository paths a zip entry below jcr_root/ stands for (Vault layout):
+      foo/.content.xml       → /foo
+      foo/_jcr_content/bar   → /foo/jcr:content/bar
+      foo.jpg.dir/...        → /foo.jpg/...
+      foo.xml                → /foo.xml and /foo — a file, or a node
+                               serialised in full
+    """
+    if rel.endswith('/.content.xml') or rel == '.content.xml':
+        rel = rel[:-len('.content.xml')]
+    path = '/' + rel.strip('/')
+    path = path.replace('/_jcr_content', '/jcr:content')
+    if '.dir/' in path or path.endswith('.dir'):
+        path = '/'.join(
+            seg[:-4] if seg.endswith('.dir') else seg
+            for seg in path.split('/')
+        )
+    if path.endswith('.xml'):
+        return [path, path[:-4]]
+    return [path]
+
+
+def normalise_path(value: str) -> str:
+    """Drop query/fragment, percent-decode, collapse and trim slashes."""
+    path = value.strip().split('?', 1)[0].split('#', 1)[0]
+    if '%' in path:
+        path = unquote(path)
+    if '//' in path:
+        path = _SLASHES.sub('/', path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+    return path
+
+
+def reference_target(value) -> str:
+    """Normalised path if the value is a repository reference, else ''."""
+    if not value or value[0] != '/' or not value.startswith(REFERENCE_ROOTS):
+        return ''
+    if '\n' in value:
+        return ''
+    return normalise_path(value)
+
+
+def resolve_reference(index: dict, path: str):
+    """
+    (status, resolved_path) for a normalised reference:
+      'ok'       the path exists — directly or as page.selectors.html
+      'broken'   inside a covered root, but nothing is there
+      'external' outside everything the package covers
+    One set lookup on the common path; O(depth) otherwise.
+    """
+    paths = index['paths']
+    if path in paths:
+        return 'ok', path
+
+    # Page links: /content/site/page.html, /content/site/page.print.html
+    parent, _, leaf = path.rpartition('/')
+    if '.' in leaf:
+        page = f"{parent}/{leaf.split('.', 1)[0]}"
+        if page in paths:
+            return 'ok', page
+
+    if is_covered(index, path):
+        return 'broken', path
+    return 'external', path
+
+
+def read_filter_roots(xml_source) -> list:
+    """<filter root="..."> values from a Vault filter.xml."""
+    if isinstance(xml_source, str):
+        with open(xml_source, 'rb') as f:
+            xml_source = f.read()
+    root = ET.fromstring(bytes(xml_source))
+    return [
+        el.get('root') for el in root.iter()
+        if el.tag.rsplit('}', 1)[-1] == 'filter' and el.get('root')
+    ]
@@ -0,0 +1,269 @@
+# JCRUNCH module
+import atexit
+import heapq
+import mmap
+import os
+import pickle
+import shutil
+import tempfile
+from array import array
+
+# Estimated resident bytes per harvest record — measured on generated
+# packages with sys.getsizeof (row dict, key tuple, value strings)
+PROPERTY_ROW_BYTES = 550
+NODE_ROW_BYTES     = 600
+ASSIGNMENT_BYTES   = 8
+
+# How often the walk re-estimates the harvest (aggregated nodes)
+SPILL_CHECK_EVERY = 1024
+
+# Never write a run smaller than this — spilling a handful of rows
+# frees nothing and only adds files to merge
+SPILL_MIN_ROWS = 10_000
+
+# Property rows pickled together in a run file
+SPILL_CHUNK_ROWS = 4096
+
+# --max-memory suffixes
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3,
+               'T': 1024 ** 4}
+
+
+def parse_size(text: str) -> int:
+    """'512M', '4G', '1.5g', '2000000' → bytes. ValueError otherwise."""
+    text = text.strip().upper().removesuffix('B').removesuffix('I')
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ''
+    number = float(text[:len(text) - len(unit)])
+    if number <= 0:
+        raise ValueError(f"memory limit must be positive: {text}")
+    return int(number * _SIZE_UNITS[unit])
+
+
+def new_spill(limit: int) -> dict:
+    """
+    harvest['spill'] for --max-memory:
+      spill = {
+          'limit':       bytes,       # budget for the harvest
+          'dir':         path,        # temp dir, created on first spill
+          'runs':        [path],      # sorted property run files
+          'columns':     {'node': path, 'tag': path} or None,
+          'column_rows': int,         # assignments in the column files
+          'bytes':       int,         # written to disk so far
+          'properties':  int,         # property rows spilled
+          'assignments': int,         # tag assignments spilled
+          'warned':      bool,
+      }
+    """
+    return {
+        'limit': limit, 'dir': None, 'runs': [], 'columns': None,
+        'column_rows': 0, 'bytes': 0, 'properties': 0, 'assignments': 0,
+        'warned': False,
+    }
+
+
+def harvest_bytes(harvest: dict) -> int:
+    """Estimated resident size of the harvest's growing collections,
+    parse cache included."""
+    return (len(harvest['properties']) * PROPERTY_ROW_BYTES
+            + len(harvest['nodes']) * NODE_ROW_BYTES
+            + len(harvest['tag_assignments']) * ASSIGNMENT_BYTES
+            + harvest.get('parse_cache', {}).get('bytes', 0))
+
+
+def check_budget(harvest: dict):
+    """
+    Called by the walk every SPILL_CHECK_EVERY nodes. Over budget, the
+    in-memory properties go to disk as one sorted run and the tag
+    assignment columns are appended to their column files.
+    """
+    spill = harvest['spill']
+    if harvest_bytes(harvest) <= spill['limit']:
+        return
+    if len(harvest['properties']) < SPILL_MIN_ROWS:
+        if not spill['warned']:
+            spill['warned'] = True
+            print(f"   WARNING Node records alone exceed --max-memory "
+                  f"({_format_bytes(spill['limit'])}) — only properties "
+                  f"and tag assignments can spill")
+        return
+    if spill['dir'] is None:
+        spill['dir'] = tempfile.mkdtemp(prefix='jcrunch-spill-')
+        atexit.register(shutil.rmtree, spill['dir'], ignore_errors=True)
+    _spill_properties(harvest, spill)
+    _spill_assignments(harvest['tag_assignments'].columns, spill)
+
+
+def finish_spill(harvest: dict):
+    """
+    After the walk: swap in disk-backed views over everything spilled.
+    Nothing is read back here — the audits stream the runs.
+    """
+    spill = harvest['spill']
+    if not spill['runs']:
+        return
+    harvest['properties'] = SpilledProperties(
+        spill['runs'] + [harvest['properties']])
+    columns = harvest['tag_assignments'].columns
+    for name in ('node', 'tag'):
+        columns[name] = SpilledColumn(spill['columns'][name],
+                                      spill['column_rows'], columns[name])
+    print(f"   Spilled: {_format_bytes(spill['bytes'])} in "
+          f"{len(spill['runs'])} runs — {spill['properties']} properties, "
+          f"{spill['assignments']} tag assignments "
+          f"(--max-memory {_format_bytes(spill['limit'])})")
+
+
+def merge_properties(property_maps: list):
+    """merge_harvests for properties: a plain dict when nothing spilled,
+    otherwise one SpilledProperties over every harvest's sources, in
+    harvest order."""
+    if not any(isinstance(p, SpilledProperties) for p in property_maps):
+        merged = {}
+        for properties in property_maps:
+            merged.update(properties)
+        return merged
+    sources = []
+    for properties in property_maps:
+        if isinstance(properties, SpilledProperties):
+            sources.extend(properties.sources)
+        elif properties:
+            sources.append(properties)
+    return SpilledProperties(sources)
+
+
+def property_key(row: dict) -> tuple:
+    return row['jcr_path'], row['full_name']
+
+
+class SpilledProperties:
+    """
+    harvest['properties'] once it has spilled: sorted run files plus
+    in-memory dicts, read as one mapping by a k-way merge in key order.
+    A key in a later source replaces the same key in an earlier one —
+    last write wins, as with the plain dict. Only iteration is offered;
+    there is no random access into the runs.
+    """
+    __slots__ = ('sources', '_len')
+
+    def __init__(self, sources: list):
+        self.sources = sources
+        self._len = None
+
+    def __bool__(self):
+        return any(isinstance(s, str) or s for s in self.sources)
+
+    def __len__(self):
+        # One pass over the merge, then remembered
+        if self._len is None:
+            self._len = sum(1 for _ in self.values())
+        return self._len
+
+    def __iter__(self):
+        for row in self.values():
+            yield property_key(row)
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for row in self.values():
+            yield property_key(row), row
+
+    def values(self):
+        streams = [_read_run(s) if isinstance(s, str)
+                   else sorted(s.values(), key=property_key)
+                   for s in self.sources]
+        pending = None
+        # heapq.merge is stable — equal keys arrive in source order
+        for row in heapq.merge(*streams, key=property_key):
+            if pending is not None \
+                    and property_key(pending) != property_key(row):
+                yield pending
+            pending = row
+        if pending is not None:
+            yield pending
+
+
+class SpilledColumn:
+    """
+    An array('I') assignment column whose head lives in a column file —
+    memory-mapped for reads — and whose tail is still in memory. Enough
+    of array's interface for parser/assignments.py and the audits.
+    """
+    __slots__ = ('path', 'head', 'tail', '_map')
+
+    def __init__(self, path: str, rows: int, tail: array):
+        self.path = path
+        self.tail = tail
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.head = memoryview(self._map).cast('I')[:rows]
+
+    typecode = 'I'
+
+    def __len__(self):
+        return len(self.head) + len(self.tail)
+
+    def __iter__(self):
+        yield from self.head
+        yield from self.tail
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i < len(self.head):
+            return self.head[i]
+        return self.tail[i - len(self.head)]
+
+    def append(self, value):
+        self.tail.append(value)
+
+    def extend(self, values):
+        self.tail.extend(values)
+
+
+def _spill_properties(harvest: dict, spill: dict):
+    rows = sorted(harvest['properties'].values(), key=property_key)
+    path = os.path.join(spill['dir'], f"properties-{len(spill['runs'])}.run")
+    with open(path, 'wb') as f:
+        for i in range(0, len(rows), SPILL_CHUNK_ROWS):
+            pickle.dump(rows[i:i + SPILL_CHUNK_ROWS], f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        spill['bytes'] += f.tell()
+    spill['runs'].append(path)
+    spill['properties'] += len(rows)
+    harvest['properties'] = {}
+
+
+def _spill_assignments(columns: dict, spill: dict):
+    """Assignment ids are appended in arrival order — usage is counted
+    by a streaming pass, so sorting them would buy nothing."""
+    if spill['columns'] is None:
+        spill['columns'] = {name: os.path.join(spill['dir'], f'{name}.col')
+                            for name in ('node', 'tag')}
+    for name, path in spill['columns'].items():
+        with open(path, 'ab') as f:
+            columns[name].tofile(f)
+        spill['bytes'] += len(columns[name]) * columns[name].itemsize
+    spill['column_rows'] += len(columns['node'])
+    spill['assignments'] += len(columns['node'])
+    columns['node'] = array('I')
+    columns['tag'] = array('I')
+
+
+def _read_run(path: str):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def _format_bytes(n: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:,.0f} {unit}" if unit == 'B' else f"{n:,.1f} {unit}"
+        n /= 1024
+
@@ -0,0 +1,82 @@
+# JCRUNCH module
+
+# Binaries under .../jcr:content/renditions/ are DAM renditions
+RENDITIONS_DIR = '/jcr:content/renditions/'
+
+# Everything that is not a DAM rendition
+OTHER_FILES = '(other files)'
+
+
+def add_binary(harvest: dict, jcr_path: str, size: int, compressed: int):
+    """
+    Account one binary entry from its central-directory sizes —
+    nothing is decompressed.
+
+    harvest['storage'] = {owner_path: [bytes, compressed, files,
+                                       original_bytes, rendition_bytes]}
+      owner_path is the path with /jcr:content and below stripped —
+      the asset for renditions, the file itself for plain nt:files.
+    harvest['rendition_storage'] = {type: {'rendition_type', 'files',
+                                          'bytes', 'compressed_bytes'}}
+    """
+    _, sep, name = jcr_path.partition(RENDITIONS_DIR)
+    if sep and '/' not in name:
+        kind = rendition_type(name)
+    else:
+        kind = OTHER_FILES
+    owner = jcr_path.split('/jcr:content', 1)[0]
+
+    totals = harvest['storage'].get(owner)
+    if totals is None:
+        totals = harvest['storage'][owner] = [0, 0, 0, 0, 0]
+    totals[0] += size
+    totals[1] += compressed
+    totals[2] += 1
+    if kind == 'original':
+        totals[3] += size
+    elif kind != OTHER_FILES:
+        totals[4] += size
+
+    row = harvest['rendition_storage'].get(kind)
+    if row is None:
+        row = harvest['rendition_storage'][kind] = {
+            'rendition_type':   kind,
+            'files':            0,
+            'bytes':            0,
+            'compressed_bytes': 0,
+        }
+    row['files']            += 1
+    row['bytes']            += size
+    row['compressed_bytes'] += compressed
+
+
+def rendition_type(name: str) -> str:
+    """
+    Rendition file name → type, dimensions and extension dropped:
+      original                     → original
+      cq5dam.thumbnail.48.48.png   → cq5dam.thumbnail
+      cq5dam.web.1280.1280.jpeg    → cq5dam.web
+      cqdam.text.txt               → cqdam.text
+    """
+    parts = name.split('.')
+    if len(parts) > 1:
+        parts = parts[:-1]
+    words = [p for p in parts if not p.isdigit()]
+    return '.'.join(words[:2]) or name
+
+
+def merge_storage(harvests: list) -> tuple:
+    """(storage, rendition_storage) across packages. Owners follow the
+    nodes rule — last package wins; rendition totals are summed."""
+    storage, renditions = {}, {}
+    for h in harvests:
+        storage.update(h.get('storage', {}))
+        for kind, row in h.get('rendition_storage', {}).items():
+            into = renditions.setdefault(kind, {
+                'rendition_type': kind, 'files': 0,
+                'bytes': 0, 'compressed_bytes': 0,
+            })
+            into['files']            += row['files']
+            into['bytes']            += row['bytes']
+            into['compressed_bytes'] += row['compressed_bytes']
+    return storage, renditions
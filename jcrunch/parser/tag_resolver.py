@@ -1,30 +1,123 @@
-def build_tag_hierarchy(tag_id: str, tag_lookup: dict) -> dict:
+from array import array
+
+from parser.assignments import as_columns, first_paths, ref_counts
+
+# Hierarchy columns on the Phase 1 sheet (L1–L4)
+HIERARCHY_LEVELS = 4
+
+
+def build_tag_closure(tag_ids) -> dict:
+    """
+    Closure table over the tag tree, built in one pass.
+
+    Ids follow sorted tag_id order, so a parent always precedes its
+    children. Each tag's ancestor list is its parent's list plus the
+    parent — never re-derived from the string. A tag's tree parent is
+    its nearest ancestor present in the harvest.
+
+    closure = {
+        'ids':        [tag_id, ...],   # id → tag_id
+        'index':      {tag_id: id},
+        'parent':     array('i'),      # id → parent id, -1 = root
+        'depth':      array('i'),      # id → segments in tag_id
+        'anc_start':  array('i'),      # ancestors of i, root first:
+        'anc_ids':    array('i'),      #   anc_ids[anc_start[i]:
+                                       #           anc_start[i + 1]]
+    }
+    """
+    ids   = sorted(tag_ids)
+    index = {tag_id: i for i, tag_id in enumerate(ids)}
+    n     = len(ids)
+
+    parent    = array('i', [-1]) * n
+    depth     = array('i', [0]) * n
+    anc_start = array('i', [0]) * (n + 1)
+    anc_ids   = array('i')
+    for i, tag_id in enumerate(ids):
+        depth[i] = tag_id.count('/') + 1
+        pid = _nearest_tag_ancestor(tag_id, index)
+        parent[i] = pid
+        anc_start[i] = len(anc_ids)
+        if pid >= 0:
+            anc_ids.extend(anc_ids[anc_start[pid]:anc_start[pid + 1]])
+            anc_ids.append(pid)
+    anc_start[n] = len(anc_ids)
+
+    return {
+        'ids':       ids,
+        'index':     index,
+        'parent':    parent,
+        'depth':     depth,
+        'anc_start': anc_start,
+        'anc_ids':   anc_ids,
+    }
+
+
+def tag_ancestors(closure: dict, tid: int):
+    """Ancestor ids of tag tid, root first — a slice, no string work."""
+    start = closure['anc_start']
+    return closure['anc_ids'][start[tid]:start[tid + 1]]
+
+
+def rollup_tag_subtrees(closure: dict, usage) -> dict:
+    """
+    Bottom-up over the closure: ids high → low visit children before
+    parents, so each tag is added to its parent exactly once. O(n).
+    Returns {'subtree_usage': array, 'descendant_count': array}.
     """
-    Given a tag ID like 'wknd-shared/activity/cycling',
-    build the L1-L4 hierarchy columns.
+    parent  = closure['parent']
+    subtree = array('q', usage)
+    descendants = array('q', [0]) * len(parent)
+    for tid in range(len(parent) - 1, -1, -1):
+        pid = parent[tid]
+        if pid >= 0:
+            subtree[pid] += subtree[tid]
+            descendants[pid] += descendants[tid] + 1
+    return {'subtree_usage': subtree, 'descendant_count': descendants}
 
-    tag_lookup = {tag_id: {'tag_title': ..., 'description': ...}}
 
-    Returns dict with l1_id, l1_title, l1_desc ... l4_id, l4_title, l4_desc
+def closure_hierarchy(closure: dict, tid: int, tag_lookup: dict) -> dict:
     """
-    parts = tag_id.split('/')
+    Phase 1 hierarchy columns from the closure — l1_id, l1_title,
+    l1_desc ... l4_desc, blank below the tag's own depth — plus
+    'title_path', the titles of every level ('Activity > Cycling'), so
+    tags deeper than L4 keep their full lineage.
+    """
+    ids, depth = closure['ids'], closure['depth']
     result = {}
-    for level in range(1, 5):
-        if level <= len(parts):
-            ancestor_id = '/'.join(parts[:level])
-            ancestor    = tag_lookup.get(ancestor_id, {})
-            result[f'l{level}_id']    = ancestor_id
+    titles = []
+    for aid in list(tag_ancestors(closure, tid)) + [tid]:
+        ancestor = tag_lookup.get(ids[aid], {})
+        titles.append(ancestor.get('tag_title') or ids[aid].rsplit('/', 1)[-1])
+        level = depth[aid]
+        if level <= HIERARCHY_LEVELS:
+            result[f'l{level}_id']    = ids[aid]
             result[f'l{level}_title'] = ancestor.get('tag_title', '')
             result[f'l{level}_desc']  = ancestor.get('description', '')
+
+    # Levels with no tag node of their own keep their id, as before
+    parts = None
+    for level in range(1, HIERARCHY_LEVELS + 1):
+        if f'l{level}_id' in result:
+            continue
+        if level <= depth[tid]:
+            parts = parts or ids[tid].split('/')
+            result[f'l{level}_id'] = '/'.join(parts[:level])
         else:
-            result[f'l{level}_id']    = ''
-            result[f'l{level}_title'] = ''
-            result[f'l{level}_desc']  = ''
+            result[f'l{level}_id'] = ''
+        result[f'l{level}_title'] = ''
+        result[f'l{level}_desc']  = ''
+    result['title_path'] = ' > '.join(titles)
     return result
 
 
-def calculate_depth(tag_id: str) -> int:
-    return tag_id.count('/') + 1
+def _nearest_tag_ancestor(tag_id: str, index: dict) -> int:
+    while '/' in tag_id:
+        tag_id = tag_id.rsplit('/', 1)[0]
+        pid = index.get(tag_id)
+        if pid is not None:
+            return pid
+    return -1
 
 
 def extract_parent(tag_id: str) -> str:
@@ -35,3 +128,126 @@ def extract_parent(tag_id: str) -> str:
 
 def extract_label(tag_id: str) -> str:
     return tag_id.rsplit('/', 1)[-1]
+
+
+# Path prefixes a tag reference may carry (current and legacy)
+TAG_ROOTS = ('/content/cq:tags/', '/etc/tags/')
+
+# AEM puts namespace-less tag IDs in the 'default' namespace
+DEFAULT_TAG_NAMESPACE = 'default'
+
+
+def build_tag_index(tag_ids) -> dict:
+    """
+    Map every accepted reference form of every tag to a dense int ID.
+    Built once per harvest; resolving an assignment is then one dict
+    lookup.
+
+    For tag_id 'wknd-shared/activity/cycling' the accepted forms are:
+      wknd-shared/activity/cycling                  (bare id)
+      wknd-shared:activity/cycling                  (namespace:path)
+      /content/cq:tags/wknd-shared/activity/cycling (full path)
+      /etc/tags/wknd-shared/activity/cycling        (legacy path)
+    Namespace roots also accept 'ns:'; tags in the default namespace
+    also accept their path without a namespace.
+
+    index = {'ids': [tag_id, ...], 'lookup': {reference: int}}
+    """
+    ids = list(tag_ids)
+    lookup = {tag_id: i for i, tag_id in enumerate(ids)}
+
+    # Aliases never shadow a real tag id
+    for i, tag_id in enumerate(ids):
+        namespace, _, path = tag_id.partition('/')
+        for root in TAG_ROOTS:
+            lookup.setdefault(root + tag_id, i)
+        lookup.setdefault(f'{namespace}:{path}', i)
+        if namespace == DEFAULT_TAG_NAMESPACE and path:
+            lookup.setdefault(path, i)
+
+    return {'ids': ids, 'lookup': lookup}
+
+
+def resolve_tag_ref(index: dict, raw: str):
+    """
+    Int tag ID for any reference form, or None if unresolved.
+    Unusual spellings (whitespace, trailing slash) are normalised once
+    and memoised in the index, so repeats are still one lookup.
+    """
+    lookup = index['lookup']
+    tag_int = lookup.get(raw)
+    if tag_int is not None:
+        return tag_int if tag_int >= 0 else None
+
+    ref = raw.strip().rstrip('/')
+    for root in TAG_ROOTS:
+        if ref.startswith(root):
+            ref = ref[len(root):]
+            break
+    if ':' in ref:
+        namespace, _, path = ref.partition(':')
+        ref = f'{namespace}/{path}' if path else namespace
+
+    tag_int = lookup.get(ref)
+    if tag_int is None and ref and ':' not in raw:
+        tag_int = lookup.get(f'{DEFAULT_TAG_NAMESPACE}/{ref}')
+    if tag_int is not None and tag_int < 0:
+        # ref is itself a memoised unresolved spelling
+        tag_int = None
+
+    # -1 memoises "unresolved" so a bad reference is only parsed once
+    lookup[raw] = -1 if tag_int is None else tag_int
+    return tag_int
+
+
+def count_tag_usage(harvest: dict) -> dict:
+    """
+    Set asset_count on every tag from harvest['tag_assignments'] and
+    collect references that match no tag into
+    harvest['unresolved_tags'] = {raw: {tag_ref, reference_count,
+                                        example_path}}.
+    Returns the unresolved dict.
+
+    Assignments are counted per distinct reference string on the
+    integer tag column (parser/assignments.py), so each spelling is
+    resolved once however many nodes use it.
+
+    When harvest['taxonomy_pruned'] is set (--exclude or filter.xml
+    dropped tag definitions) every reference would look unresolved, so
+    none are reported.
+    """
+    tags    = harvest.get('tags', {})
+    index   = build_tag_index(tags)
+    counts  = [0] * len(index['ids'])
+    columns = as_columns(harvest.get('tag_assignments', []))
+    unresolved = {}
+
+    missing = {}
+    for ref_id, used in ref_counts(columns).items():
+        tag_int = resolve_tag_ref(index, columns['refs'][ref_id])
+        if tag_int is not None:
+            counts[tag_int] += used
+        else:
+            missing[ref_id] = used
+
+    # Example nodes for every unresolved reference in one column pass
+    examples = first_paths(columns, missing)
+    for ref_id, used in missing.items():
+        raw = columns['refs'][ref_id]
+        unresolved[raw] = {
+            'tag_ref':         raw,
+            'reference_count': used,
+            'example_path':    examples[ref_id],
+        }
+
+    for tag_id, count in zip(index['ids'], counts):
+        tags[tag_id]['asset_count'] = count
+        tags[tag_id].pop('sample_count', None)
+
+    if harvest.get('taxonomy_pruned') and unresolved:
+        print(f"   [!] Tag definitions are out of scope — "
+              f"{len(unresolved)} unresolved tag references not reported")
+        unresolved = {}
+
+    harvest['unresolved_tags'] = unresolved
+    return unresolved
@@ -0,0 +1,230 @@
+# JCRUNCH module
+import re
+import xml.etree.ElementTree as ET
+
+from parser.xml_parser import _clark_to_prefixed
+
+# Where AEM keeps workflow models and launchers
+# (runtime copies, design-time /conf and /libs, and legacy /etc)
+WORKFLOW_MODEL_PATH = re.compile(
+    r'^/(?:var/workflow/models'
+    r'|(?:conf/[^/]+|libs|apps)/settings/workflow/models'
+    r'|etc/workflow/models)/'
+)
+WORKFLOW_LAUNCHER_PATH = re.compile(
+    r'^/(?:(?:conf/[^/]+|libs|apps)/settings/workflow/launcher'
+    r'|etc/workflow/launcher)(?:/|$)'
+)
+
+# prefix:name tokens inside values (not path segments like /jcr:content)
+FIELD_TOKEN = re.compile(r'(?<![/\w:])([A-Za-z][\w.-]*):([A-Za-z_][\w.-]*)')
+TAG_REF     = re.compile(r'/(?:content/cq:tags|etc/tags)/([^\s,"\[\]]+)')
+
+# Attribute names that carry routing logic
+CONDITION_ATTRS = ('rule', 'condition', 'script', 'glob', 'eventtype')
+
+# Attributes whose values are node types, not content fields
+TYPE_ATTRS = {'jcr:primaryType', 'jcr:mixinTypes', 'sling:resourceType'}
+
+# Step types that only mark the start/end of a runtime model
+MARKER_TYPES = {'START', 'END'}
+
+
+def is_workflow_path(jcr_path: str) -> bool:
+    return bool(WORKFLOW_MODEL_PATH.match(jcr_path)
+                or WORKFLOW_LAUNCHER_PATH.match(jcr_path))
+
+
+def parse_workflow_xml(xml_source, jcr_path: str) -> list:
+    """
+    Turn a workflow model or launcher .content.xml into Phase 3 step
+    records. Works on the same bytes walk_package already read — no
+    extra pass over the zip.
+
+    Runtime models (/var/workflow/models) list steps as
+    cq:WorkflowNode children of <nodes>, with routing on <transitions>.
+    Design-time models (/conf/*/settings/workflow/models) list steps
+    as components under jcr:content/flow.
+
+    Returns list of:
+      {'step_number', 'step_name', 'step_type', 'fields_affected',
+       'tags_used', 'conditions', 'workflow_model', 'workflow_path'}
+    """
+    root, prefixes = _parse_tree(xml_source)
+
+    if WORKFLOW_LAUNCHER_PATH.match(jcr_path):
+        return _launcher_records(root, prefixes, jcr_path)
+
+    nodes = _find_child(root, prefixes, 'nodes')
+    if nodes is not None:
+        return _runtime_model_records(root, nodes, prefixes, jcr_path)
+
+    # Page root with jcr:content/flow, or a split-out jcr:content entry
+    content = _find_child(root, prefixes, 'jcr:content')
+    if content is None:
+        content = root
+    flow = _find_child(content, prefixes, 'flow')
+    if flow is not None:
+        title = _attr(content, prefixes, 'jcr:title')
+        return _design_model_records(flow, prefixes, jcr_path, title)
+
+    return []
+
+
+def _runtime_model_records(root, nodes, prefixes, jcr_path):
+    model = _attr(root, prefixes, 'title') or jcr_path.rsplit('/', 1)[-1]
+
+    # Incoming transition rules per target node
+    incoming = {}
+    transitions = _find_child(root, prefixes, 'transitions')
+    if transitions is not None:
+        for t in transitions:
+            rule = _attr(t, prefixes, 'rule')
+            if rule:
+                incoming.setdefault(_attr(t, prefixes, 'to'), []).append(
+                    f"from {_attr(t, prefixes, 'from')}: {rule}"
+                )
+
+    records = []
+    for node in nodes:
+        step_type = _attr(node, prefixes, 'type') or 'UNKNOWN'
+        if step_type.upper() in MARKER_TYPES:
+            continue
+        name  = _name(node, prefixes)
+        title = _attr(node, prefixes, 'title') or name
+        conditions = incoming.get(name, []) + _conditions(node, prefixes)
+        records.append(_record(
+            len(records) + 1, model, title, step_type,
+            node, prefixes, conditions, jcr_path
+        ))
+    return records
+
+
+def _design_model_records(flow, prefixes, jcr_path, title):
+    model = title or \
+        jcr_path.split('/jcr:content')[0].rsplit('/', 1)[-1]
+    records = []
+    for step in flow.iter():
+        if step is flow:
+            continue
+        resource = _attr(step, prefixes, 'sling:resourceType')
+        if not resource:
+            continue
+        step_type = resource.rstrip('/').rsplit('/', 1)[-1]
+        title = _attr(step, prefixes, 'jcr:title') or _name(step, prefixes)
+        records.append(_record(
+            len(records) + 1, model, title, step_type,
+            step, prefixes, _conditions(step, prefixes), jcr_path
+        ))
+    return records
+
+
+def _launcher_records(root, prefixes, jcr_path):
+    launchers = [
+        el for el in root.iter()
+        if _attr(el, prefixes, 'jcr:primaryType') == 'cq:WorkflowLauncher'
+    ]
+    records = []
+    for el in launchers:
+        model = _attr(el, prefixes, 'workflow') or ''
+        name  = _name(el, prefixes) if el is not root \
+            else jcr_path.rsplit('/', 1)[-1]
+        conditions = [
+            f'{key}={_attr(el, prefixes, key)}'
+            for key in ('eventType', 'glob', 'nodetype', 'conditions',
+                        'excludeList', 'runModes', 'enabled')
+            if _attr(el, prefixes, key)
+        ]
+        records.append(_record(
+            0, model.rsplit('/', 1)[-1] or 'Launcher', f'Launcher: {name}',
+            'LAUNCHER', el, prefixes, conditions, jcr_path
+        ))
+    return records
+
+
+def _record(number, model, title, step_type, element, prefixes,
+            conditions, jcr_path):
+    values = [
+        v for el in element.iter() for k, v in el.attrib.items()
+        if _clark_to_prefixed(k, prefixes) not in TYPE_ATTRS
+    ]
+    known  = set(prefixes)
+
+    fields = []
+    for value in values:
+        for prefix, local in FIELD_TOKEN.findall(value):
+            token = f'{prefix}:{local}'
+            if prefix in known and token not in fields:
+                fields.append(token)
+
+    tags = []
+    for value in values:
+        for tag_id in TAG_REF.findall(value):
+            if tag_id not in tags:
+                tags.append(tag_id)
+
+    return {
+        'step_number':     number,
+        'step_name':       f'{model} / {title}',
+        'step_type':       step_type,
+        'fields_affected': ', '.join(fields),
+        'tags_used':       ', '.join(tags),
+        'conditions':      ' | '.join(conditions),
+        'workflow_model':  model,
+        'workflow_path':   jcr_path,
+    }
+
+
+def _conditions(element, prefixes):
+    found = []
+    for el in element.iter():
+        for key, value in el.attrib.items():
+            local = _clark_to_prefixed(key, prefixes).rsplit(':', 1)[-1]
+            if value and local.lower().startswith(CONDITION_ATTRS):
+                found.append(f'{local}={value}')
+    return found
+
+
+def _parse_tree(xml_source):
+    """Full element tree plus {prefix: uri} for every declared namespace."""
+    if isinstance(xml_source, str):
+        with open(xml_source, 'rb') as f:
+            xml_source = f.read()
+
+    namespaces = {}
+    root = None
+    pull = ET.XMLPullParser(events=['start-ns', 'start'])
+    pull.feed(xml_source)
+    pull.close()
+    for event, elem in pull.read_events():
+        if event == 'start-ns':
+            prefix, uri = elem
+            namespaces[prefix] = uri
+        elif root is None:
+            root = elem
+    return root, namespaces
+
+
+def _find_child(element, prefixes, name):
+    if element is None:
+        return None
+    for child in element:
+        if _name(child, prefixes) == name:
+            return child
+    return None
+
+
+def _name(element, prefixes):
+    return _clark_to_prefixed(element.tag, prefixes)
+
+
+def _attr(element, prefixes, name):
+    """Attribute by prefixed name, e.g. 'jcr:title' or plain 'title'."""
+    if element is None:
+        return ''
+    if ':' in name:
+        prefix, local = name.split(':', 1)
+        uri = prefixes.get(prefix)
+        if uri:
+            return element.attrib.get(f'{{{uri}}}{local}', '')
+    return element.attrib.get(name, '')
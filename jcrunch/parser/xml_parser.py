@@ -3,10 +3,17 @@ import re
 
 MULTI_VALUE_PATTERN = re.compile(r'^\[(.+)\]$')
 
-def parse_content_xml(xml_path: str, jcr_path: str) -> dict:
+# Bytes fed to the pull parser per step — the root element of a
+# .content.xml almost always fits in the first chunk
+FEED_CHUNK = 64 * 1024
+
+def parse_content_xml(xml_source, jcr_path: str) -> dict:
     """
     Parse a single AEM .content.xml file.
 
+    xml_source is a file path, or the entry's bytes (bytes, bytearray or
+    memoryview) as served by parser.zip_index — no temp file needed.
+
     Input XML example:
       <jcr:root xmlns:jcr="http://www.jcp.org/jcr/1.0"
                 xmlns:cq="http://www.day.com/jcr/cq/1.0"
@@ -32,21 +39,33 @@ def parse_content_xml(xml_path: str, jcr_path: str) -> dict:
                  'properties:orientation/landscape']
       }
     """
+    if isinstance(xml_source, str):
+        with open(xml_source, 'rb') as f:
+            xml_source = f.read()
+
     # ElementTree strips xmlns: declarations from root.attrib.
-    # Use iterparse with start-ns to capture them before they disappear.
+    # Use a pull parser with start-ns to capture them before they
+    # disappear, and stop feeding as soon as the root element opens.
     namespaces = {}
     root = None
     try:
-        for event, elem in ET.iterparse(xml_path, events=['start-ns', 'start']):
-            if event == 'start-ns':
-                prefix, uri = elem
-                namespaces[prefix] = uri
-            elif event == 'start':
-                root = elem
+        pull = ET.XMLPullParser(events=['start-ns', 'start'])
+        view = memoryview(xml_source)
+        for offset in range(0, len(view), FEED_CHUNK):
+            pull.feed(view[offset:offset + FEED_CHUNK])
+            for event, elem in pull.read_events():
+                if event == 'start-ns':
+                    prefix, uri = elem
+                    namespaces[prefix] = uri
+                elif event == 'start':
+                    root = elem
+                    break
+            if root is not None:
                 break
+        if root is None:
+            pull.close()
     except ET.ParseError:
-        with open(xml_path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
+        content = bytes(xml_source).decode('utf-8', errors='replace')
         root = ET.fromstring(content)
         # Re-extract any xmlns: that survived as plain attribs (fallback only)
         for key, val in root.attrib.items():
@@ -0,0 +1,213 @@
+# JCRUNCH module
+import io
+import mmap
+import struct
+import zipfile
+import zlib
+
+# Zip record signatures and fixed sizes (APPNOTE 4.3)
+_EOCD_SIG      = b'PK\x05\x06'
+_EOCD64_LOC    = b'PK\x06\x07'
+_EOCD64_SIG    = b'PK\x06\x06'
+_CDIR_SIG      = b'PK\x01\x02'
+_LOCAL_SIG     = b'PK\x03\x04'
+_EOCD_SIZE     = 22
+_CDIR_SIZE     = 46
+_LOCAL_SIZE    = 30
+_MAX_COMMENT   = 0xFFFF
+
+_CDIR_STRUCT   = struct.Struct('<4s6H3I5H2I')
+_EOCD_STRUCT   = struct.Struct('<4s4H2IH')
+_EOCD64_STRUCT = struct.Struct('<4sQ2H2I4Q')
+
+_FLAG_ENCRYPTED = 0x1
+_FLAG_UTF8      = 0x800
+
+
+def open_package(zip_path: str) -> dict:
+    """
+    Memory-map a package zip and index its central directory once.
+
+    index = {
+        'path':    zip_path,
+        'file':    open file handle,
+        'mmap':    read-only mmap of the whole zip,
+        'entries': {name: (header_offset, method, compress_size,
+                           file_size, crc, flags)},
+    }
+
+    Entry bytes are then served straight from the mapping by
+    read_entry() — no per-entry seek/read syscalls. Reads never mutate
+    the index, so any number of worker threads can share one index.
+    Call close_package() when done.
+    """
+    f = open(zip_path, 'rb')
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        f.close()
+        raise zipfile.BadZipFile(f"Empty file: {zip_path}")
+
+    try:
+        entries = _read_central_directory(mm)
+    except Exception:
+        mm.close()
+        f.close()
+        raise
+
+    return {'path': zip_path, 'file': f, 'mmap': mm, 'entries': entries}
+
+
+def open_package_buffer(buffer, name: str) -> dict:
+    """
+    Index a zip that is already in memory — e.g. a sub-package entry
+    returned by read_entry(). Same index shape as open_package(), with
+    the buffer standing in for the mapping; nothing touches disk.
+    """
+    view = memoryview(buffer)
+    try:
+        entries = _read_central_directory(view)
+    except Exception:
+        view.release()
+        raise
+    return {'path': name, 'file': None, 'mmap': view, 'entries': entries}
+
+
+def close_package(index: dict):
+    """Release the mapping. Views still held elsewhere keep it alive."""
+    try:
+        if isinstance(index['mmap'], memoryview):
+            index['mmap'].release()
+        else:
+            index['mmap'].close()
+    except BufferError:
+        # A memoryview is still exported — the GC will unmap it later
+        pass
+    if index['file'] is not None:
+        index['file'].close()
+
+
+def entry_names(index: dict) -> list:
+    return list(index['entries'])
+
+
+def entry_sizes(index: dict, name: str) -> tuple:
+    """(file_size, compress_size) straight from the central directory."""
+    entry = index['entries'][name]
+    return entry[3], entry[2]
+
+
+def raw_entry(index: dict, name: str) -> memoryview:
+    """
+    An entry's stored bytes, still compressed — a zero-copy slice of
+    the mapping. For copying entries into another zip untouched.
+    """
+    offset, _, csize, _, _, flags = index['entries'][name]
+    mm = index['mmap']
+    if flags & _FLAG_ENCRYPTED:
+        raise RuntimeError(f"Encrypted zip entry not supported: {name}")
+    if bytes(mm[offset:offset + 4]) != _LOCAL_SIG:
+        raise zipfile.BadZipFile(f"Bad local header for {name}")
+    name_len, extra_len = struct.unpack_from('<2H', mm, offset + 26)
+    start = offset + _LOCAL_SIZE + name_len + extra_len
+    return memoryview(mm)[start:start + csize]
+
+
+def read_entry(index: dict, name: str) -> memoryview:
+    """
+    Bytes of one entry as a memoryview.
+    Stored entries are a zero-copy slice of the mapping; deflated entries
+    are inflated straight from that slice into one new buffer and checked
+    against the central directory's size and CRC-32 — a truncated or
+    corrupt package raises BadZipFile instead of parsing short.
+    """
+    _, method, _, size, crc, _ = index['entries'][name]
+    mm = index['mmap']
+
+    raw = raw_entry(index, name)
+
+    if method == zipfile.ZIP_STORED:
+        return raw
+    if method == zipfile.ZIP_DEFLATED:
+        try:
+            data = zlib.decompress(raw, -15, size or 16384)
+        except zlib.error as e:
+            raise zipfile.BadZipFile(f"Corrupt entry {name}: {e}") from None
+        finally:
+            raw.release()
+        if len(data) != size or zlib.crc32(data) != crc:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for {name}")
+        return memoryview(data)
+
+    # bzip2 / lzma — rare in AEM exports, let zipfile handle them
+    raw.release()
+    source = index['path'] if index['file'] is not None \
+        else io.BytesIO(mm)
+    with zipfile.ZipFile(source) as zf:
+        return memoryview(zf.read(name))
+
+
+def _read_central_directory(mm) -> dict:
+    size = len(mm)
+    tail_start = max(0, size - _EOCD_SIZE - _MAX_COMMENT)
+    eocd = bytes(mm[tail_start:size]).rfind(_EOCD_SIG)
+    if eocd == -1:
+        raise zipfile.BadZipFile("End of central directory not found")
+    eocd += tail_start
+
+    (_, _, _, _, total, cdir_size, cdir_offset, _) = \
+        _EOCD_STRUCT.unpack_from(mm, eocd)
+
+    # ZIP64 — real values live in the zip64 end record
+    loc = eocd - 20
+    if loc >= 0 and bytes(mm[loc:loc + 4]) == _EOCD64_LOC:
+        (eocd64,) = struct.unpack_from('<Q', mm, loc + 8)
+        if bytes(mm[eocd64:eocd64 + 4]) == _EOCD64_SIG:
+            fields = _EOCD64_STRUCT.unpack_from(mm, eocd64)
+            total, cdir_size, cdir_offset = fields[7], fields[8], fields[9]
+    if cdir_offset + cdir_size > len(mm):
+        raise zipfile.BadZipFile("Central directory runs past the end of "
+                                 "the file")
+
+    entries = {}
+    pos = cdir_offset
+    for _ in range(total):
+        rec = _CDIR_STRUCT.unpack_from(mm, pos)
+        if rec[0] != _CDIR_SIG:
+            raise zipfile.BadZipFile("Bad central directory record")
+        flags, method = rec[3], rec[4]
+        crc, csize, usize = rec[7], rec[8], rec[9]
+        name_len, extra_len, comment_len = rec[10], rec[11], rec[12]
+        offset = rec[16]
+
+        name_start = pos + _CDIR_SIZE
+        raw_name = bytes(mm[name_start:name_start + name_len])
+        name = raw_name.decode('utf-8' if flags & _FLAG_UTF8 else 'cp437')
+
+        if 0xFFFFFFFF in (usize, csize, offset):
+            usize, csize, offset = _zip64_extra(
+                mm, name_start + name_len, extra_len, usize, csize, offset
+            )
+
+        entries[name] = (offset, method, csize, usize, crc, flags)
+        pos = name_start + name_len + extra_len + comment_len
+
+    return entries
+
+
+def _zip64_extra(mm, start, length, usize, csize, offset):
+    """Pull 64-bit sizes/offset from the 0x0001 extra field."""
+    end = start + length
+    while start + 4 <= end:
+        tag, size = struct.unpack_from('<2H', mm, start)
+        if tag == 0x0001:
+            values = iter(struct.unpack_from(f'<{size // 8}Q', mm, start + 4))
+            if usize == 0xFFFFFFFF:
+                usize = next(values)
+            if csize == 0xFFFFFFFF:
+                csize = next(values)
+            if offset == 0xFFFFFFFF:
+                offset = next(values)
+            break
+        start += 4 + size
+    return usize, csize, offset
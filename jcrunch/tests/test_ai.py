@@ -0,0 +1,67 @@
+# JCRUNCH AI Bot Tests — runs against a local stub server, no network
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.endpoints import http_endpoint
+from ai.engine import fill_jobs, parse_reply
+
+
+class _StubModel(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_POST(self):
+        _StubModel.calls += 1
+        body   = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        lines  = body['prompt'].split('one JSON object per line):\n')[1]
+        rows   = [json.loads(l) for l in lines.split('\n\n')[0].splitlines()]
+        answer = [{'row': r['row'], 'Note': f"note for {r['Tag']}"}
+                  for r in rows]
+        reply  = json.dumps({'text': '```json\n' + json.dumps(answer) + '\n```'})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(reply.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+def test_fill_jobs_batches_and_caches(tmp_path):
+    server = HTTPServer(('127.0.0.1', 0), _StubModel)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        settings = {'model': 'stub', 'batch_size': 2, 'max_concurrency': 2,
+                    'requests_per_minute': 0, 'retries': 0}
+        endpoint = http_endpoint(
+            f'http://127.0.0.1:{server.server_port}/', settings
+        )
+        job = {
+            'job_id': 'Phase 1', 'instructions': 'Describe tags.',
+            'fields': ['Note'],
+            'rows': [{'row': 4 + i, 'Tag': f't{i}'} for i in range(5)],
+        }
+
+        results, stats = fill_jobs([job], endpoint, settings, str(tmp_path))
+        assert results['Phase 1'][6] == {'Note': 'note for t2'}
+        assert stats['calls'] == 3 and stats['filled'] == 5
+        assert _StubModel.calls == 3
+
+        # Re-run: unchanged rows come from cache, only the new row is sent
+        job['rows'].append({'row': 9, 'Tag': 'new'})
+        results, stats = fill_jobs([job], endpoint, settings, str(tmp_path))
+        assert stats['cached'] == 5 and stats['calls'] == 1
+        assert results['Phase 1'][9] == {'Note': 'note for new'}
+    finally:
+        server.shutdown()
+
+
+def test_parse_reply_ignores_malformed_items():
+    reply = 'Sure: [{"row": 4, "A": "x"}, {"A": "no row"}, "junk"]'
+    assert parse_reply(reply, ['A', 'B']) == {4: {'A': 'x', 'B': ''}}
+    assert parse_reply('no json here', ['A']) == {}
@@ -0,0 +1,325 @@
+# JCRUNCH Audit Tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit.driver import auditors_for_phase, run_audits
+from audit.folder_auditor import _is_metadata_like
+from audit.rules import compile_name_matcher, compile_tag_status_rules
+from audit.tag_auditor import _calculate_cloud_notes, _calculate_status
+
+
+def test_shipped_status_rules_keep_priority_order():
+    titles = {'Cycling': 2, 'Hiking': 1}
+    assert _calculate_status('a/b', '', 5, titles, 2) == \
+        'DEPRECATE - Missing Title'
+    assert _calculate_status('a/Bad Leaf', 'Hiking', 5, titles, 2) == \
+        'DEPRECATE - Bad Naming'
+    assert _calculate_status('a/old/x', 'Hiking', 5, titles, 3) == \
+        'DEPRECATE - Obsolete'
+    assert _calculate_status('a/cycling', 'Cycling', 5, titles, 2) == \
+        'CONSOLIDATE - Duplicate Title'
+    assert _calculate_status('a/hiking', 'Hiking', 0, titles, 2) == \
+        'REVIEW - Zero Usage'
+    assert _calculate_status('a/hiking', 'Hiking', 101, titles, 2) == \
+        'REVIEW - High Usage'
+    assert _calculate_status('a/b/c/d/e', 'Hiking', 5, titles, 5) == \
+        'REVIEW - Too Deep'
+    assert _calculate_status('a/hiking', 'Hiking', 5, titles, 2) == \
+        'KEEP - Standard'
+    assert _calculate_cloud_notes('KEEP - Standard') == 'Migrate as-is'
+
+
+def test_custom_rules_sorted_by_priority():
+    plan = compile_tag_status_rules([
+        {'priority': 9, 'status': 'KEEP', 'when': 'always'},
+        {'priority': 1, 'status': 'LEGACY', 'when': 'leaf_in',
+         'keywords': ['Legacy']},
+    ])
+    assert _calculate_status('a/legacy', 'T', 1, {}, 2, plan) == 'LEGACY'
+    assert _calculate_status('a/other', 'T', 1, {}, 2, plan) == 'KEEP'
+
+
+def test_folder_metadata_like():
+    for name in ('2024', 'Q3', ' Landscape ', 'emea', 'colour'):
+        assert _is_metadata_like(name) == 'Yes'
+    for name in ('', 'brand', 'q5', '2024a'):
+        assert _is_metadata_like(name) == 'No'
+
+    matcher = compile_name_matcher({'keywords': {'season': ['summer']}})
+    assert _is_metadata_like('Summer', matcher) == 'Yes'
+    assert _is_metadata_like('2024', matcher) == 'No'
+
+
+def test_namespace_classification_matches_substring_rules():
+    from audit.namespace_auditor import _classify_type, _namespace_profile
+    cases = {
+        'http://www.jcp.org/jcr/1.0':          'System (Repo)',
+        'http://www.day.com/jcr/cq/1.0':       'System (Repo)',
+        'http://example.com/granite/x':        'System (Repo)',
+        'http://purl.org/dc/elements/1.1/':    'Standard',
+        'http://ns.example.com/PRISM/2.0/':    'Standard',
+        'http://ns.adobe.com/xap/1.0/':        'Vendor (Adobe)',
+        'http://schemas.microsoft.com/photo/': 'Vendor (Microsoft)',
+        'http://ns.apple.com/faceinfo/':       'Vendor (Apple)',
+        'http://ns.adobe.com/sling/x':         'System (Repo)',
+        'http://www.securian.com/dam/1.0':     'Custom',
+    }
+    for uri, expected in cases.items():
+        assert _classify_type(uri) == expected
+        assert _classify_type(uri) == expected  # memoised path
+    assert _namespace_profile('Custom')['timeline_days'] == 3.0
+
+
+def test_automaton_finds_overlapping_terms():
+    from audit.rules import build_automaton, scan_automaton
+    automaton = build_automaton(['he', 'she', 'hers', 'his'])
+    assert scan_automaton(automaton, 'ushers') == {0, 1, 2}
+    assert scan_automaton(automaton, 'xyz') == set()
+
+
+def test_folder_rollups_bridge_missing_folders():
+    from audit.folder_auditor import run_folder_audit
+
+    def folder(path):
+        parent = path.rsplit('/', 1)[0] if '/' in path.lstrip('/') else ''
+        return {'folder_path': path, 'folder_name': path.rsplit('/', 1)[-1],
+                'depth_level': path.count('/'), 'parent_folder': parent}
+
+    paths = ['/content/dam', '/content/dam/a', '/content/dam/a/x.jpg',
+             '/content/dam/a/b/c', '/content/dam/a/b/c/y.jpg']
+    harvest = {
+        'folders': {p: folder(p) for p in paths},
+        'nodes': {
+            '/content/dam/a/x.jpg': {'path': '/content/dam/a/x.jpg',
+                                     'node_type': 'dam:Asset'},
+            '/content/dam/a/b/c/y.jpg': {'path': '/content/dam/a/b/c/y.jpg',
+                                         'node_type': 'dam:Asset'},
+            '/content/dam/a/b/c/y.jpg/jcr:content': {
+                'path': '/content/dam/a/b/c/y.jpg/jcr:content',
+                'node_type': 'dam:AssetContent',
+                'last_modified': '{Date}2024-05-01T00:00:00.000Z'},
+        },
+    }
+    run_folder_audit(harvest)
+    dam, a, c = (harvest['folders'][p] for p in
+                 ('/content/dam', '/content/dam/a', '/content/dam/a/b/c'))
+
+    assert (dam['asset_count'], a['asset_count'], c['asset_count']) == (2, 2, 1)
+    # /content/dam/a/b is absent: c hangs off a, but is not a direct child
+    assert a['child_count'] == 1
+    assert a['total_descendants'] == 3
+    assert dam['subtree_depth'] == 3
+    assert dam['last_modified_rollup'] == '2024-05-01T00:00:00.000Z'
+
+
+class _OnePassDict(dict):
+    """Fails the test if a record stream is walked more than once."""
+    walks = 0
+
+    def values(self):
+        self.walks += 1
+        assert self.walks == 1, 'stream walked twice'
+        return super().values()
+
+
+def test_driver_walks_each_stream_once():
+    props = _OnePassDict({
+        ('/content/dam/a', 'dc:title'): {
+            'jcr_path': '/content/dam/a', 'namespace': 'dc',
+            'name': 'title', 'full_name': 'dc:title', 'value': 'A'},
+        ('/content/dam/b', 'dc:title'): {
+            'jcr_path': '/content/dam/b', 'namespace': 'dc',
+            'name': 'title', 'full_name': 'dc:title', 'value': '42'},
+    })
+    harvest = {
+        'properties': props,
+        'nodes':      _OnePassDict(),
+        'tags':       {},
+        'folders':    {},
+        'namespaces': {'http://purl.org/dc/elements/1.1/': {'prefix': 'dc'}},
+    }
+    seen = []
+    counter = {
+        'begin':    lambda h: seen,
+        'property': lambda state, prop: state.append(prop['jcr_path']),
+        'finish':   lambda h, state: None,
+    }
+
+    run_audits(harvest, auditors_for_phase('all') + [counter])
+
+    assert len(seen) == 2
+    assert harvest['metadata_fields']['dc:title']['current_usage_count'] == 2
+    assert harvest['metadata_fields']['dc:title']['data_type'] == 'String'
+    ns = harvest['namespaces']['http://purl.org/dc/elements/1.1/']
+    assert ns['used_in'] == '2 fields'
+
+
+def test_value_profile_switches_to_sketches():
+    from audit.sketches import (
+        add_value, distinct_estimate, is_exact,
+        new_value_profile, top_values,
+    )
+    profile = new_value_profile()
+    for i in range(20000):
+        add_value(profile, 'common' if i % 4 == 0 else f'v{i}')
+    add_value(profile, '   ')
+
+    assert not is_exact(profile)
+    assert profile['total'] == 20000
+    true_distinct = 1 + 15000
+    assert abs(distinct_estimate(profile) - true_distinct) < \
+        true_distinct * 0.05
+    assert top_values(profile, 1)[0][0] == 'common'
+
+    # All-unique values: collision-inflated counts are not listed
+    unique = new_value_profile()
+    for i in range(20000):
+        add_value(unique, f'Asset {i}')
+    assert top_values(unique) == []
+
+    small = new_value_profile()
+    for value in ('a', 'b', 'a'):
+        add_value(small, value)
+    assert is_exact(small) and distinct_estimate(small) == 2
+    assert top_values(small) == [('a', 2), ('b', 1)]
+
+
+def test_near_duplicate_tags_cluster_variants():
+    from audit.near_duplicates import find_near_duplicates
+    near = find_near_duplicates(
+        {
+            'sports/cycling':  'Cycling',
+            'hobby/cycling':   'cycling ',
+            'sports/bicycling': 'Bicycling',
+            'travel/cafe':     'Café Racer',
+            'moto/cafe':       'cafe racers',
+            'sports/hiking':   'Hiking',
+            'sports/empty':    '',
+        },
+        weights={'hobby/cycling': 40, 'sports/cycling': 3},
+    )
+    assert near['sports/cycling']['cluster'] == 'hobby/cycling'
+    assert near['sports/bicycling']['cluster'] == 'hobby/cycling'
+    assert near['sports/bicycling']['cluster_size'] == 3
+    assert near['hobby/cycling']['similarity'] == 1.0
+    assert 0.6 <= near['sports/bicycling']['similarity'] < 1.0
+    # Equal weights — smallest tag_id names the cluster
+    assert near['travel/cafe']['cluster'] == 'moto/cafe'
+    assert 'sports/hiking' not in near
+    assert 'sports/empty' not in near
+
+
+def test_sampled_counts_are_scaled_with_intervals(tmp_path):
+    from audit.sampling import scale_count
+    from bench.package_generator import generate_package
+    from parser.package_reader import walk_package
+
+    assert scale_count(10, 0.1) == (100, 59)
+    assert scale_count(0, 0.5) == (0, 3)
+
+    zip_path = str(tmp_path / 'pkg.zip')
+    generate_package(zip_path, assets=400, pages=10)
+    full = walk_package(zip_path)
+    sampled = walk_package(zip_path, sample=0.25)
+    again = walk_package(zip_path, sample=0.25)
+
+    # Deterministic, tags always read, folders complete from names
+    assert set(sampled['nodes']) == set(again['nodes'])
+    assert len(sampled['nodes']) < len(full['nodes']) / 2
+    assert set(sampled['tags']) == set(full['tags'])
+    assert set(sampled['folders']) == set(full['folders'])
+    assert len(sampled['workflows']) == len(full['workflows'])
+
+    run_audits(sampled, auditors_for_phase('all'))
+    run_audits(full, auditors_for_phase('all'))
+    root = '/content/dam/synthetic'
+    folder = sampled['folders'][root]
+    margin = int(folder['asset_count_ci'].split('±')[1].split()[0])
+    assert abs(folder['asset_count'] - 400) <= margin
+    assert folder['asset_count'] == round(folder['sample_count'] / 0.25)
+    assert full['folders'][root]['asset_count_ci'] == ''
+    flagged = [f for f in full['folders'].values()
+               if f['is_metadata_like'] == 'Yes']
+    assert 0 < len(flagged) < len(full['folders'])
+
+    field = sampled['metadata_fields']['dc:title']
+    assert field['usage_ci'].startswith('Estimated ±')
+
+    # Re-running an audit never scales twice
+    before = {t: tag['asset_count'] for t, tag in sampled['tags'].items()}
+    run_audits(sampled, auditors_for_phase('1'))
+    assert before == {t: tag['asset_count']
+                      for t, tag in sampled['tags'].items()}
+
+
+def test_tag_closure_rolls_up_subtrees():
+    from audit.tag_auditor import run_tag_audit
+    from parser.tag_resolver import build_tag_closure, tag_ancestors
+
+    ids = ['a', 'a/b', 'a/b/c', 'a/b/c/d', 'a/b/c/d/e', 'a/b/c/d/e/f',
+           'a/x', 'z/missing/leaf']
+    harvest = {'tags': {
+        t: {'tag_id': t, 'tag_title': t.rsplit('/', 1)[-1].upper(),
+            'description': '', 'asset_count': 0}
+        for t in ids
+    }}
+    harvest['tags']['a/b/c/d/e/f']['asset_count'] = 3
+    harvest['tags']['a/x']['asset_count'] = 2
+
+    closure = build_tag_closure(harvest['tags'])
+    deep = closure['index']['a/b/c/d/e/f']
+    assert [closure['ids'][a] for a in tag_ancestors(closure, deep)] == \
+        ids[:5]
+    # Missing intermediate levels attach to the nearest present ancestor
+    assert closure['parent'][closure['index']['z/missing/leaf']] == -1
+
+    run_tag_audit(harvest)
+    tags = harvest['tags']
+    assert tags['a']['subtree_usage'] == 5
+    assert tags['a']['descendant_count'] == 6
+    assert tags['a/b']['subtree_usage'] == 3
+    assert tags['a/b/c/d/e/f']['title_path'] == 'A > B > C > D > E > F'
+    assert tags['a/b/c/d/e/f']['l4_id'] == 'a/b/c/d'
+    assert tags['z/missing/leaf']['l2_id'] == 'z/missing'
+
+    # A parent whose children are used is not Zero Usage
+    assert tags['a/b']['status'] != 'REVIEW - Zero Usage'
+    assert tags['z/missing/leaf']['status'] == 'REVIEW - Zero Usage'
+
+
+def test_harvest_diff_reports_changes_by_table(tmp_path):
+    import copy
+    from audit.harvest_diff import diff_harvests
+    from bench.package_generator import generate_package
+    from parser.package_reader import walk_package
+
+    zip_path = str(tmp_path / 'pkg.zip')
+    generate_package(zip_path, tag_depth=2, tag_breadth=3, folder_depth=2,
+                     folder_breadth=2, assets=20, pages=5)
+    old = walk_package(zip_path)
+    assert diff_harvests(old, walk_package(zip_path))['rows'] == []
+
+    new = copy.deepcopy(old)
+    removed, kept = [p for p in new['nodes']
+                     if '/jcr:content/metadata' in p][:2]
+    del new['nodes'][removed]
+    new['nodes']['/content/dam/new-asset'] = {'path': '/content/dam/new-asset'}
+    key = next(k for k in new['properties'] if k[0] == kept)
+    new['properties'][key] = dict(new['properties'][key], value='edited')
+    new['tag_assignments'].append({'jcr_path': kept, 'tag_path': 'new:tag'})
+    tag_id = next(iter(new['tags']))
+    new['tags'][tag_id]['tag_title'] = 'Renamed'
+
+    result = diff_harvests(old, new)
+    rows = {(r['table'], r['path'], r['field'], r['change'])
+            for r in result['rows']}
+    assert ('nodes', removed, '', 'removed') in rows
+    assert ('nodes', '/content/dam/new-asset', '', 'added') in rows
+    assert ('nodes', kept, '2 properties', 'changed') in rows
+    assert ('properties', kept, key[1], 'changed') in rows
+    assert ('properties', kept, 'cq:tags', 'changed') in rows
+    assert ('tags', tag_id, 'tag_title', 'changed') in rows
+    assert result['summary']['namespaces'] == \
+        {'added': 0, 'removed': 0, 'changed': 0}
@@ -0,0 +1,307 @@
+# JCRUNCH Export Tests
+import os
+import sys
+import zipfile
+from xml.etree import ElementTree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export.ooxml_writer import write_phases_ooxml
+
+MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+TEMPLATE = {
+    '[Content_Types].xml':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+        'content-types"><Default Extension="xml" '
+        'ContentType="application/xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType='
+        '"application/vnd.openxmlformats-officedocument.spreadsheetml.'
+        'worksheet+xml"/><Override PartName="/xl/calcChain.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.'
+        'spreadsheetml.calcChain+xml"/></Types>',
+    'xl/workbook.xml':
+        f'<workbook xmlns="{MAIN}" xmlns:r="{REL}"><sheets>'
+        '<sheet name="Phase X" sheetId="1" r:id="rId1"/></sheets></workbook>',
+    'xl/_rels/workbook.xml.rels':
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/'
+        f'2006/relationships"><Relationship Id="rId1" Type="{REL}/worksheet" '
+        'Target="worksheets/sheet1.xml"/><Relationship Id="rId2" '
+        f'Type="{REL}/calcChain" Target="calcChain.xml"/><Relationship '
+        f'Id="rId3" Type="{REL}/sharedStrings" Target="sharedStrings.xml"/>'
+        '</Relationships>',
+    'xl/worksheets/sheet1.xml':
+        f'<worksheet xmlns="{MAIN}" xmlns:r="{REL}">'
+        '<dimension ref="A1:B5"/><sheetData>'
+        '<row r="1"><c r="A1" t="s"><v>0</v></c></row>'
+        '<row r="2" spans="1:2"><c r="A2" t="s"><v>1</v></c>'
+        '<c r="C2" s="3"/><c r="E2" t="s"><v>2</v></c></row>'
+        '<row r="3"><c r="E3" t="inlineStr"><is><t>AI BOT</t></is></c></row>'
+        '<row r="4"><c r="A4"><v>1</v></c><c r="B4"><f>A4*2</f></c></row>'
+        '<row r="5"><c r="A5"><v>2</v></c></row>'
+        '</sheetData><pageMargins left="0.7"/></worksheet>',
+    'xl/sharedStrings.xml':
+        f'<sst xmlns="{MAIN}"><si><t>Title</t></si><si><t>Tag ID</t></si>'
+        '<si><r><t>AI </t></r><r><t>Notes</t></r><rPh><t>x</t></rPh></si>'
+        '</sst>',
+    'xl/calcChain.xml': '<calcChain><c r="B4" i="1"/></calcChain>',
+    'xl/vbaProject.bin': bytes(range(256)) * 8,
+    'customUI/customUI14.xml': '<customUI><ribbon/></customUI>',
+}
+
+SHEET_MAP = {
+    'Phase X': {
+        'data_key': 'tags', 'row_source': 'dict_values',
+        'columns': {'A': 'tag_id', 'C': 'count', 'D': 'flag', 'E': 'note'},
+        'headers': {'C': 'Count', 'E': 'Note'},
+    },
+    'Report': {
+        'data_key': 'extra', 'row_source': 'list', 'create': True,
+        'title': 'Extra & more', 'columns': {'A': 'x'},
+        'headers': {'A': 'X'},
+    },
+}
+
+
+def test_ooxml_engine_renders_sheets_and_copies_parts(tmp_path, monkeypatch):
+    import export.ooxml_writer as ooxml_writer
+
+    path = str(tmp_path / 'book.xlsm')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in TEMPLATE.items():
+            zf.writestr(name, data)
+
+    harvest = {
+        'tags': {f't{i}': {'tag_id': f'a/<t{i}> & co', 'count': i or None,
+                           'flag': i % 2 == 0, 'note': 'n'}
+                 for i in range(300)},
+        'extra': [{'x': 'one'}, {'x': ' padded '}],
+    }
+    # Every sheet through the worker pool, many chunks per sheet
+    monkeypatch.setattr(ooxml_writer, 'PARALLEL_MIN_ROWS', 1)
+    monkeypatch.setattr(ooxml_writer, 'RENDER_CHUNK_ROWS', 7)
+    assert write_phases_ooxml(harvest, path, SHEET_MAP, 4, 1000,
+                              processes=2)
+
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        names = zf.namelist()
+        for name in ('xl/vbaProject.bin', 'customUI/customUI14.xml',
+                     'xl/sharedStrings.xml'):
+            data = TEMPLATE[name]
+            assert zf.read(name) == (data if isinstance(data, bytes)
+                                     else data.encode())
+        assert 'xl/calcChain.xml' not in names
+        assert b'calcChain' not in zf.read('[Content_Types].xml')
+        sheet = ElementTree.fromstring(zf.read('xl/worksheets/sheet1.xml'))
+        workbook = ElementTree.fromstring(zf.read('xl/workbook.xml'))
+        report_part = next(n for n in names
+                           if n.startswith('xl/worksheets/')
+                           and n != 'xl/worksheets/sheet1.xml')
+        report = ElementTree.fromstring(zf.read(report_part))
+
+    cells = {c.get('r'): c for c in sheet.iter(f'{{{MAIN}}}c')}
+
+    def text(cell):
+        return ''.join(cell.itertext())
+
+    # Kept header rows: existing A2 untouched, styled C2 filled
+    assert cells['A2'].get('t') == 's' and text(cells['A2']) == '1'
+    assert text(cells['C2']) == 'Count' and cells['C2'].get('s') == '3'
+    assert text(cells['C3']) == 'JCRUNCH' and 'A3' not in cells
+    # E belongs to the AI Bot — the mapped column moves past it
+    assert text(cells['E2']) == '2' and text(cells['E3']) == 'AI BOT'
+    assert text(cells['F2']) == 'Note' and text(cells['F3']) == 'JCRUNCH'
+    assert 'E4' not in cells and text(cells['F303']) == 'n'
+    # Data rows replace the old ones; formulas below row 3 are gone
+    assert text(cells['A4']) == 'a/<t0> & co' and 'B4' not in cells
+    assert text(cells['C303']) == '299' and 'C4' not in cells
+    assert text(cells['D303']) == '0'
+    assert cells['D4'].get('t') == 'b' and text(cells['D4']) == '1'
+    assert sheet.find(f'{{{MAIN}}}dimension').get('ref') == 'A1:F303'
+    assert sheet.find(f'{{{MAIN}}}pageMargins') is not None
+
+    assert [s.get('name') for s in workbook.iter(f'{{{MAIN}}}sheet')] == \
+        ['Phase X', 'Report']
+
+    # A re-run finds the moved column again instead of moving it further
+    assert write_phases_ooxml(harvest, path, SHEET_MAP, 4, 1000,
+                              processes=0)
+    with zipfile.ZipFile(path) as zf:
+        again = ElementTree.fromstring(zf.read('xl/worksheets/sheet1.xml'))
+    again = {c.get('r'): text(c) for c in again.iter(f'{{{MAIN}}}c')}
+    assert again['F303'] == 'n' and 'G2' not in again
+    report_cells = [text(c) for c in report.iter(f'{{{MAIN}}}c')]
+    assert report_cells == ['Extra & more', 'X', 'JCRUNCH', 'one', ' padded ']
+
+
+LONG = 'Phase 9 — A Rather Long Sheet X'
+SPLIT_TEMPLATE = {
+    '[Content_Types].xml':
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+        'content-types"><Default Extension="xml" '
+        'ContentType="application/xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="ws"/>'
+        '<Override PartName="/xl/worksheets/sheet2.xml" ContentType="ws"/>'
+        '<Override PartName="/xl/worksheets/sheet3.xml" ContentType="ws"/>'
+        '</Types>',
+    'xl/workbook.xml':
+        f'<workbook xmlns="{MAIN}" xmlns:r="{REL}"><bookViews>'
+        '<workbookView activeTab="2"/></bookViews><sheets>'
+        f'<sheet name="{LONG}" sheetId="1" r:id="rId1"/>'
+        '<sheet name="Phase 9 — A Rather Long She (2)" sheetId="2" '
+        'r:id="rId2"/><sheet name="Notes" sheetId="3" r:id="rId3"/>'
+        '</sheets><definedNames><definedName name="_xlnm.Print_Area" '
+        'localSheetId="1">x</definedName><definedName name="Area" '
+        'localSheetId="2">Notes!A1</definedName></definedNames></workbook>',
+    'xl/_rels/workbook.xml.rels':
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/'
+        f'2006/relationships"><Relationship Id="rId1" Type="{REL}/worksheet"'
+        ' Target="worksheets/sheet1.xml"/><Relationship Id="rId2" '
+        f'Type="{REL}/worksheet" Target="worksheets/sheet2.xml"/>'
+        f'<Relationship Id="rId3" Type="{REL}/worksheet" '
+        'Target="worksheets/sheet3.xml"/></Relationships>',
+    'xl/worksheets/sheet1.xml':
+        f'<worksheet xmlns="{MAIN}" xmlns:r="{REL}"><sheetPr codeName="S1"/>'
+        '<dimension ref="A1:B3"/><sheetViews><sheetView tabSelected="1" '
+        'workbookViewId="0"/></sheetViews><sheetData>'
+        '<row r="1"><c r="A1" t="inlineStr"><is><t>Title</t></is></c></row>'
+        '<row r="2"><c r="A2" t="inlineStr"><is><t>Name</t></is></c></row>'
+        '</sheetData><dataValidations count="1"><dataValidation sqref="B4">'
+        '</dataValidation></dataValidations><drawing r:id="rId1"/>'
+        '</worksheet>',
+    'xl/worksheets/_rels/sheet1.xml.rels': '<Relationships/>',
+    'xl/worksheets/sheet2.xml': f'<worksheet xmlns="{MAIN}"><sheetData/>'
+                                '</worksheet>',
+    'xl/worksheets/_rels/sheet2.xml.rels': '<Relationships/>',
+    'xl/worksheets/sheet3.xml': f'<worksheet xmlns="{MAIN}"><sheetData/>'
+                                '</worksheet>',
+}
+SPLIT_MAP = {
+    LONG: {'data_key': 'rows', 'row_source': 'list',
+           'columns': {'A': 'name', 'B': 'n'}, 'headers': {'B': 'N'}},
+}
+
+
+def _workbook_state(path):
+    """({sheet name: {cell ref: text}}, workbook.xml, zip names)"""
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        names = zf.namelist()
+        workbook_xml = zf.read('xl/workbook.xml').decode()
+        rels = ElementTree.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+        targets = {rel.get('Id'): rel.get('Target').lstrip('/')
+                   .replace('worksheets/', 'xl/worksheets/', 1)
+                   .replace('xl/xl/', 'xl/') for rel in rels}
+        types = zf.read('[Content_Types].xml').decode()
+        sheets = {}
+        for sheet in ElementTree.fromstring(workbook_xml).iter(
+                f'{{{MAIN}}}sheet'):
+            part = targets[sheet.get(f'{{{REL}}}id')]
+            assert f'/{part}"' in types
+            xml = zf.read(part).decode()
+            cells = {c.get('r'): ''.join(c.itertext())
+                     for c in ElementTree.fromstring(xml)
+                     .iter(f'{{{MAIN}}}c')}
+            sheets[sheet.get('name')] = dict(cells, xml=xml)
+    return sheets, workbook_xml, names
+
+
+def test_ooxml_engine_splits_over_limit_sheets(tmp_path):
+    from export.ooxml_writer import INDEX_SHEET, continuation_name
+
+    path = str(tmp_path / 'book.xlsx')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in SPLIT_TEMPLATE.items():
+            zf.writestr(name, data)
+
+    def run(count):
+        harvest = {'rows': [{'name': f'r{i}', 'n': i} for i in range(count)]}
+        assert write_phases_ooxml(harvest, path, SPLIT_MAP, 4, 10,
+                                  processes=0)
+        return _workbook_state(path)
+
+    second, third = continuation_name(LONG, 2), continuation_name(LONG, 3)
+    assert len(second) == 31 and second == 'Phase 9 — A Rather Long She (2)'
+
+    # Fits one sheet: the stale continuation goes, later positions shift
+    sheets, workbook_xml, names = run(5)
+    assert list(sheets) == [LONG, 'Notes']
+    assert 'xl/worksheets/sheet2.xml' not in names
+    assert 'xl/worksheets/_rels/sheet2.xml.rels' not in names
+    assert 'Print_Area' not in workbook_xml
+    assert 'localSheetId="1">Notes!A1' in workbook_xml
+    assert 'activeTab="1"' in workbook_xml
+
+    # 25 rows, 10 per sheet: three parts and an index
+    sheets, _, _ = run(25)
+    assert list(sheets) == [LONG, 'Notes', second, third, INDEX_SHEET]
+    assert sheets[LONG]['A13'] == 'r9' and 'A14' not in sheets[LONG]
+    assert sheets[second]['A4'] == 'r10' and sheets[second]['B13'] == '19'
+    assert sheets[third]['A8'] == 'r24' and 'A9' not in sheets[third]
+    for name in (second, third):
+        xml = sheets[name]['xml']
+        assert sheets[name]['A1'] == 'Title' and sheets[name]['B2'] == 'N'
+        assert '<dataValidations' in xml and '<drawing' not in xml
+        assert 'tabSelected' not in xml and 'codeName' not in xml
+    assert '<dimension ref="A1:B8"/>' in sheets[third]['xml']
+    index = sheets[INDEX_SHEET]
+    assert [index[f'{c}2'] for c in 'ABCDE'] == \
+        ['Sheet', 'Part of', 'First Row #', 'Last Row #', 'Rows']
+    assert [index[f'{c}6'] for c in 'ABCDE'] == \
+        [third, LONG, '21', '25', '5']
+
+    # Fewer rows on a re-run: the surplus sheet leaves with its part
+    sheets, _, names = run(12)
+    assert list(sheets) == [LONG, 'Notes', second, INDEX_SHEET]
+    assert sheets[second]['A5'] == 'r11' and 'A6' not in sheets[second]
+    assert [sheets[INDEX_SHEET][f'{c}5'] for c in 'ACDE'] == \
+        [second, '11', '12', '2']
+    assert 'A6' not in sheets[INDEX_SHEET]
+    assert len([n for n in names if n.startswith('xl/worksheets/sheet')]) == 4
+
+
+def test_split_sheets_round_trip_both_engines(tmp_path, monkeypatch):
+    import pytest
+    openpyxl = pytest.importorskip('openpyxl')
+    import export.workbook_writer as workbook_writer
+    from export.workbook_writer import (
+        INDEX_SHEET,
+        PHASE_SHEETS,
+        clear_phase_data,
+        continuation_name,
+        write_all_phases,
+    )
+
+    phase = PHASE_SHEETS['3']
+    monkeypatch.setattr(workbook_writer, 'ROWS_PER_SHEET', 10)
+    harvest = {'workflows': [{'step_number': i, 'step_name': f's{i}'}
+                             for i in range(25)]}
+    for engine in ('ooxml', 'openpyxl'):
+        path = str(tmp_path / f'{engine}.xlsx')
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = phase
+        ws['A1'], ws['A2'], ws['B2'] = 'Workflows', 'Step #', 'Step'
+        ws['A3'] = ws['B3'] = 'JCRUNCH'
+        wb.save(path)
+
+        write_all_phases(harvest, path, engine=engine)
+        wb = openpyxl.load_workbook(path)
+        parts = [phase] + [continuation_name(phase, k) for k in (2, 3)]
+        assert wb.sheetnames == parts + [INDEX_SHEET]
+        assert len(parts[1]) <= 31
+        assert [wb[name].max_row for name in parts] == [13, 13, 8]
+        assert wb[parts[2]]['B8'].value == 's24'
+        assert wb[parts[1]]['A1'].value == 'Workflows'
+        index = [[c.value for c in row]
+                 for row in wb[INDEX_SHEET].iter_rows(min_row=4)]
+        assert index == [[parts[0], phase, 1, 10, 10],
+                         [parts[1], phase, 11, 20, 10],
+                         [parts[2], phase, 21, 25, 5]]
+
+        clear_phase_data(path)
+        wb = openpyxl.load_workbook(path)
+        assert wb.sheetnames == [phase] and wb[phase].max_row == 3
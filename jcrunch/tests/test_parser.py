@@ -1,2 +1,467 @@
 # JCRUNCH Parser Tests
-# Tests coming in a later session.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.package_generator import generate_package
+from parser.package_reader import walk_package
+
+
+def _small_package(tmp_path, **params):
+    zip_path = str(tmp_path / 'pkg.zip')
+    params = dict({'tag_depth': 2, 'tag_breadth': 3, 'folder_depth': 2,
+                   'folder_breadth': 2, 'assets': 20, 'pages': 5}, **params)
+    return zip_path, generate_package(zip_path, **params)
+
+
+def test_walk_package_harvests_generated_package(tmp_path):
+    zip_path, summary = _small_package(tmp_path)
+    harvest = walk_package(zip_path)
+
+    assert len(harvest['tags']) == summary['tags']
+    assert len(harvest['tag_assignments']) == summary['tag_assignments']
+    assets = [n for n in harvest['nodes'].values()
+              if n['node_type'] == 'dam:Asset']
+    assert len(assets) == summary['assets']
+
+    # _jcr_content folders map back to jcr:content paths
+    assert any(p.endswith('/jcr:content/metadata') for p in harvest['nodes'])
+    assert 'http://www.example.com/ns0/1.0' in harvest['namespaces']
+
+    # Every generated assignment uses a slash-form tag id
+    total = sum(t['asset_count'] for t in harvest['tags'].values())
+    assert total == summary['tag_assignments']
+
+
+def test_walk_package_reads_tag_titles(tmp_path):
+    zip_path, _ = _small_package(tmp_path)
+    harvest = walk_package(zip_path)
+    tag = harvest['tags']['taxonomy-0']
+    assert tag['tag_title'] == 'Taxonomy'
+    assert tag['description'] == 'Taxonomy tag'
+
+
+def test_zip_index_matches_zipfile(tmp_path):
+    import zipfile
+
+    import pytest
+    from parser.zip_index import close_package, open_package, read_entry
+
+    zip_path = str(tmp_path / 'mixed.zip')
+    payloads = {
+        'jcr_root/content/cq:tags/a/.content.xml': b'<a/>' * 500,
+        'jcr_root/content/dam/café/.content.xml': b'<b x="1"/>',
+        'jcr_root/empty.txt': b'',
+    }
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        for i, (name, data) in enumerate(payloads.items()):
+            method = zipfile.ZIP_DEFLATED if i % 2 == 0 else zipfile.ZIP_STORED
+            zf.writestr(name, data, compress_type=method)
+
+    index = open_package(zip_path)
+    try:
+        assert set(index['entries']) == set(payloads)
+        for name, data in payloads.items():
+            view = read_entry(index, name)
+            assert bytes(view) == data
+            view.release()
+    finally:
+        close_package(index)
+
+    # A stale CRC-32 in the central directory is caught on inflate
+    with open(zip_path, 'rb') as f:
+        raw = bytearray(f.read())
+    crc_at = raw.index(b'PK\x01\x02') + 16
+    raw[crc_at] ^= 0xFF
+    with open(zip_path, 'wb') as f:
+        f.write(raw)
+    index = open_package(zip_path)
+    try:
+        with pytest.raises(zipfile.BadZipFile, match='CRC'):
+            read_entry(index, 'jcr_root/content/cq:tags/a/.content.xml')
+    finally:
+        close_package(index)
+
+
+def test_walk_package_extracts_workflow_steps(tmp_path):
+    zip_path, summary = _small_package(tmp_path, workflows=2, workflow_steps=3)
+    harvest = walk_package(zip_path)
+
+    steps = [w for w in harvest['workflows'] if w['step_type'] == 'PROCESS']
+    launchers = [w for w in harvest['workflows']
+                 if w['step_type'] == 'LAUNCHER']
+    assert len(steps) == summary['workflow_steps'] == 6
+    assert len(launchers) == 2
+
+    first = steps[0]
+    assert first['step_number'] == 1
+    assert first['step_name'] == 'Synthetic Workflow 0 / Step 1'
+    assert first['fields_affected'] == 'dc:title, dc:description'
+    assert first['tags_used'].startswith('taxonomy-')
+    assert 'glob=/content/dam/synthetic' in launchers[0]['conditions']
+
+
+def test_design_time_workflow_model():
+    from parser.workflow_parser import parse_workflow_xml
+    xml = b'''<?xml version="1.0" encoding="UTF-8"?>
+<jcr:root xmlns:jcr="http://www.jcp.org/jcr/1.0"
+          xmlns:cq="http://www.day.com/jcr/cq/1.0"
+          xmlns:sling="http://sling.apache.org/jcr/sling/1.0"
+    jcr:primaryType="cq:Page">
+  <jcr:content jcr:primaryType="cq:PageContent" jcr:title="Publish Review">
+    <flow jcr:primaryType="nt:unstructured">
+      <participant sling:resourceType="cq/workflow/components/model/participant"
+          jcr:title="Legal Review"/>
+      <or sling:resourceType="cq/workflow/components/model/or"
+          jcr:title="Route">
+        <branch1 script1="function check() { return true; }"/>
+      </or>
+    </flow>
+  </jcr:content>
+</jcr:root>'''
+    records = parse_workflow_xml(
+        xml, '/conf/global/settings/workflow/models/publish-review'
+    )
+    assert [r['step_type'] for r in records] == ['participant', 'or']
+    assert records[0]['step_name'] == 'Publish Review / Legal Review'
+    assert records[1]['conditions'].startswith('script1=')
+
+
+def test_tag_index_resolves_every_reference_form():
+    from parser.tag_resolver import count_tag_usage
+    harvest = {
+        'tags': {t: {'tag_id': t, 'asset_count': 0} for t in (
+            'properties', 'properties/orientation/landscape',
+            'default/legacy',
+        )},
+        'tag_assignments': [
+            {'jcr_path': '/a', 'tag_path': 'properties:orientation/landscape'},
+            {'jcr_path': '/b', 'tag_path': '/content/cq:tags/properties/orientation/landscape/'},
+            {'jcr_path': '/c', 'tag_path': 'properties/orientation/landscape'},
+            {'jcr_path': '/d', 'tag_path': 'properties:'},
+            {'jcr_path': '/e', 'tag_path': 'legacy'},
+            {'jcr_path': '/f', 'tag_path': 'missing:tag'},
+            {'jcr_path': '/g', 'tag_path': 'missing:tag'},
+        ],
+    }
+    unresolved = count_tag_usage(harvest)
+    tags = harvest['tags']
+    assert tags['properties/orientation/landscape']['asset_count'] == 3
+    assert tags['properties']['asset_count'] == 1
+    assert tags['default/legacy']['asset_count'] == 1
+    assert unresolved == {'missing:tag': {
+        'tag_ref': 'missing:tag', 'reference_count': 2, 'example_path': '/f',
+    }}
+
+
+def test_reference_index_reports_broken_targets(tmp_path):
+    from audit.reference_auditor import run_reference_audit
+    from parser.reference_index import resolve_reference
+
+    zip_path, summary = _small_package(tmp_path, assets=60, pages=10,
+                                       broken_refs=0.3)
+    harvest = walk_package(zip_path)
+    run_reference_audit(harvest)
+
+    broken = harvest['broken_references']
+    assert sum(r['reference_count'] for r in broken.values()) == \
+        summary['broken_references']
+    assert all(p.endswith('-deleted.jpg') for p in broken)
+
+    index = harvest['reference_index']
+    asset = next(p for p, n in harvest['nodes'].items()
+                 if n['node_type'] == 'dam:Asset')
+    # Binary entries count as existing paths
+    assert resolve_reference(index, asset + '/jcr:content/renditions/original') \
+        == ('ok', asset + '/jcr:content/renditions/original')
+    assert resolve_reference(index, '/content/synthetic/en/page-1.html') == \
+        ('ok', '/content/synthetic/en/page-1')
+    assert resolve_reference(index, '/content/other-site/x')[0] == 'external'
+    inbound = list(harvest['inbound_references'].values())
+    assert inbound and inbound[0]['reference_count'] >= \
+        inbound[-1]['reference_count']
+    assert any(row['node_type'] == 'dam:Asset' for row in inbound)
+
+
+def test_storage_rolls_up_zip_sizes(tmp_path):
+    import zipfile
+    from audit.folder_auditor import run_folder_audit
+
+    zip_path, _ = _small_package(tmp_path, renditions=2)
+    harvest = walk_package(zip_path)
+    run_folder_audit(harvest)
+
+    with zipfile.ZipFile(zip_path) as zf:
+        binaries = [i for i in zf.infolist()
+                    if i.filename.startswith('jcr_root/')
+                    and not i.filename.endswith('.xml')]
+    total = sum(i.file_size for i in binaries)
+
+    types = harvest['rendition_storage']
+    assert set(types) == {'original', 'cq5dam.web', 'cq5dam.thumbnail'}
+    assert sum(t['bytes'] for t in types.values()) == total
+    assert sum(t['compressed_bytes'] for t in types.values()) == \
+        sum(i.compress_size for i in binaries)
+
+    root = harvest['folders']['/content/dam/synthetic']
+    assert root['storage_bytes'] == total
+    assert root['binary_count'] == len(binaries)
+    assert root['original_bytes'] == types['original']['bytes']
+    assert root['rendition_bytes'] == total - types['original']['bytes']
+
+    asset = next(p for p, n in harvest['nodes'].items()
+                 if n['node_type'] == 'dam:Asset')
+    assert harvest['folders'][asset]['binary_count'] == 3
+
+
+def test_subpackages_walk_in_memory(tmp_path, monkeypatch):
+    import zipfile
+    import parser.package_reader as package_reader
+
+    child_path, summary = _small_package(tmp_path)
+    child = walk_package(child_path)
+    with open(child_path, 'rb') as f:
+        child_bytes = f.read()
+
+    # parent → stored child, deflated middle package → child again
+    middle_path = str(tmp_path / 'middle.zip')
+    with zipfile.ZipFile(middle_path, 'w') as zf:
+        zf.writestr('jcr_root/etc/packages/g/inner.zip', child_bytes,
+                    compress_type=zipfile.ZIP_DEFLATED)
+    parent_path = str(tmp_path / 'parent.zip')
+    with zipfile.ZipFile(parent_path, 'w') as zf:
+        zf.writestr('jcr_root/etc/packages/g/child.zip', child_bytes)
+        with open(middle_path, 'rb') as f:
+            zf.writestr('jcr_root/etc/packages/g/middle.zip', f.read(),
+                        compress_type=zipfile.ZIP_DEFLATED)
+
+    harvest = walk_package(parent_path)
+    assert [(s['path'], s['depth'], s['status'])
+            for s in harvest['subpackages']] == [
+        ('/etc/packages/g/child.zip', 1, 'walked'),
+        ('/etc/packages/g/middle.zip', 1, 'walked'),
+        ('/etc/packages/g/inner.zip', 2, 'walked'),
+    ]
+    assert set(harvest['nodes']) == set(child['nodes'])
+    assert len(harvest['tag_assignments']) == 2 * summary['tag_assignments']
+    assert '/etc/packages/g/child.zip' not in harvest['storage']
+
+    # Over the depth limit the zip is kept as a plain binary
+    monkeypatch.setattr(package_reader, 'MAX_SUBPACKAGE_DEPTH', 1)
+    harvest = walk_package(parent_path)
+    assert harvest['subpackages'][-1]['status'].startswith('skipped')
+    assert harvest['storage']['/etc/packages/g/inner.zip'][0] == \
+        len(child_bytes)
+
+
+def test_scope_prunes_entries_before_reading(tmp_path, monkeypatch):
+    import parser.package_reader as package_reader
+
+    zip_path, _ = _small_package(tmp_path)
+    full = walk_package(zip_path)
+    folder = next(p for p, n in sorted(full['nodes'].items())
+                  if n['node_type'] == 'sling:OrderedFolder'
+                  and p.count('/') == 4)
+    assert full['out_of_scope'] == 0
+
+    read = []
+    real_read = package_reader.read_entry
+    monkeypatch.setattr(package_reader, 'read_entry',
+                        lambda index, name: read.append(name)
+                        or real_read(index, name))
+    harvest = walk_package(zip_path, include=[folder + '/**'],
+                           exclude=['/content/cq:tags'])
+
+    assert harvest['nodes']
+    assert all(p.startswith(folder) for p in harvest['nodes'])
+    assert not harvest['tags']
+    assert harvest['out_of_scope'] > 0
+    # Excluded taxonomy — no false unresolved references
+    assert harvest['taxonomy_pruned'] and harvest['unresolved_tags'] == {}
+    # Only the filter and in-scope entries were ever decompressed
+    assert all(name.startswith('jcr_root' + folder)
+               for name in read if name.startswith('jcr_root/'))
+
+    # Pruned paths still resolve as reference targets
+    assert harvest['reference_index']['paths'] >= \
+        full['reference_index']['paths']
+
+
+def test_include_scope_still_resolves_tags(tmp_path):
+    zip_path, summary = _small_package(tmp_path)
+    harvest = walk_package(zip_path, include=['/content/dam'])
+
+    assert len(harvest['tags']) == summary['tags']
+    assert not harvest['taxonomy_pruned']
+    assert harvest['unresolved_tags'] == {}
+    assert all(p.startswith(('/content/dam', '/content/cq:tags/'))
+               for p in harvest['nodes'])
+    # Asset assignments resolve; page assignments were out of scope
+    used = sum(t['asset_count'] for t in harvest['tags'].values())
+    assert used == len(harvest['tag_assignments']) > 0
+
+
+def test_pipeline_keeps_order_and_surfaces_failures():
+    import threading
+    from parser.pipeline import run_pipeline
+
+    def read(i):
+        if i % 7 == 3:
+            raise OSError(f'bad entry {i}')
+        return i * 10
+
+    def parse(i, data):
+        if i % 11 == 5:
+            raise ValueError(f'bad xml {i}')
+        return data + 1
+
+    threads = dict(read_threads=2, parse_threads=3,
+                   max_in_flight=2, batch_size=4)
+    before = threading.active_count()
+    out = list(run_pipeline(list(range(200)), read, parse, **threads))
+    assert [i for i, _, _ in out] == list(range(200))
+    for i, parsed, error in out:
+        if i % 7 == 3:
+            assert isinstance(error, OSError)
+        elif i % 11 == 5:
+            assert isinstance(error, ValueError)
+        else:
+            assert (parsed, error) == (i * 10 + 1, None)
+    inline = run_pipeline(list(range(200)), read, parse, read_threads=0)
+    assert [repr(o) for o in out] == [repr(o) for o in inline]
+
+    # Stopping early or a broken stage joins every thread
+    for i, _, _ in run_pipeline(list(range(200)), read, parse, **threads):
+        if i == 20:
+            break
+
+    class StageBug(BaseException):
+        pass
+
+    def broken(i, data):
+        if i == 151:
+            raise StageBug()
+        return data
+
+    try:
+        list(run_pipeline(list(range(200)), read, broken, **threads))
+        raise AssertionError('stage failure was swallowed')
+    except StageBug:
+        pass
+    assert threading.active_count() == before
+
+
+def test_tag_assignments_are_integer_columns(tmp_path):
+    from parser.assignments import (
+        TagAssignments,
+        as_columns,
+        merge_assignments,
+    )
+
+    zip_path, _ = _small_package(tmp_path)
+    harvest = walk_package(zip_path)
+    view = harvest['tag_assignments']
+    columns = view.columns
+    assert columns['node'].typecode == columns['tag'].typecode == 'I'
+    assert len(columns['refs']) < len(view)
+
+    # The dict-list view still reads like the old list
+    rows = list(view)
+    assert rows[0] == view[0] and view[-2:] == rows[-2:]
+    assert set(rows[0]) == {'jcr_path', 'tag_path'}
+
+    # Merging re-interns ids — the same rows come back out
+    other = as_columns([{'jcr_path': '/x', 'tag_path': 'new:tag'},
+                        {'jcr_path': rows[0]['jcr_path'],
+                         'tag_path': rows[0]['tag_path']}])
+    merged = TagAssignments(merge_assignments([columns, other]))
+    assert list(merged) == rows + list(TagAssignments(other))
+    assert merged.columns['refs'].count(rows[0]['tag_path']) == 1
+
+
+def test_parse_cache_reuses_identical_payloads(tmp_path, monkeypatch):
+    import parser.package_reader as package_reader
+
+    zip_path, _ = _small_package(tmp_path, renditions=2)
+    cached = walk_package(zip_path)
+    assert cached['parse_cache']['hits'] > 0
+
+    monkeypatch.setattr(package_reader, 'PARSE_CACHE_MAX', 0)
+    fresh = walk_package(zip_path)
+    assert fresh['parse_cache']['hits'] == 0
+    assert fresh['parse_cache']['misses'] == \
+        cached['parse_cache']['hits'] + cached['parse_cache']['misses']
+    for key in ('nodes', 'properties', 'tags', 'folders', 'workflows'):
+        assert cached[key] == fresh[key]
+    assert list(cached['tag_assignments']) == list(fresh['tag_assignments'])
+
+    # Under --max-memory the cache counts and keeps to its share
+    monkeypatch.setattr(package_reader, 'PARSE_CACHE_MAX', 65536)
+    budget = 64 * 1024
+    capped = walk_package(zip_path, max_memory=budget)
+    assert 0 < capped['parse_cache']['bytes'] <= \
+        budget // package_reader.PARSE_CACHE_BUDGET_SHARE
+    assert capped['parse_cache']['hits'] < cached['parse_cache']['hits']
+    assert capped['nodes'] == cached['nodes']
+
+
+def test_snapshot_round_trips_harvest(tmp_path):
+    import pytest
+    pytest.importorskip('pyarrow')
+    from export.snapshot import load_snapshot, open_snapshot, write_snapshot
+
+    zip_path, _ = _small_package(tmp_path)
+    harvest = walk_package(zip_path)
+    out = str(tmp_path / 'out.arrow')
+    counts = write_snapshot(harvest, out)
+    assert counts['tag_assignments'] == len(harvest['tag_assignments'])
+
+    tables = open_snapshot(out)
+    assert tables['nodes'].num_rows == len(harvest['nodes'])
+
+    loaded = load_snapshot(out)
+    # Nothing is turned into Python rows until an audit asks
+    assert len(loaded['properties']) == len(harvest['properties'])
+    assert sum(1 for _ in loaded['properties'].values()) == \
+        len(harvest['properties'])
+    assert loaded['properties']._rows is None and loaded['nodes']._rows is None
+    for key in ('nodes', 'properties', 'tags', 'folders', 'namespaces',
+                'storage', 'rendition_storage', 'unresolved_tags',
+                'workflows', 'taxonomy_pruned'):
+        assert loaded[key] == harvest[key]
+    assert list(loaded['tag_assignments']) == list(harvest['tag_assignments'])
+
+    # References are checked against the snapshotted index
+    from audit.reference_auditor import run_reference_audit
+    for h in (harvest, loaded):
+        run_reference_audit(h)
+    assert harvest['inbound_references']
+    assert loaded['broken_references'] == harvest['broken_references']
+    assert loaded['inbound_references'] == harvest['inbound_references']
+
+
+def test_max_memory_spills_and_merges_back(tmp_path, monkeypatch):
+    import parser.package_reader as package_reader
+    import parser.spill as spill
+    from audit.driver import auditors_for_phase, run_audits
+
+    monkeypatch.setattr(package_reader, 'SPILL_CHECK_EVERY', 50)
+    monkeypatch.setattr(spill, 'SPILL_MIN_ROWS', 10)
+    zip_path, _ = _small_package(tmp_path, assets=200)
+    full = walk_package(zip_path)
+    spilled = walk_package(zip_path, max_memory=20_000)
+
+    stats = spilled['spill']
+    assert len(stats['runs']) > 1 and stats['bytes'] > 0
+    assert isinstance(spilled['properties'], spill.SpilledProperties)
+    assert dict(spilled['properties'].items()) == full['properties']
+    assert list(spilled['tag_assignments']) == list(full['tag_assignments'])
+    assert spill.parse_size('1.5g') == 1536 * 1024 ** 2
+
+    # The audits stream the runs and land on the same answers
+    for harvest in (full, spilled):
+        run_audits(harvest, auditors_for_phase('all'))
+    assert spilled['metadata_fields'] == full['metadata_fields']
+    assert {t: v['asset_count'] for t, v in spilled['tags'].items()} == \
+        {t: v['asset_count'] for t, v in full['tags'].items()}